@@ -12,7 +12,8 @@ from example.triominoes import run_triominoes, ALL_CLAUSES, TRI_TAGS
 
 from symsat.dimacs_sat import parse_lines
 from symsat.gridbuilder import Tesselated, Toroidal, Open
-from symsat.rulesymmetry import expand_symmetry, TOTALISTIC, ROTATED_HEX, TOTALISTIC_HEX
+from symsat.rulecompiler import compile_rule
+from symsat.rulesymmetry import expand_symmetry, ROTATED_HEX, TOTALISTIC_HEX
 from symsat.solver import set_solver
 from symsat.runsolver import solve_and_print
 from symsat.runtemplated import solve_template_and_print
@@ -43,11 +44,11 @@ LIFE_TEMPLATE = '''
    G <- O N NE ~E ~SE ~S ~SW ~W ~NW
 '''
 
-print('Life constraints template (with totalistic symmetry applied):')
+print('Life constraints compiled from B3/S23, the rule of this template with totalistic symmetry:')
 print(LIFE_TEMPLATE)
 wait_for_enter()
 
-LIFE_CONSTRAINTS = expand_symmetry(TOTALISTIC, parse_lines(LIFE_TEMPLATE))
+LIFE_CONSTRAINTS = compile_rule('B3/S23')
 
 run_stilllife('data/still_rotated', LIFE_CONSTRAINTS, Tesselated(RotatedSquare(10)))
 wait_for_enter()
@@ -6,19 +6,11 @@ from symsat.clausebuilder import *
 from symsat.rulesymmetry import *
 from symsat.dimacs_sat import *
 from symsat.solver import *
+from symsat.rulecompiler import compile_rule
 
-LIFE_CONSTRAINTS = expand_symmetry(TOTALISTIC, parse_lines('''
-  # death by loneliness or crowding
-  ~G <- ~N ~NE ~E ~SE ~S ~SW ~W
-  ~G <- N NE E SE
-  # birth on 3 neighbors
-   G <- N NE E ~SE ~S ~SW ~W ~NW
-  # survival on 2 or 3 neighbors
-  ~G <- ~O N NE ~E ~SE ~S ~SW ~W ~NW
-   G <- O N NE ~E ~SE ~S ~SW ~W ~NW
-'''))
-
-def run_p3ss(fileroot, life_constraints):
+LIFE_CONSTRAINTS = compile_rule('B3/S23')
+
+def run_p3ss(fileroot, life_constraints, split=0):
   dimacs_file = fileroot + '.dim'
   symbolic_file = fileroot + '.sym'
   solution_file = fileroot + '.out'
@@ -30,8 +22,7 @@ def run_p3ss(fileroot, life_constraints):
   clauses = inflate_grid_template(life_constraints, grid, G.name)
 
   # add clauses for a cardinality bound of == 25 in first generation
-  clauses.extend(bound_population(grid, GreaterThanOrEqual, 25))
-  clauses.extend(bound_population(grid, LessThanOrEqual, 25))
+  clauses.extend(bound_population(grid, Equal, 25))
 
   # write dimacs file for solver
   with open(dimacs_file, 'w') as out:
@@ -41,8 +32,11 @@ def run_p3ss(fileroot, life_constraints):
   with open(symbolic_file, 'w') as out:
     output_symbolic(clauses, out)
 
-  # solve and print results
-  results = solve(dimacs_file, solution_file, None, True)
+  # solve and print results, splitting on cells of the first row if requested
+  if split:
+    results = solve_cubes(dimacs_file, split_cells(grid, split), solution_file, echo=True)
+  else:
+    results = solve(dimacs_file, solution_file, None, True)
   valuegrid = get_value_grid('c', results)
 
   print()
@@ -50,8 +44,31 @@ def run_p3ss(fileroot, life_constraints):
   for i in range(len(valuegrid[0])):
     print("".join(['*' if x else '.' for x in valuegrid[0][i]]))
 
+def run_min_p3ss(fileroot, life_constraints, search='binary'):
+  root = MooreGridNode((0, 0, 0), Open(5, 16), PeriodicTimeAdjust(3, 1, 0))
+  grid = build_grid(root)
+  clauses = inflate_grid_template(life_constraints, grid, G.name)
+
+  # minimize the (nonzero) population of the first generation, tightening the bound in place
+  count, results, optimal = optimize_count(clauses, population_literals(grid), True, search, low=1,
+                                           dimacs_file=fileroot + '.dim', echo=True)
+  if results is None:
+    print('No period 3 spaceship in the box.')
+    return
+  valuegrid = get_value_grid('c', results)
+
+  print()
+  print("%s period 3 spaceship in Life (%d cells):" % (
+      'Smallest' if optimal else 'Smallest found', count))
+  for i in range(len(valuegrid[0])):
+    print("".join(['*' if x else '.' for x in valuegrid[0][i]]))
+
 if __name__ == "__main__":
   if len(sys.argv) > 2:
     set_solver(sys.argv[2])
-  run_p3ss(sys.argv[1], LIFE_CONSTRAINTS)
+  if len(sys.argv) > 3 and sys.argv[3] in ('linear', 'binary'):
+    run_min_p3ss(sys.argv[1], LIFE_CONSTRAINTS, sys.argv[3])
+  else:
+    split = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    run_p3ss(sys.argv[1], LIFE_CONSTRAINTS, split)
 
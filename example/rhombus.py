@@ -71,7 +71,7 @@ def run_rhombus(fileroot, rhombus_constraints, equivalence, xorig, yorig):
   results = solve(dimacs_file, solution_file, random.randint(1, 1 << 32), True)
   valuegrid = get_value_grid('c', results)
 
-  adjust_back = inverse_adjust(adjust_tag)
+  adjust_back = inverse_adjust(adjust_tag, max(max_tags.values()))
 
   cells = []
   for i in range(len(valuegrid[0])):
@@ -7,17 +7,9 @@ from symsat.clausebuilder import *
 from symsat.rulesymmetry import *
 from symsat.dimacs_sat import *
 from symsat.solver import *
+from symsat.rulecompiler import compile_rule
 
-LIFE_CONSTRAINTS = expand_symmetry(TOTALISTIC, parse_lines('''
-  # death by loneliness or crowding
-  ~G <- ~N ~NE ~E ~SE ~S ~SW ~W
-  ~G <- N NE E SE
-  # birth on 3 neighbors
-   G <- N NE E ~SE ~S ~SW ~W ~NW
-  # survival on 2 or 3 neighbors
-  ~G <- ~O N NE ~E ~SE ~S ~SW ~W ~NW
-   G <- O N NE ~E ~SE ~S ~SW ~W ~NW
-'''))
+LIFE_CONSTRAINTS = compile_rule('B3/S23')
 
 def run_stilllife(fileroot, life_constraints, equivalence):
   dimacs_file = fileroot + '.dim'
@@ -55,23 +55,13 @@ def run_triominoes(fileroot, all_clauses, equivalence, xorig, yorig, cellsize):
   root = MooreGridNode((0, 0, 0), equivalence, PeriodicTimeAdjust(1, 0, 0))
   grid = build_grid(root)
 
-  # create clauses for life rule conditions on grid
-  tag_clauses = inflate_grid_template(all_clauses, grid, G.name)
-
-  # expand clauses to booleans
-  clauses = expand_tag_clauses(tag_clauses)
-
-  # write dimacs file for solver
-  with open(dimacs_file, 'w') as out:
-    output_dimacs(clauses, out)
-
-  # write symbolic form of clauses
-  with open(symbolic_file, 'w') as out:
-    output_symbolic(clauses, out)
-
-  # write tag form of clauses
-  with open(tag_file, 'w') as out:
-    output_symbolic(tag_clauses, out)
+  # inflate, expand and write clauses in a single pass, echoing the tag and symbolic forms.
+  max_tags = constant_max(max(find_max(all_clauses).values()))
+  with open(dimacs_file, 'w') as out, open(symbolic_file, 'w') as sym_out, \
+       open(tag_file, 'w') as tag_out:
+    tag_clauses = tee_symbolic(iter_inflate_grid_template(all_clauses, grid, G.name), tag_out)
+    clauses = tee_symbolic(iter_expand_tag_clauses(tag_clauses, max_tags), sym_out)
+    stream_dimacs(iter_minimize_clauses(clauses, per_section=True), out)
 
   # solve and print results
   results = solve(dimacs_file, solution_file, random.randint(1, 1 << 32), True)
@@ -1,4 +1,5 @@
 import re
+from .subsumption import remove_subsumed
 
 LITERAL_RE = re.compile(r'(~)?([^\(]+)(\(([0-9]+)\))?')
 
@@ -88,20 +89,9 @@ def expand_disjunction(clauses1, clauses2):
   return expanded
 
 def remove_redundant(clauses):
-  '''Remove redundant (less restrictive) disjunctions from the list of clauses.'''
-  minimal = []
-  for clause in clauses:
-    clauseset = set(clause)
-    is_subset = False
-    for testclause in clauses:
-      testclauseset = set(testclause)
-      if len(clauseset) > len(testclauseset):
-        if testclauseset.issubset(clauseset):
-          is_subset = True
-          break
-    if not is_subset:
-      minimal.append(clause)
-  return minimal
+  '''Remove redundant (less restrictive) disjunctions from the list of clauses, i.e. those with a
+     smaller clause as a subset (using a subsumption index rather than comparing all pairs).'''
+  return remove_subsumed(clauses)
 
 def flatten_disjunction(clause_lists):
   '''Flatten a disjunction of clause lists into a single conjunction of clauses.'''
@@ -156,12 +146,67 @@ def always_false(name):
 ZERO = Literal('{zero}')
 
 class Cardinality(object):
-  '''Class for building cardinality constraints on variables.'''
-  def build(self, variables, limit):
+  '''Class for building cardinality constraints on variables in one of ENCODINGS.'''
+  def build(self, variables, limit, encoding='adder', constants=()):
+    variables, limit = remove_constants(variables, limit, constants)
+    if limit < 0:
+      raise ValueError('Count of %d variables cannot be at most %d.' % (len(variables), limit))
+    if encoding is None:
+      encoding = choose_encoding(len(variables), limit)
+    if encoding not in ENCODINGS:
+      raise ValueError('Unknown cardinality encoding %s.' % encoding)
+    self.encoding = encoding
+    # the adder network cannot express limits of n or more, which need no clauses anyway
+    if limit >= len(variables):
+      self.network = None
+      self.counter_clauses, self.constraint_clauses = [], ()
+      return
+    if encoding != 'adder':
+      self.network = None
+      self.counter_clauses, self.constraint_clauses = ENCODINGS[encoding](list(variables), limit)
+      self.constraint_clauses = tuple(self.constraint_clauses)
+      return
     network, levels = Cardinality.make_adder_network(variables)
-    self.adder_clauses = Cardinality.make_adder_clauses(network, levels)
     self.constraint_clauses = tuple([~levels[i] if (limit & (1<<i)) == 0 else levels[i]]
                                     for i in range(len(levels)))
+    self.network = network
+
+  @property
+  def adder_clauses(self):
+    if self.network is None:
+      return list(self.counter_clauses)
+    return Cardinality.make_adder_clauses(self.network, None)
+
+  def iter_clauses(self):
+    '''Generates adder and constraint clauses without building the list of adder clauses.'''
+    if self.network is None:
+      for clause in self.counter_clauses:
+        yield clause
+    for clause in Cardinality.iter_adder_clauses(self.network or []):
+      yield clause
+    for clause in self.constraint_clauses:
+      yield clause
+
+  def add_to(self, cnf):
+    '''Adds adder and constraint clauses to an integer CNF without building symbolic clauses.'''
+    if self.network is None:
+      return cnf.extend(self.iter_clauses())
+    literal = cnf.symbols.literal
+    for (out0, out1, in0, in1, in2) in self.network:
+      has_zero = in2.name == ZERO.name
+      out0, out1, in0, in1 = literal(out0), literal(out1), literal(in0), literal(in1)
+      cnf.add_clause((out1, -in0, -in1))
+      cnf.add_clause((out1, out0, -in0))
+      cnf.add_clause((out1, out0, -in1))
+      # clauses with ~zero are always true
+      if not has_zero:
+        in2 = literal(in2)
+        cnf.add_clause((out1, -in0, -in2))
+        cnf.add_clause((out1, -in1, -in2))
+        cnf.add_clause((out1, out0, -in2))
+        cnf.add_clause((out0, -in0, -in1, -in2))
+    cnf.extend(self.constraint_clauses)
+    return cnf
 
   @staticmethod
   def contract(network, levels):
@@ -193,26 +238,333 @@ class Cardinality(object):
   @staticmethod
   def make_adder_clauses(network, levels):
     '''Makes clauses for the full adders in the network.'''
-    clauses = []
-    for (out0, out1, in0, in1, in2) in network:
-      clauses.append((out1, ~in0, ~in1))
-      clauses.append((out1, ~in0, ~in2))
-      clauses.append((out1, ~in1, ~in2))
-      clauses.append((out1, out0, ~in0))
-      clauses.append((out1, out0, ~in1))
-      clauses.append((out1, out0, ~in2))
-      clauses.append((out0, ~in0, ~in1, ~in2))
+    return list(Cardinality.iter_adder_clauses(network))
 
-    # return clauses, filtering out any with !~zero and guarantee to be true
-    return [clause for clause in clauses if not clause[-1].name == ZERO.name]
+  @staticmethod
+  def iter_adder_clauses(network):
+    '''Generates clauses for the full adders in the network.'''
+    for (out0, out1, in0, in1, in2) in network:
+      clauses = ((out1, ~in0, ~in1),
+                 (out1, ~in0, ~in2),
+                 (out1, ~in1, ~in2),
+                 (out1, out0, ~in0),
+                 (out1, out0, ~in1),
+                 (out1, out0, ~in2),
+                 (out0, ~in0, ~in1, ~in2))
+      # filter out any with !~zero and guaranteed to be true
+      for clause in clauses:
+        if not clause[-1].name == ZERO.name:
+          yield clause
+
+def remove_constants(variables, limit, constants=()):
+  '''Removes known inputs of a count of at most limit true variables: ZERO and variables whose
+     negation is in constants (literals known true) are dropped, and so are variables in
+     constants, lowering the limit by one each. Returns the remaining variables and limit.'''
+  constants = set(constants)
+  constants.add(~ZERO)
+  remaining = []
+  for x in variables:
+    if x in constants:
+      limit -= 1
+    elif ~x not in constants:
+      remaining.append(x)
+  return remaining, limit
 
 class LessThanOrEqual(Cardinality):
-  def __init__(self, variables, limit):
-    self.build(variables, limit)
+  def __init__(self, variables, limit, encoding=None, constants=()):
+    self.build(variables, limit, encoding, constants)
+
+  @staticmethod
+  def bounds(limit, count):
+    return 0, limit
 
 class GreaterThanOrEqual(Cardinality):
-  def __init__(self, variables, limit):
-    self.build([~x for x in variables], len(variables) - limit)
+  def __init__(self, variables, limit, encoding=None, constants=()):
+    self.build([~x for x in variables], len(variables) - limit, encoding, constants)
+
+  @staticmethod
+  def bounds(limit, count):
+    return limit, count
+
+def sequential_counter(variables, limit):
+  '''Encodes at most limit true variables with a sequential counter (Sinz).'''
+  n = len(variables)
+  if limit >= n:
+    return [], []
+  if limit == 0:
+    return [], [(~x,) for x in variables]
+  s = [[nextvar() for j in range(limit)] for i in range(n - 1)]
+  clauses = [(~variables[0], s[0][0])]
+  clauses.extend((~s[0][j],) for j in range(1, limit))
+  constraints = []
+  for i in range(1, n - 1):
+    clauses.append((~variables[i], s[i][0]))
+    clauses.append((~s[i - 1][0], s[i][0]))
+    for j in range(1, limit):
+      clauses.append((~variables[i], ~s[i - 1][j - 1], s[i][j]))
+      clauses.append((~s[i - 1][j], s[i][j]))
+    constraints.append((~variables[i], ~s[i - 1][limit - 1]))
+  constraints.append((~variables[n - 1], ~s[n - 2][limit - 1]))
+  return clauses, constraints
+
+def totalizer(variables, limit):
+  '''Encodes at most limit true variables with a totalizer (Bailleux and Boufkhad).'''
+  if limit >= len(variables):
+    return [], []
+  clauses = []
+
+  def count(variables):
+    if len(variables) == 1:
+      return variables
+    half = len(variables) // 2
+    left, right = count(variables[:half]), count(variables[half:])
+    outputs = [nextvar() for j in range(min(len(variables), limit + 1))]
+    for a in range(len(left) + 1):
+      for b in range(len(right) + 1):
+        if 1 <= a + b <= len(outputs):
+          clauses.append(tuple(([~left[a - 1]] if a else []) + ([~right[b - 1]] if b else [])
+                               + [outputs[a + b - 1]]))
+    return outputs
+
+  outputs = count(variables)
+  return clauses, [(~outputs[limit],)]
+
+def modulo_totalizer(variables, limit, modulus=None):
+  '''Encodes at most limit true variables with a modulo totalizer (Ogawa et al.).'''
+  if limit >= len(variables):
+    return [], []
+  p = max(2, modulus or int(round((limit + 1) ** 0.5)))
+  quotient, remainder = divmod(limit, p)
+  clauses = []
+
+  def count(variables):
+    if len(variables) == 1:
+      return [], list(variables)
+    half = len(variables) // 2
+    upper_a, lower_a = count(variables[:half])
+    upper_b, lower_b = count(variables[half:])
+    truncated = len(variables) // p > quotient + 1
+    upper = [nextvar() for j in range(min(len(variables) // p, quotient + 1))]
+    lower = [nextvar() for j in range(min(len(variables), p - 1))]
+    carry = nextvar() if len(lower_a) + len(lower_b) >= p else None
+    for i in range(len(lower_a) + 1):
+      for j in range(len(lower_b) + 1):
+        guard = ([~lower_a[i - 1]] if i else []) + ([~lower_b[j - 1]] if j else [])
+        if i + j >= p:
+          clauses.append(tuple(guard + [carry]))
+          if i + j > p:
+            clauses.append(tuple(guard + [lower[i + j - p - 1]]))
+        elif i + j > 0:
+          clauses.append(tuple(guard + ([carry] if carry is not None else []) + [lower[i + j - 1]]))
+    for u in range(len(upper_a) + 1):
+      for v in range(len(upper_b) + 1):
+        guard = ([~upper_a[u - 1]] if u else []) + ([~upper_b[v - 1]] if v else [])
+        if 1 <= u + v <= len(upper):
+          clauses.append(tuple(guard + [upper[u + v - 1]]))
+        if carry is not None:
+          # a carry past the last quotient digit is impossible unless the digits were truncated
+          if u + v < len(upper):
+            clauses.append(tuple([~carry] + guard + [upper[u + v]]))
+          else:
+            clauses.append(tuple([~carry] + guard + (upper[-1:] if truncated else [])))
+    return upper, lower
+
+  upper, lower = count(variables)
+  constraints = []
+  if quotient < len(upper):
+    constraints.append((~upper[quotient],))
+  if remainder < len(lower):
+    constraints.append(tuple(([~upper[quotient - 1]] if quotient else []) + [~lower[remainder]]))
+  return clauses, constraints
+
+def batcher_pairs(n):
+  '''Generates the comparators (i, j) of an odd-even merge sort on n (a power of 2) wires.'''
+  p = 1
+  while p < n:
+    k = p
+    while k >= 1:
+      for j in range(k % p, n - k, 2 * k):
+        for i in range(min(k, n - j - k)):
+          if (i + j) // (2 * p) == (i + j + k) // (2 * p):
+            yield i + j, i + j + k
+      k //= 2
+    p *= 2
+
+def sorting_network(variables, limit):
+  '''Encodes at most limit true variables with an odd-even merge sorting network.'''
+  if limit >= len(variables):
+    return [], []
+  n = 1
+  while n < len(variables):
+    n *= 2
+  # None is a padding wire that is always false
+  wires = list(variables) + [None] * (n - len(variables))
+  comparators = []
+  for i, j in batcher_pairs(n):
+    a, b = wires[i], wires[j]
+    if a is None or b is None:
+      wires[i], wires[j] = (b, a) if a is None else (a, b)
+      continue
+    high, low = nextvar(), nextvar()
+    comparators.append((high, low, a, b))
+    wires[i], wires[j] = high, low
+  needed = set([wires[limit]])
+  clauses = []
+  for high, low, a, b in reversed(comparators):
+    if low in needed:
+      clauses.append((~a, ~b, low))
+    if high in needed:
+      clauses.append((~b, high))
+      clauses.append((~a, high))
+    if low in needed or high in needed:
+      needed.update((a, b))
+  clauses.reverse()
+  return clauses, [(~wires[limit],)]
+
+ENCODINGS = {
+  'adder': None,
+  'sequential': sequential_counter,
+  'totalizer': totalizer,
+  'modulo_totalizer': modulo_totalizer,
+  'sorting': sorting_network,
+}
+
+def choose_encoding(count, limit):
+  '''Picks an encoding from ENCODINGS for at most limit of count variables.'''
+  if limit <= 2:
+    return 'sequential'
+  if count * limit <= 20000:
+    return 'totalizer'
+  if count * limit <= 200000:
+    return 'modulo_totalizer'
+  if count <= 4096:
+    return 'sorting'
+  return 'adder'
+
+class AdderNetwork(object):
+  '''Full-adder network whose output bits equal the number of true variables (unlike the one-sided
+     network of Cardinality), so it can be shared by any number of bounds on the same variables.'''
+  def __init__(self, variables):
+    self.count = len(variables)
+    self.network, self.levels = Cardinality.make_adder_network(variables)
+
+  def iter_clauses(self):
+    '''Generates clauses making each adder's outputs equal to the sum and carry of its inputs.'''
+    for (out0, out1, in0, in1, in2) in self.network:
+      inputs = (in0, in1, in2)
+      clauses = [(out1, ~in0, ~in1), (out1, ~in0, ~in2), (out1, ~in1, ~in2),
+                 (~out1, in0, in1), (~out1, in0, in2), (~out1, in1, in2)]
+      # sum is the parity of the inputs
+      for values in range(8):
+        odd = bin(values).count('1') % 2 == 1
+        clauses.append(tuple(x if (values >> k) & 1 == 0 else ~x for k, x in enumerate(inputs))
+                       + (out0 if odd else ~out0,))
+      for clause in clauses:
+        # zero is always false, so drop clauses with ~zero and zero itself from others
+        if ~ZERO not in clause:
+          yield tuple(x for x in clause if x != ZERO)
+
+  def bound_clauses(self, low, high):
+    '''Makes clauses requiring the count to be between low and high (inclusive).'''
+    if low > self.count or low > high:
+      raise ValueError('Count of %d variables cannot be between %d and %d.' % (self.count, low, high))
+    if low == high:
+      return [(bit if (low >> i) & 1 else ~bit,) for i, bit in enumerate(self.levels)]
+    return at_least_clauses(self.levels, low) + at_most_clauses(self.levels, high)
+
+class Totalizer(object):
+  '''Unary counter (a totalizer) whose outputs[j] is true exactly when at least j + 1 variables
+     are true, so any bound on the count is a unit clause on one of its outputs.'''
+  def __init__(self, variables):
+    self.count = len(variables)
+    self.clauses = []
+    self.outputs = self.merge(list(variables))
+
+  def merge(self, variables):
+    '''Makes outputs counting the variables from the outputs of counters on each half.'''
+    if len(variables) <= 1:
+      return variables
+    half = len(variables) // 2
+    left, right = self.merge(variables[:half]), self.merge(variables[half:])
+    outputs = [nextvar() for x in variables]
+    for a in range(len(left) + 1):
+      for b in range(len(right) + 1):
+        # at least a on the left and b on the right means at least a + b
+        if a + b > 0:
+          self.clauses.append(tuple(([~left[a - 1]] if a else []) + ([~right[b - 1]] if b else [])
+                                    + [outputs[a + b - 1]]))
+        # at most a on the left and b on the right means at most a + b
+        if a + b < len(outputs):
+          self.clauses.append(tuple(([left[a]] if a < len(left) else []) +
+                                    ([right[b]] if b < len(right) else []) + [~outputs[a + b]]))
+    return outputs
+
+  def iter_clauses(self):
+    return iter(self.clauses)
+
+  def at_most(self, limit):
+    '''Returns the literal (a unit clause) for at most limit true variables, or None if always true.'''
+    return ~self.outputs[limit] if 0 <= limit < self.count else None
+
+  def at_least(self, limit):
+    '''Returns the literal for at least limit true variables, or None if always true.'''
+    return self.outputs[limit - 1] if 0 < limit <= self.count else None
+
+  def bound_clauses(self, low, high):
+    '''Makes unit clauses requiring the count to be between low and high (inclusive).'''
+    if low > self.count or low > high or high < 0:
+      raise ValueError('Count of %d variables cannot be between %d and %d.' % (self.count, low, high))
+    return [(x,) for x in (self.at_least(low), self.at_most(high)) if x is not None]
+
+def at_most_clauses(bits, limit):
+  '''Makes clauses requiring a binary number (least significant bit first) to be at most limit.'''
+  n = len(bits)
+  if limit >= (1 << n) - 1:
+    return []
+  return [tuple([~bits[i]] + [~bits[j] for j in range(i + 1, n) if (limit >> j) & 1])
+          for i in range(n) if not (limit >> i) & 1]
+
+def at_least_clauses(bits, limit):
+  '''Makes clauses requiring a binary number (least significant bit first) to be at least limit.'''
+  if limit <= 0:
+    return []
+  return at_most_clauses([~bit for bit in bits], (1 << len(bits)) - 1 - limit)
+
+class Between(Cardinality):
+  '''Bounds the number of true variables between a pair of limits (inclusive) with an exact adder
+     network, shared=True if another bound already added the network's clauses.'''
+  def __init__(self, variables, limits, network=None, shared=False):
+    self.adder_network = network or AdderNetwork(variables)
+    self.shared = shared
+    self.network = self.adder_network.network
+    self.constraint_clauses = tuple(self.adder_network.bound_clauses(*limits))
+
+  @staticmethod
+  def bounds(limits, count):
+    return limits
+
+  @property
+  def adder_clauses(self):
+    return [] if self.shared else list(self.adder_network.iter_clauses())
+
+  def iter_clauses(self):
+    if not self.shared:
+      for clause in self.adder_network.iter_clauses():
+        yield clause
+    for clause in self.constraint_clauses:
+      yield clause
+
+  def add_to(self, cnf):
+    return cnf.extend(self.iter_clauses())
+
+class Equal(Between):
+  '''Requires the number of true variables to equal a limit.'''
+  def __init__(self, variables, limit, network=None, shared=False):
+    super(Equal, self).__init__(variables, (limit, limit), network, shared)
+
+  @staticmethod
+  def bounds(limit, count):
+    return limit, limit
 
 def to_pairs(literals):
   '''Convert literals to name value/tag pairs.'''
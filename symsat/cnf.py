@@ -0,0 +1,247 @@
+from array import array
+from itertools import chain
+from .clausebuilder import Literal, ZERO
+from .subsumption import remove_subsumed
+from .symbolic_util import is_comment
+
+class SymbolTable(object):
+  '''Two-way mapping between variable names (with optional tags) and indices starting at 1.'''
+  def __init__(self, names=()):
+    self._keys = [None]
+    self._index = {}
+    for name in names:
+      self.variable(name)
+
+  def variable(self, name, tag=None):
+    '''Returns the index of a variable, assigning the next index if it is new.'''
+    key = (name, tag)
+    ix = self._index.get(key)
+    if ix is None:
+      ix = len(self._keys)
+      self._index[key] = ix
+      self._keys.append(key)
+    return ix
+
+  def find(self, name, tag=None):
+    '''Returns the index of a variable or None if it has not been assigned.'''
+    return self._index.get((name, tag))
+
+  def key(self, ix):
+    '''Returns the (name, tag) pair for an index.'''
+    return self._keys[ix]
+
+  def name(self, ix):
+    return self._keys[ix][0]
+
+  def literal(self, literal):
+    '''Converts a Literal to a signed integer, assigning an index if needed.'''
+    ix = self.variable(literal.name, literal.tag)
+    return ix if literal.value else -ix
+
+  def to_literal(self, lit):
+    '''Converts a signed integer back to a Literal.'''
+    name, tag = self._keys[abs(lit)]
+    return Literal(name, lit > 0, tag)
+
+  def has_tags(self):
+    return any(key[1] is not None for key in self._keys[1:])
+
+  def keys(self):
+    '''Returns (name, tag) pairs in index order.'''
+    return self._keys[1:]
+
+  def __len__(self):
+    return len(self._keys) - 1
+
+class Reductions(object):
+  '''Counts of the clauses, literals and variables removed by simplifying a CNF.'''
+  def __init__(self):
+    self.clauses = 0
+    self.literals = 0
+    self.variables = 0
+
+  def add(self, before, after):
+    '''Adds the differences in size between a CNF and its simplification.'''
+    self.clauses += len(before) - len(after)
+    self.literals += len(before.literals) - len(after.literals)
+    self.variables += len(before.clause_variables() - after.clause_variables())
+
+  def __str__(self):
+    return 'Removed %d clauses, %d literals and %d variables.' % (
+        self.clauses, self.literals, self.variables)
+
+class CNF(object):
+  '''Compact conjunction of integer clauses in a flat literal buffer with clause offsets.
+     Comments are kept with the position of the clause they precede.'''
+  def __init__(self, symbols=None):
+    self.symbols = SymbolTable() if symbols is None else symbols
+    self.literals = array('i')
+    self.offsets = array('l', [0])
+    self.comments = []
+
+  @classmethod
+  def from_symbolic(cls, symbolic_clauses, symbols=None):
+    '''Builds a CNF from symbolic clauses (tuples of Literals and string comments).'''
+    cnf = cls(symbols)
+    cnf.extend(symbolic_clauses)
+    return cnf
+
+  def add_clause(self, lits):
+    '''Appends a clause of signed integers.'''
+    self.literals.extend(lits)
+    self.offsets.append(len(self.literals))
+
+  def add_columns(self, columns):
+    '''Appends one clause for each row of a list of equal-length integer literal columns.'''
+    width = len(columns)
+    if not width or not len(columns[0]):
+      return
+    size = len(columns[0])
+    self.literals.extend(columns[0] if width == 1 else chain.from_iterable(zip(*columns)))
+    start = self.offsets[-1]
+    self.offsets.extend(range(start + width, start + width * size + 1, width))
+
+  def add_comment(self, text):
+    self.comments.append((len(self), text))
+
+  def add(self, symbolic_clause):
+    '''Appends a symbolic clause or comment.'''
+    if is_comment(symbolic_clause):
+      self.add_comment(symbolic_clause)
+    else:
+      literal = self.symbols.literal
+      self.add_clause([literal(x) for x in symbolic_clause])
+
+  def extend(self, symbolic_clauses):
+    for clause in symbolic_clauses:
+      self.add(clause)
+    return self
+
+  def clause(self, k):
+    return tuple(self.literals[self.offsets[k]:self.offsets[k + 1]])
+
+  def __len__(self):
+    return len(self.offsets) - 1
+
+  def __iter__(self):
+    literals, offsets = self.literals, self.offsets
+    for k in range(len(offsets) - 1):
+      yield tuple(literals[offsets[k]:offsets[k + 1]])
+
+  def items(self):
+    '''Iterates over comments and integer clauses in the order they were added.'''
+    clauses = iter(self)
+    k = 0
+    for position, text in self.comments:
+      while k < position:
+        yield next(clauses)
+        k += 1
+      yield text
+    for clause in clauses:
+      yield clause
+
+  def num_variables(self):
+    return len(self.symbols)
+
+  def literal(self, lit):
+    '''Returns a Literal view of a signed integer literal.'''
+    return self.symbols.to_literal(lit)
+
+  def symbolic(self):
+    '''Iterates over the clauses as tuples of Literals (with comments) for display.'''
+    to_literal = self.symbols.to_literal
+    for item in self.items():
+      yield item if is_comment(item) else tuple(to_literal(x) for x in item)
+
+  def minimized(self):
+    '''Returns a copy without duplicate clauses, duplicate literals, or clauses that are always true.'''
+    res = CNF(self.symbols)
+    seen = set()
+    for item in self.items():
+      if is_comment(item):
+        res.add_comment(item)
+      else:
+        deduped = tuple(sorted(set(item), key=abs))
+        if deduped not in seen and not is_tautology(deduped):
+          seen.add(deduped)
+          res.add_clause(deduped)
+    return res
+
+  def subsumed(self):
+    '''Returns a copy without clauses that another clause subsumes (has a subset of its literals),
+       keeping the first of any duplicates.'''
+    kept = set(frozenset(clause) for clause in remove_subsumed(self, strict=False))
+    res = CNF(self.symbols)
+    for item in self.items():
+      if is_comment(item):
+        res.add_comment(item)
+      elif frozenset(item) in kept:
+        kept.discard(frozenset(item))
+        res.add_clause(item)
+    return res
+
+  def clause_variables(self):
+    '''Returns the set of variables in clauses of more than one literal.'''
+    return set(abs(x) for clause in self if len(clause) > 1 for x in clause)
+
+  def simplified(self, constants=(), reductions=None):
+    '''Returns a copy with constants (true Literals or signed integers), unit clauses and ~{zero}
+       substituted until no new units appear, counting what was removed in reductions if given.'''
+    find = self.symbols.find
+    true = set()
+    for lit in constants:
+      if not isinstance(lit, int):
+        ix = find(lit.name, lit.tag)
+        lit = None if ix is None else (ix if lit.value else -ix)
+      if lit:
+        true.add(lit)
+    zero = find(ZERO.name)
+    if zero is not None:
+      true.add(-zero)
+    res = self
+    while True:
+      true.update(clause[0] for clause in res if len(clause) == 1)
+      res = res._substituted(true)
+      if all(clause[0] in true for clause in res if len(clause) == 1):
+        break
+    if reductions is not None:
+      reductions.add(self, res)
+    return res
+
+  def _substituted(self, true):
+    '''One pass of simplified for a set of true literals.'''
+    used = set(abs(x) for x in self.literals)
+    res = CNF(self.symbols)
+    units = set()
+    for item in self.items():
+      if is_comment(item):
+        res.add_comment(item)
+      elif len(item) == 1 and item[0] in true:
+        if item[0] not in units:
+          units.add(item[0])
+          res.add_clause(item)
+      elif not any(x in true for x in item):
+        res.add_clause([x for x in item if -x not in true])
+    remaining = sorted((x for x in true.difference(units) if abs(x) in used), key=abs)
+    if remaining:
+      res.add_comment('Constants')
+      for x in remaining:
+        res.add_clause((x,))
+    return res
+
+def is_tautology(clause):
+  '''Check if an integer clause sorted by variable contains a literal and its negation.'''
+  for i in range(1, len(clause)):
+    if clause[i] == -clause[i - 1]:
+      return True
+  return False
+
+def int_disjunction(clauses1, clauses2):
+  '''Expand a disjunction of two lists of integer clauses, ignoring clauses that are always true.'''
+  expanded = set()
+  for clause1 in clauses1:
+    for clause2 in clauses2:
+      combined = tuple(sorted(set(clause1).union(clause2), key=abs))
+      if not is_tautology(combined):
+        expanded.add(combined)
+  return expanded
@@ -1,7 +1,13 @@
+import os
 import re
+import shutil
+import tempfile
 from .clausebuilder import Literal, ZERO
+from .cnf import CNF, SymbolTable, is_tautology
+from .preprocess import preprocess, read_reconstruction, reconstruct, write_reconstruction
 from .symbolic_util import find_variables, parse_line, parse_lines, is_comment
-from .tags import expand_tag_clauses
+from .tags import (expand_tag_clauses, is_auxiliary, match_integers_any, tag_bound_clauses,
+                   tag_encoding, tag_value)
 
 def is_always_true(clause):
   '''Check if clause is always true because it has both a literal and its negation.'''
@@ -16,18 +22,26 @@ def is_always_true(clause):
 
 def minimize_clauses(symbolic_clauses):
   '''Remove duplicate clauses, duplicate literals, and clauses that are always true.'''
+  if isinstance(symbolic_clauses, CNF):
+    return symbolic_clauses.minimized()
+  return list(iter_minimize_clauses(symbolic_clauses))
+
+def iter_minimize_clauses(symbolic_clauses, per_section=False):
+  '''Generates clauses without duplicates, duplicate literals, or clauses that are always true.
+     If per_section is set, duplicates are only removed between comments, bounding memory
+     by the largest section rather than the whole set of clauses.'''
   seen = set()
-  res = []
   for clause in symbolic_clauses:
     if is_comment(clause):
-      res.append(clause)
+      if per_section:
+        seen.clear()
+      yield clause
     else:
       deduped = tuple(sorted(set(clause)))
       if deduped not in seen:
         if not is_always_true(deduped):
           seen.add(deduped)
-          res.append(deduped)
-  return res
+          yield deduped
 
 def read_symbolic(inp):
   '''Read clauses in symbolic form.'''
@@ -38,58 +52,259 @@ def read_symbolic(inp):
 
 def output_symbolic(symbolic_clauses, out):
   '''Output clauses in symbolic form.'''
+  if isinstance(symbolic_clauses, CNF):
+    symbolic_clauses = symbolic_clauses.symbolic()
   for clause in symbolic_clauses:
     if is_comment(clause):
       out.write('#%s%s\n' % ('' if clause.startswith(' ') else ' ', clause))
     else:
       out.write('%s\n' % ' '.join(map(str, clause)))
 
-def output_dimacs(symbolic_clauses, out):
-  '''Output clauses in dimacs format.'''
+def tee_symbolic(symbolic_clauses, out):
+  '''Generates the given clauses, writing each in symbolic form as it passes through.'''
+  for clause in symbolic_clauses:
+    output_symbolic((clause,), out)
+    yield clause
+
+# characters reserved at the start of a dimacs file for the header and comment padding
+HEADER_SIZE = 64
+
+def dimacs_header(num_variables, num_clauses):
+  '''Returns a header padded with a comment line to exactly HEADER_SIZE characters, so it can be
+     rewritten in place when clauses are added later.'''
+  line = 'p cnf %d %d\n' % (num_variables, num_clauses)
+  if len(line) + 2 > HEADER_SIZE:
+    raise ValueError('Header %s does not fit in %d characters.' % (line.strip(), HEADER_SIZE))
+  return line + 'c' + ' ' * (HEADER_SIZE - len(line) - 2) + '\n'
+
+def output_variable_map(names, variable_map, out):
+  '''Write names (in index order) to a sidecar variable map, with a comment naming it in out.'''
+  out.write('c variable map: %s\n' % os.path.basename(variable_map.name))
+  for name in names:
+    variable_map.write('%s\n' % name.replace('~', ''))
+
+def output_dimacs(symbolic_clauses, out, variable_map=None, comment_variables=True,
+                  tag_encodings=None, reconstruction=None, frozen=(), reductions=None):
+  '''Output clauses (symbolic or CNF) in dimacs format. Variable names are written as comments
+     and/or to a sidecar variable map file (one name per line in index order). Tags are expanded
+     in the given encodings (see tags.tag_encoding). If a reconstruction file is given, the
+     clauses are preprocessed and the reconstruction stack is written there.'''
   # first expand tag clauses if any
-  symbolic_clauses = expand_tag_clauses(symbolic_clauses)
+  symbolic_clauses = expand_tag_clauses(symbolic_clauses, tag_encodings)
 
-  variables = find_variables(symbolic_clauses)
-  symbol_table = {name: ix for name, ix in zip(sorted(variables), range(1, len(variables) + 1))}
-  symbolic_clauses = minimize_clauses(symbolic_clauses)
-  num_clauses = sum(not is_comment(clause) for clause in symbolic_clauses)
+  if isinstance(symbolic_clauses, CNF):
+    cnf = symbolic_clauses
+  else:
+    # number variables in sorted order
+    cnf = CNF.from_symbolic(symbolic_clauses,
+                            SymbolTable(sorted(find_variables(symbolic_clauses))))
+  cnf = cnf.minimized()
+  if reconstruction is not None:
+    cnf, stack = preprocess(cnf, frozen, reductions)
+    write_reconstruction(stack, reconstruction)
 
-  out.write('p cnf %d %d\n' % (len(symbol_table), num_clauses))
-  for name, ix in sorted(symbol_table.items()):
-    out.write('c variable %s: %d\n' % (name.replace('~', ''), ix))
-  for clause in symbolic_clauses:
+  out.write(dimacs_header(cnf.num_variables(), len(cnf)))
+  if reconstruction is not None:
+    out.write('c reconstruction: %s\n' % os.path.basename(reconstruction.name))
+  names = [name for name, _ in cnf.symbols.keys()]
+  if variable_map is not None:
+    output_variable_map(names, variable_map, out)
+  if comment_variables:
+    for name, ix in sorted(zip(names, range(1, len(names) + 1))):
+      out.write('c variable %s: %d\n' % (name.replace('~', ''), ix))
+  for clause in cnf.items():
     if is_comment(clause):
       out.write('c %s\n' % clause)
     else:
-      num_clause = [(1 if literal.value else -1) * symbol_table[literal.name] for literal in clause]
-      out.write('%s 0\n' % ' '.join([str(x) for x in num_clause]))
+      out.write('%s 0\n' % ' '.join([str(x) for x in clause]))
+
+class DimacsWriter(object):
+  '''Writes clauses in dimacs format as they arrive, with the header patched in when closed.'''
+  def __init__(self, out, max_tags=None, variable_map=None, comment_variables=True,
+               tag_encodings=None):
+    self.out = out
+    self.max_tags = max_tags
+    self.tag_encodings = tag_encodings
+    self.variable_map = variable_map
+    self.comment_variables = comment_variables
+    self.symbols = SymbolTable()
+    self.num_clauses = 0
+    if out.seekable():
+      self.start = out.tell()
+      self.body = out
+      out.write(dimacs_header(0, 0))
+    else:
+      self.start = None
+      self.body = tempfile.TemporaryFile('w+')
+    if variable_map is not None:
+      output_variable_map((), variable_map, self.body)
+
+  def variable(self, name):
+    '''Returns the number of a variable, writing a comment with its name when first seen.'''
+    ix = self.symbols.find(name)
+    if ix is None:
+      ix = self.symbols.variable(name)
+      if self.variable_map is not None:
+        self.variable_map.write('%s\n' % name.replace('~', ''))
+      if self.comment_variables:
+        self.body.write('c variable %s: %d\n' % (name.replace('~', ''), ix))
+    return ix
+
+  def write(self, clause):
+    '''Writes a symbolic clause or comment.'''
+    if is_comment(clause):
+      self.body.write('c %s\n' % clause)
+    elif all(literal.is_bool() for literal in clause):
+      self.write_literals(clause)
+    elif self.max_tags is None:
+      raise ValueError('Clause %s has tags, but no maximum tags were given.' % (clause,))
+    else:
+      for bit_clause in match_integers_any(clause, self.max_tags, self.tag_encodings):
+        self.write_literals(bit_clause)
+
+  def write_literals(self, clause):
+    '''Writes a clause of boolean literals, removing duplicates and skipping it if always true.'''
+    variable = self.variable
+    num_clause = sorted(set(variable(literal.name) * (1 if literal.value else -1)
+                            for literal in clause), key=abs)
+    if not is_tautology(num_clause):
+      self.body.write('%s 0\n' % ' '.join([str(x) for x in num_clause]))
+      self.num_clauses += 1
+
+  def write_all(self, clauses):
+    for clause in clauses:
+      self.write(clause)
+    return self
+
+  def close(self):
+    '''Adds upper bounds for tags and writes the final header.'''
+    if self.max_tags:
+      self.write('Setting upper bound on tags.')
+      for tag, value in sorted(self.max_tags.items()):
+        encoding = tag_encoding(tag, value, self.tag_encodings)
+        for clause in tag_bound_clauses(tag, value, encoding):
+          self.write_literals(clause)
+    header = dimacs_header(len(self.symbols), self.num_clauses)
+    if self.start is not None:
+      end = self.out.tell()
+      self.out.seek(self.start)
+      self.out.write(header)
+      self.out.seek(end)
+    else:
+      try:
+        self.out.write(header)
+        self.body.seek(0)
+        shutil.copyfileobj(self.body, self.out)
+      finally:
+        self.body.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    if exc_info[0] is None:
+      self.close()
+    elif self.body is not self.out:
+      # the temporary file is removed when closed
+      self.body.close()
+
+def stream_dimacs(symbolic_clauses, out, max_tags=None, variable_map=None, comment_variables=True,
+                  tag_encodings=None):
+  '''Output an iterable of symbolic clauses in dimacs format, returning the DimacsWriter.'''
+  with DimacsWriter(out, max_tags, variable_map, comment_variables, tag_encodings) as writer:
+    writer.write_all(symbolic_clauses)
+  return writer
+
+def append_dimacs(dimacs_file, int_clauses, comment=None):
+  '''Append integer clauses to a dimacs file with a padded header, rewriting only the header.'''
+  with open(dimacs_file, 'r+') as dimacs:
+    header = dimacs.read(HEADER_SIZE)
+    toks = header.split()
+    num_variables, num_clauses = int(toks[2]), int(toks[3])
+    if header != dimacs_header(num_variables, num_clauses):
+      raise ValueError('%s does not have a padded header.' % dimacs_file)
+    dimacs.seek(0, os.SEEK_END)
+    if comment is not None:
+      dimacs.write('c %s\n' % comment)
+    for clause in int_clauses:
+      dimacs.write('%s 0\n' % ' '.join([str(x) for x in clause]))
+      num_clauses += 1
+    dimacs.seek(0)
+    dimacs.write(dimacs_header(num_variables, num_clauses))
 
 # regex for parsing comments mapping variable names to numbers
 VAR_REGEX = re.compile('^c variable ([^ ]+): ([0-9]+)')
 
-def load_results(input, solution):
-  '''Load the results using variable comments in input and solution of SAT solver.'''
+# regex for parsing the comment naming a sidecar variable map
+MAP_REGEX = re.compile('^c variable map: (.+)$')
+
+# regex for parsing the comment naming a sidecar reconstruction stack
+RECONSTRUCTION_REGEX = re.compile('^c reconstruction: (.+)$')
+
+def read_variable_map(inp):
+  '''Read a sidecar variable map into a list of names indexed by variable number.'''
+  return [None] + [line.rstrip('\n') for line in inp]
+
+def sidecar_path(input, name):
+  '''Returns the path of a sidecar file named in a dimacs file, which is found next to it.'''
+  return os.path.join(os.path.dirname(getattr(input, 'name', '')), name.strip())
+
+def read_variable_names(input, reconstruction=None):
+  '''Read variable names by number from the sidecar variable map named in the header of a dimacs
+     file (found next to it), or else from its variable comments. If a list is given as
+     reconstruction, the stack in the sidecar named by a preprocessed file is read into it.'''
   to_symbol = {}
   for line in input:
+    m = RECONSTRUCTION_REGEX.search(line)
+    if m:
+      if reconstruction is not None:
+        with open(sidecar_path(input, m.group(1))) as inp:
+          reconstruction.extend(read_reconstruction(inp))
+      continue
+    m = MAP_REGEX.search(line)
+    if m:
+      with open(sidecar_path(input, m.group(1))) as variable_map:
+        return read_variable_map(variable_map)
     m = VAR_REGEX.search(line)
     if m:
       to_symbol[int(m.group(2))] = m.group(1)
+  return to_symbol
 
-  values = {}
+def load_results(input, solution):
+  '''Load the results using variable names for input (a dimacs file, or names already read from it)
+     and solution of SAT solver.'''
+  return load_values(input, parse_values(solution))
+
+def load_values(input, values):
+  '''Decode signed integer values solving a dimacs file, reconstructing preprocessed variables.'''
+  if isinstance(input, (list, dict)):
+    return decode_values(input, values)
+  stack = []
+  to_symbol = read_variable_names(input, stack)
+  return decode_values(to_symbol, reconstruct(stack, values))
+
+def parse_values(solution):
+  '''Generates the signed integer values in the v lines of solver output.'''
   for line in solution:
     toks = line.split()
-    if toks[0] == 'v':
+    if toks and toks[0] == 'v':
       for x in toks[1:]:
         ix = int(x)
         if ix != 0:
-          name = to_symbol[abs(ix)]
-          parts = name.split('#')
-          truth = ix > 0
-          if len(parts) == 1:
-            values[name] = truth
-          else:
-            name, bit = parts
-            values[name] = values.get(name, 0) | ((1 << int(bit)) if truth else 0)
+          yield ix
+
+def decode_values(to_symbol, literals):
+  '''Decode signed integer values to sorted (name, value) pairs, combining the variables of
+     tags in any encoding (bits, onehot or order) and leaving out auxiliary variables.'''
+  values = {}
+  for ix in literals:
+    name = to_symbol[abs(ix)]
+    parts = name.split('#')
+    truth = ix > 0
+    if len(parts) == 1:
+      values[name] = truth
+    elif not is_auxiliary(name):
+      tag_value(values, parts[0], parts[1], truth)
 
   return [(key, value) for key, value in sorted(values.items())]
 
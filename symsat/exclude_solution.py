@@ -16,21 +16,51 @@ input = sys.argv[1]
 solution = sys.argv[2]
 tmp_out = input + '.tmp'
 
-with open(tmp_out, 'w') as out:
-  with open(input) as inp:
-    for line in inp:
-      if line.startswith('p cnf'):
-        toks = line.split()
-        out.write(' '.join(toks[:-1]) + ' ' + str(int(toks[-1]) + 1) + '\n')
-      else:
-        out.write(line)
-
-  out.write('c excluded solution:\n')
+def read_exclusion(solution):
+  '''Read the solution as clause lines with each value complemented.'''
+  lines = ['c excluded solution:\n']
   with open(solution) as inp:
     for line in inp:
       toks = line.split()
       if toks[0] == 'v':
         inverse = [str(-int(x)) for x in toks[1:]]
-        out.write(' '.join(inverse) + '\n')
+        lines.append(' '.join(inverse) + '\n')
+  return lines
+
+def padded_header(header, padding, num_clauses):
+  '''Returns a header with the new clause count filling the same space as the header and its
+     padding comment, or None if it was not padded or does not fit.'''
+  if not padding.startswith('c') or padding.strip() != 'c':
+    return None
+  toks = header.split()
+  line = ' '.join(toks[:-1]) + ' ' + str(num_clauses) + '\n'
+  size = len(header) + len(padding)
+  if len(line) + 2 > size:
+    return None
+  return line + 'c' + ' ' * (size - len(line) - 2) + '\n'
+
+exclusion = read_exclusion(solution)
+
+# update the header in place and append if there is padding to absorb a longer clause count
+with open(input, 'r+') as inp:
+  header = inp.readline()
+  padding = inp.readline()
+  replacement = padded_header(header, padding, int(header.split()[-1]) + 1)
+  if replacement is not None:
+    inp.seek(0)
+    inp.write(replacement)
+    inp.seek(0, os.SEEK_END)
+    inp.writelines(exclusion)
+
+if replacement is None:
+  with open(tmp_out, 'w') as out:
+    with open(input) as inp:
+      for line in inp:
+        if line.startswith('p cnf'):
+          toks = line.split()
+          out.write(' '.join(toks[:-1]) + ' ' + str(int(toks[-1]) + 1) + '\n')
+        else:
+          out.write(line)
+    out.writelines(exclusion)
 
-os.replace(tmp_out, input)
+  os.replace(tmp_out, input)
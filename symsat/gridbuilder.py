@@ -1,9 +1,14 @@
+from array import array
 from collections import deque
 import copy
 import re
-from .clausebuilder import AbstractLiteral, Literal, ZERO
+from .clausebuilder import (AbstractLiteral, AdderNetwork, Between, ENCODINGS, Literal, ZERO,
+                            remove_constants)
+from .cnf import CNF
 from .rulesymmetry import NEIGHBOR_LITERALS, N, NE, E, SE, S, SW, W, NW, G
-from .symbolic_util import clause_to_string, find_variables, is_comment, inflate_template, parse_line
+from .symbolic_util import (clause_to_string, count_reductions, find_variables, is_comment,
+                            inflate_template, iter_inflate_template, parse_line, same_tag)
+from .tags import adjust_table, find_max
 from .tessellation import RotatedRhombus, RotatedSquare, FlippedRectangle
 
 class GridNode(AbstractLiteral):
@@ -61,6 +66,12 @@ class Toroidal(object):
     return (i % self.rowsize,
             (j + self.column_shift * (i // self.rowsize)) % self.columnsize, 0)
 
+  def to_equivalent_many(self, ilist, jlist):
+    rowsize, columnsize, shift = self.rowsize, self.columnsize, self.column_shift
+    return ([i % rowsize for i in ilist],
+            [(j + shift * (i // rowsize)) % columnsize for i, j in zip(ilist, jlist)],
+            [0] * len(ilist))
+
   def is_outside(self, i, j):
     return False
 
@@ -77,6 +88,9 @@ class Open(object):
   def to_equivalent(self, i, j):
     return i, j, 0
 
+  def to_equivalent_many(self, ilist, jlist):
+    return ilist, jlist, [0] * len(ilist)
+
   def is_outside(self, i, j):
     return i < 0 or i >= self.rowsize or j < 0 or j >= self.columnsize
 
@@ -92,6 +106,10 @@ class Strip(object):
   def to_equivalent(self, i, j):
     return i, j % self.columnsize, 0
 
+  def to_equivalent_many(self, ilist, jlist):
+    columnsize = self.columnsize
+    return ilist, [j % columnsize for j in jlist], [0] * len(ilist)
+
   def is_outside(self, i, j):
     return i < 0 or i >= self.rowsize
 
@@ -107,6 +125,9 @@ class Tesselated(object):
   def to_equivalent(self, i, j):
     return self.tessellation.to_grid(i, j)
 
+  def to_equivalent_many(self, ilist, jlist):
+    return self.tessellation.to_grid_many(ilist, jlist)
+
   def is_outside(self, i, j):
     return False
 
@@ -114,6 +135,13 @@ class Tesselated(object):
     return '%dX%d:%s' % (self.rowsize, self.columnsize, self.tessellation.__class__.__name__)
 
 
+def to_equivalent_many(equivalence, ilist, jlist):
+  '''Maps lists of coordinates to lists of equivalent coordinates and orientations.'''
+  if hasattr(equivalence, 'to_equivalent_many'):
+    return equivalence.to_equivalent_many(ilist, jlist)
+  mapped = [equivalence.to_equivalent(i, j) for i, j in zip(ilist, jlist)]
+  return [x[0] for x in mapped], [x[1] for x in mapped], [x[2] for x in mapped]
+
 class PeriodicTimeAdjust(object):
   def __init__(self, period, ishift=0, jshift=0):
     self.period = period
@@ -143,17 +171,26 @@ MOORE_DISPLACEMENTS = {k.name: v for k, v in {
 
 DELTA_RE = re.compile('O([+-][0-9]+)([+-][0-9]+)')
 
+# displacements of O+i+j symbols, parsed once
+_DELTA_DISPLACEMENTS = {}
+
 def displacement(symbol):
-  m = DELTA_RE.match(symbol)
-  if m:
-    return int(m.group(1)), int(m.group(2))
-  else:
-    return MOORE_DISPLACEMENTS[symbol]
+  d = MOORE_DISPLACEMENTS.get(symbol) or _DELTA_DISPLACEMENTS.get(symbol)
+  if d is None:
+    m = DELTA_RE.match(symbol)
+    if not m:
+      raise KeyError(symbol)
+    d = _DELTA_DISPLACEMENTS[symbol] = int(m.group(1)), int(m.group(2))
+  return d
 
 # get neighbor symbols as strings.
 NEIGHBOR_SYMBOLS = [literal.name for literal in NEIGHBOR_LITERALS]
 
 class MooreGridNode(GridNode):
+  # topology and cell id for nodes that are views of a GridTopology
+  topology = None
+  cell = None
+
   def __init__(self, position, equivalence, timeadjust=PeriodicTimeAdjust(1)):
     self.position = position
     self.equivalence = equivalence
@@ -163,30 +200,49 @@ class MooreGridNode(GridNode):
   def neighbor_symbols(self):
     return NEIGHBOR_SYMBOLS
 
-  def neighbor(self, symbol):
-    i, j, t = self.position
+  def neighbor_position(self, symbol, position=None):
+    '''Returns the equivalent position and orientation of a neighbor of this (or another) position.'''
+    i, j, t = self.position if position is None else position
     if symbol == G.name:
       i, j, t = self.timeadjust.adjust(i, j, t + 1)
     else:
       di, dj = displacement(symbol)
       i += di
       j += dj
-    return self.make_node(i, j, t)
+    i, j, orientation = self.equivalence.to_equivalent(i, j)
+    return (i, j, t), orientation
+
+  def neighbor(self, symbol):
+    topology = self.topology
+    if topology is not None and self.cell < len(topology):
+      ids, orientations = topology.column(symbol)
+      return topology.node(ids[self.cell], orientations[self.cell])
+    position, orientation = self.neighbor_position(symbol)
+    node = copy.copy(self)
+    node.position = position
+    node.orientation = orientation
+    node.topology = None
+    return node
 
   def make_node(self, i, j, t):
     node = copy.copy(self)
     i, j, node.orientation = self.equivalence.to_equivalent(i, j)
     node.position = i, j, t
+    node.topology = None
     return node
 
   def grid_range(self, imin, jmin, imax, jmax, t):
     return set(self.make_node(i, j, t) for i in range(imin, imax) for j in range(jmin, jmax))
 
   def is_outside(self):
+    if self.topology is not None:
+      return self.topology.is_outside(self.cell)
     i, j, _ = self.position
     return self.equivalence.is_outside(i, j)
 
   def is_boundary(self):
+    if self.topology is not None:
+      return self.topology.is_boundary(self.cell)
     return self.is_outside() and not all([node.is_outside() for node in self.neighbors()])
 
   def is_known(self):
@@ -200,8 +256,182 @@ class MooreGridNode(GridNode):
     return '%s%s:%s' % (self.name,
                       ('(%s)' % self.orientation) if self.orientation else '', self.equivalence)
 
+class GridTopology(object):
+  '''Grid of cells reachable from a root node, with integer cell ids and a column of neighbor ids and
+     orientations per symbol. Iterating yields nodes, as from a list of grid nodes.'''
+  def __init__(self, root):
+    self.root = root
+    self.symbols = list(root.neighbor_symbols())
+    self.positions = []
+    self.index = {}
+    self.outside = array('b')
+    self._boundary = {}
+    self._columns = {}
+    self._names = None
+    self._build()
+
+  def _add(self, position):
+    '''Returns the id of a position, adding it if it has not been seen.'''
+    cell = self.index.get(position)
+    if cell is None:
+      cell = len(self.positions)
+      self.index[position] = cell
+      self.positions.append(position)
+      self.outside.append(self.root.equivalence.is_outside(position[0], position[1]))
+    return cell
+
+  def _build(self):
+    root = self.root
+    equivalence, adjust = root.equivalence, root.timeadjust.adjust
+    is_outside = equivalence.is_outside
+    positions, index, outside = self.positions, self.index, self.outside
+    get = index.get
+    is_grid = bytearray([1])
+    self._add(root.position)
+    expanded = array('i')
+    neighbor_ids = {symbol: array('i') for symbol in self.symbols}
+    neighbor_orientations = {symbol: array('b') for symbol in self.symbols}
+    # expand a whole level of the breadth first search at once for each neighbor symbol
+    level = [0]
+    while level:
+      expanded.extend(level)
+      ilist = [positions[cell][0] for cell in level]
+      jlist = [positions[cell][1] for cell in level]
+      tlist = [positions[cell][2] for cell in level]
+      candidates = []
+      for symbol in self.symbols:
+        if symbol == G.name:
+          adjusted = [adjust(i, j, t + 1) for i, j, t in zip(ilist, jlist, tlist)]
+          it, jt, times = [x[0] for x in adjusted], [x[1] for x in adjusted], [x[2] for x in adjusted]
+        else:
+          di, dj = displacement(symbol)
+          it, jt, times = [i + di for i in ilist], [j + dj for j in jlist], tlist
+        it, jt, orientations = to_equivalent_many(equivalence, it, jt)
+        neighbors = list(zip(it, jt, times))
+        found = [get(position, -1) for position in neighbors]
+        # add positions seen for the first time
+        if -1 in found:
+          for k in [k for k, cell in enumerate(found) if cell < 0]:
+            position = neighbors[k]
+            cell = get(position)
+            if cell is None:
+              cell = index[position] = len(positions)
+              positions.append(position)
+              outside.append(is_outside(position[0], position[1]))
+              is_grid.append(0)
+            found[k] = cell
+        neighbor_ids[symbol].extend(found)
+        neighbor_orientations[symbol].extend(orientations)
+        candidates.extend([cell for cell, orientation in zip(found, orientations)
+                           if orientation == 0 and not is_grid[cell]])
+      # expand cells that are not seen already, are at standard orientation and not beyond boundary
+      level = []
+      for cell in candidates:
+        if not is_grid[cell] and (not outside[cell] or self.is_boundary(cell)):
+          is_grid[cell] = 1
+          level.append(cell)
+
+    # renumber so that grid cells come first in position order
+    rows = sorted(range(len(expanded)), key=lambda row: positions[expanded[row]])
+    order = [expanded[row] for row in rows]
+    order.extend(sorted((cell for cell in range(len(positions)) if not is_grid[cell]),
+                        key=positions.__getitem__))
+    renumber = array('i', [0]) * len(order)
+    for new, old in enumerate(order):
+      renumber[old] = new
+    self.positions = [positions[old] for old in order]
+    self.outside = array('b', [outside[old] for old in order])
+    self.index = dict(zip(self.positions, range(len(order))))
+    self._boundary = {renumber[old]: value for old, value in self._boundary.items()}
+    self.size = len(expanded)
+
+    # neighbor columns of grid cells in new order
+    for symbol in self.symbols:
+      ids, orientations = neighbor_ids[symbol], neighbor_orientations[symbol]
+      self._columns[symbol] = (array('i', [renumber[ids[row]] for row in rows]),
+                               array('b', [orientations[row] for row in rows]))
+
+  def __len__(self):
+    return self.size
+
+  def __iter__(self):
+    return (self.node(cell) for cell in range(self.size))
+
+  def __getitem__(self, cell):
+    return self.node(cell)
+
+  def node(self, cell, orientation=0):
+    '''Returns a node that is a view of a cell.'''
+    node = copy.copy(self.root)
+    node.position = self.positions[cell]
+    node.orientation = orientation
+    node.topology = self
+    node.cell = cell
+    return node
+
+  def column(self, symbol):
+    '''Returns arrays of neighbor ids and orientations of each grid cell for a neighbor symbol.'''
+    col = self._columns.get(symbol)
+    if col is None:
+      refs = [self.root.neighbor_position(symbol, self.positions[cell]) for cell in range(self.size)]
+      col = self._columns[symbol] = (array('i', [self._add(position) for position, _ in refs]),
+                                     array('b', [orientation for _, orientation in refs]))
+    return col
+
+  def name(self, cell):
+    return 'c_%d_%d_%d' % self.positions[cell]
+
+  def names(self):
+    '''Returns the variable name of every cell, including outside cells.'''
+    if self._names is None or len(self._names) < len(self.positions):
+      self._names = ['c_%d_%d_%d' % position for position in self.positions]
+    return self._names
+
+  def is_outside(self, cell):
+    return bool(self.outside[cell])
+
+  def is_boundary(self, cell):
+    '''Returns whether a cell is outside but has a neighbor that is not.'''
+    boundary = self._boundary.get(cell)
+    if boundary is None:
+      boundary = False
+      if self.outside[cell]:
+        position = self.positions[cell]
+        equivalence = self.root.equivalence
+        for symbol in self.symbols:
+          (i, j, _), _ = self.root.neighbor_position(symbol, position)
+          if not equivalence.is_outside(i, j):
+            boundary = True
+            break
+      self._boundary[cell] = boundary
+    return boundary
+
+  def layer(self, t):
+    '''Returns ids of grid cells at generation t, not including outside cells.'''
+    positions, outside = self.positions, self.outside
+    return [cell for cell in range(self.size) if positions[cell][2] == t and not outside[cell]]
+
+# recently built topologies, keyed by equivalence, time adjustment, neighborhood and root position.
+TOPOLOGIES = {}
+MAX_TOPOLOGIES = 4
+
+def grid_topology(node):
+  '''Returns the GridTopology for a root node, building it only once while it is recently used.'''
+  key = (node.__class__, node.equivalence, node.timeadjust,
+         tuple(node.neighbor_symbols()), node.position)
+  topology = TOPOLOGIES.pop(key, None)
+  if topology is None:
+    topology = GridTopology(node)
+    while len(TOPOLOGIES) >= MAX_TOPOLOGIES:
+      del TOPOLOGIES[next(iter(TOPOLOGIES))]
+  TOPOLOGIES[key] = topology
+  return topology
+
 def build_grid(node):
-  '''Build a grid of cells starting with root connected by neighborhod relations.'''
+  '''Build a grid of cells starting with root connected by neighborhod relations.
+     A MooreGridNode root gives a GridTopology, which can be used like a sorted list of nodes.'''
+  if isinstance(node, MooreGridNode):
+    return grid_topology(node)
   frontier = deque([node])
   grid_nodes = set(frontier)
   while frontier:
@@ -215,27 +445,90 @@ def build_grid(node):
         frontier.append(neighbor)
   return sorted(grid_nodes, key=lambda node: node.position)
 
-def bound_cardinality(grid, comparator, size, generation, prefix):
-  '''Assign a cardinality constraint to a generation, possibly with a variable prefix.'''
-  cardinality = comparator([Literal(prefix + node.name)
-                            for node in grid_layer(grid, generation)], size)
-  clauses = ['Population constraint %s %s' % (comparator.__name__, size)]
+def population_literals(grid, generation=0, prefix=''):
+  '''Returns literals for the cells of a generation, possibly with a variable prefix.'''
+  if isinstance(grid, GridTopology):
+    names = [grid.name(cell) for cell in grid.layer(generation)]
+  else:
+    names = [node.name for node in grid_layer(grid, generation)]
+  return [Literal(prefix + name) for name in names]
+
+def make_cardinality(grid, comparator, size, generation, prefix, networks=None, encoding=None,
+                     constants=()):
+  '''Makes a cardinality constraint on a generation of a grid, sharing adder networks in networks.'''
+  if encoding is not None and encoding not in ENCODINGS:
+    raise ValueError('Unknown cardinality encoding %s.' % encoding)
+  if encoding is not None and (networks is not None or issubclass(comparator, Between)):
+    raise ValueError('%s on an exact adder network takes no encoding.' % comparator.__name__)
+  literals = population_literals(grid, generation, prefix)
+  if networks is None and not issubclass(comparator, Between):
+    return comparator(literals, size, encoding=encoding, constants=constants)
+  # known cells are left out of the network and those known true taken off the bounds
+  remaining, known = remove_constants(literals, 0, constants)
+  low, high = comparator.bounds(size, len(literals))
+  limits = (max(low + known, 0), high + known)
+  if networks is None:
+    return Between(remaining, limits)
+  key = (generation, prefix)
+  if len(remaining) < len(literals):
+    key += (tuple(remaining),)
+  network = networks.get(key)
+  shared = network is not None
+  if not shared:
+    network = networks[key] = AdderNetwork(remaining)
+  return Between(remaining, limits, network, shared)
+
+def bound_cardinality(grid, comparator, size, generation, prefix, cnf=None, networks=None,
+                      encoding=None, constants=()):
+  '''Assign a cardinality constraint to a generation, possibly with a variable prefix.
+     If a CNF is given, clauses are added to it and it is returned.'''
+  cardinality = make_cardinality(grid, comparator, size, generation, prefix, networks, encoding,
+                                 constants)
+  comment = 'Population constraint %s %s' % (comparator.__name__, size)
+  if cnf is not None:
+    cnf.add_comment(comment)
+    cardinality.add_to(cnf)
+    return cnf
+  clauses = [comment]
   clauses.extend(cardinality.adder_clauses)
   clauses.extend(cardinality.constraint_clauses)
   return clauses
 
-def bound_population(grid, comparator, size, generation = 0):
+def iter_bound_cardinality(grid, comparator, size, generation, prefix, networks=None,
+                           encoding=None, constants=()):
+  '''Generates the clauses of bound_cardinality without building the list of adder clauses.'''
+  cardinality = make_cardinality(grid, comparator, size, generation, prefix, networks, encoding,
+                                 constants)
+  yield 'Population constraint %s %s' % (comparator.__name__, size)
+  for clause in cardinality.iter_clauses():
+    yield clause
+
+def bound_population(grid, comparator, size, generation = 0, cnf=None, networks=None,
+                     encoding=None, constants=()):
   '''Assign a cardinality constraint to population in a generation (0 by default).'''
-  return bound_cardinality(grid, comparator, size, generation, '')
+  return bound_cardinality(grid, comparator, size, generation, '', cnf, networks, encoding,
+                           constants)
 
-def bound_helper(grid, comparator, size, name, generation = 0):
+def bound_helper(grid, comparator, size, name, generation = 0, cnf=None, networks=None,
+                 encoding=None, constants=()):
   '''Assign a cardinality constraint to helper variable in a generation (0 by default).'''
-  return bound_cardinality(grid, comparator, size, generation, name + '$')
+  return bound_cardinality(grid, comparator, size, generation, name + '$', cnf, networks, encoding,
+                           constants)
 
 def grid_layer(grid, t):
   '''Get layer of grid at generation t, not including outside cells.'''
+  if isinstance(grid, GridTopology):
+    return map(grid.node, grid.layer(t))
   return filter(lambda x:x.position[2] == t and not x.is_outside(), grid)
 
+def split_cells(grid, count, generation=0):
+  '''Returns names of the first cells of a generation in position order (i.e. the first row),
+     e.g. to split a search into cubes.'''
+  if isinstance(grid, GridTopology):
+    return [grid.name(cell) for cell in grid.layer(generation)][:count]
+  return [node.name for node in sorted(grid_layer(grid, generation),
+                                       key=lambda node: node.position)][:count]
+
 def grid_substitutions(template_constraints, grid, neighbor_symbols, outside_value=ZERO):
   '''Returns the substitutions of template variables for a grid mapping.'''
   def node_info(node):
@@ -255,15 +548,154 @@ def grid_substitutions(template_constraints, grid, neighbor_symbols, outside_val
 
   return grid_subs
 
-def inflate_grid_template(template_constraints, grid, consequent=None,
-                          adjust_tag=lambda orientation, tag: tag,
-                          outside_value=ZERO):
+class GridTable(object):
+  '''Names and orientations of the cell in each template slot (neighbor symbol, O or helper$)
+     for every grid cell, computed once per slot.'''
+  def __init__(self, grid, outside_value=ZERO):
+    self.grid = grid
+    self.outside_value = outside_value
+    self._columns = {}
+
+  def __len__(self):
+    return len(self.grid)
+
+  def column(self, slot):
+    '''Returns a list of names and a list of orientations for a slot.'''
+    col = self._columns.get(slot)
+    if col is None and isinstance(self.grid, GridTopology):
+      col = self._columns[slot] = self.topology_column(slot)
+    if col is None:
+      outside_value = self.outside_value
+      def node_info(node):
+        return ((outside_value or node).name if node.is_outside() else node.name, node.orientation)
+      if slot == CENTER_CELL.name:
+        infos = [node_info(node) for node in self.grid]
+      elif slot.endswith('$'):
+        infos = [(slot + node.name, node.orientation) for node in self.grid]
+      else:
+        infos = [node_info(node.neighbor(slot)) for node in self.grid]
+      col = self._columns[slot] = ([name for name, _ in infos], [orient for _, orient in infos])
+    return col
+
+  def topology_column(self, slot):
+    '''Gathers a slot column from the neighbor ids of a GridTopology.'''
+    topology = self.grid
+    size = len(topology)
+    if slot.endswith('$'):
+      return [slot + name for name in topology.names()[:size]], array('b', [0]) * size
+    if slot == CENTER_CELL.name:
+      ids, orientations = range(size), array('b', [0]) * size
+    else:
+      ids, orientations = topology.column(slot)
+    names = topology.names()
+    if self.outside_value:
+      outside, zero_name = topology.outside, self.outside_value.name
+      names = [zero_name if outside[cell] else name for cell, name in enumerate(names)]
+    return [names[cell] for cell in ids], orientations
+
+class CompiledTemplate(object):
+  '''Template constraints compiled once into clauses of (slot, value, tag) entries, so they can be
+     applied to a grid by gathering columns of variable indices from a GridTable.'''
+  def __init__(self, template_constraints, consequent=None):
+    self.neighbor_symbols = all_neighbor_symbols(template_constraints)
+    auxiliary = [x for x in find_variables(template_constraints) if x.endswith('$')]
+    self.slots = set([CENTER_CELL.name]).union(self.neighbor_symbols, auxiliary)
+    # compiled clauses are comments, (comment, entries) pairs, or unchanged constant clauses
+    self.clauses = []
+    for constraint in template_constraints:
+      if is_comment(constraint) or not self.slots.intersection([lit.name for lit in constraint]):
+        self.clauses.append(constraint)
+      else:
+        self.clauses.append(('Template: ' + clause_to_string(constraint, consequent),
+                             tuple((lit.name, lit.value, lit.tag) for lit in constraint)))
+    self.max_tag = max(find_max(template_constraints).values() or [0])
+
+  def inflate(self, table, cnf=None, adjust_tag=same_tag, reductions=None):
+    '''Adds clauses for every cell of a GridTable to a CNF (new by default) and returns it,
+       counting clauses, literals and variables left out because of ZERO in reductions if given.'''
+    cnf = CNF() if cnf is None else cnf
+    variable = cnf.symbols.variable
+    size = len(table)
+    adjust = None if adjust_tag is same_tag else adjust_table(adjust_tag, self.max_tag)
+    columns = {}
+    def column(name, value, tag):
+      key = (name, tag)
+      ids = columns.get(key)
+      if ids is None:
+        if name in self.slots:
+          names, orientations = table.column(name)
+          if adjust is None:
+            ids = array('i', [variable(x, tag) for x in names])
+          else:
+            ids = array('i', [variable(x, adjusted)
+                              for x, adjusted in zip(names, adjust.adjust_many(orientations, tag))])
+        else:
+          ids = array('i', [variable(name, tag)]) * size
+        columns[key] = ids
+      return ids if value else array('i', [-x for x in ids])
+
+    zero = None
+    dropped = removed = 0
+    dropped_variables = set()
+    for compiled in self.clauses:
+      if is_comment(compiled) or not isinstance(compiled[0], str):
+        cnf.add(compiled)
+        continue
+      comment, entries = compiled
+      cnf.add_comment(comment)
+      gathered = [column(*entry) for entry in entries]
+      if zero is None:
+        zero = cnf.symbols.find(ZERO.name)
+      # zero is false: drop clauses with ~zero (always true) and zero from the others
+      if zero is not None and any(zero in ids or -zero in ids for ids in gathered):
+        for clause in zip(*gathered):
+          if -zero in clause:
+            dropped += 1
+            removed += len(clause)
+            dropped_variables.update(abs(x) for x in clause)
+          else:
+            reduced = [x for x in clause if x != zero]
+            removed += len(clause) - len(reduced)
+            cnf.add_clause(reduced or clause)
+      else:
+        cnf.add_columns(gathered)
+
+    zero = cnf.symbols.find(ZERO.name)
+    if zero is not None and any(zero in ids for ids in columns.values()):
+      cnf.add_clause([-zero])
+    used = set(abs(x) for x in cnf.literals) if reductions is not None and dropped_variables else ()
+    count_reductions(reductions, dropped, removed, dropped_variables, lambda ix: ix in used)
+    return cnf
+
+def inflate_grid_template(template_constraints, grid, consequent=None, adjust_tag=same_tag,
+                          outside_value=ZERO, cnf=None, reductions=None):
+  '''Apply template constraints to each cell of a grid, gathering clauses into a CNF if one is given
+     (or the constraints are a CompiledTemplate), and counting ZERO reductions in reductions.'''
+  if isinstance(template_constraints, CompiledTemplate):
+    return template_constraints.inflate(GridTable(grid, outside_value), cnf, adjust_tag,
+                                        reductions)
+  if cnf is not None:
+    return CompiledTemplate(template_constraints, consequent).inflate(
+        GridTable(grid, outside_value), cnf, adjust_tag, reductions)
   neighbor_symbols = all_neighbor_symbols(template_constraints)
   return inflate_template(template_constraints,
                           grid_substitutions(template_constraints,
                                              grid, neighbor_symbols, outside_value),
                           consequent,
-                          adjust_tag)
+                          adjust_tag,
+                          cnf,
+                          reductions)
+
+def iter_inflate_grid_template(template_constraints, grid, consequent=None, adjust_tag=same_tag,
+                               outside_value=ZERO, reductions=None):
+  '''Generates the clauses of inflate_grid_template one at a time.'''
+  neighbor_symbols = all_neighbor_symbols(template_constraints)
+  return iter_inflate_template(template_constraints,
+                               grid_substitutions(template_constraints,
+                                                  grid, neighbor_symbols, outside_value),
+                               consequent,
+                               adjust_tag,
+                               reductions)
 
 def all_neighbor_symbols(template_constraints):
   neighbors = set()
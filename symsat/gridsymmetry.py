@@ -0,0 +1,148 @@
+from collections import Counter
+from .gridbuilder import GridTopology, NEIGHBOR_SYMBOLS
+from .clausebuilder import Literal, nextvar
+
+# linear parts of affine maps (i, j) -> (a*i + b*j, c*i + d*j) for rotations and reflections.
+ROTATIONS = [(1, 0, 0, 1), (0, -1, 1, 0), (-1, 0, 0, -1), (0, 1, -1, 0)]
+REFLECTIONS = [(-1, 0, 0, 1), (1, 0, 0, -1), (0, 1, 1, 0), (0, -1, -1, 0)]
+
+# neighbor symbols with a displacement in the plane.
+MOORE_SYMBOLS = [symbol for symbol in NEIGHBOR_SYMBOLS if symbol != 'G']
+
+def grid_permutations(grid, linear_maps=ROTATIONS[:1]):
+  '''Returns the distinct permutations (lists of cell ids, identity first) of the inside cells of a
+     GridTopology induced by affine maps with the given linear parts that preserve neighbors.'''
+  if not isinstance(grid, GridTopology):
+    raise ValueError('Symmetries need a GridTopology from build_grid.')
+  positions, index, equivalence = grid.positions, grid.index, grid.root.equivalence
+  cells = [cell for cell in range(len(grid)) if not grid.is_outside(cell)]
+  if not cells:
+    return []
+  inside = set(cells)
+  moore = [grid.column(symbol)[0] for symbol in MOORE_SYMBOLS]
+  successors = grid.column('G')[0]
+
+  def neighbors(cell):
+    return Counter(ids[cell] if ids[cell] in inside else None for ids in moore)
+
+  i0, j0, t0 = positions[cells[0]]
+  permutations = []
+  seen = set()
+  for a, b, c, d in linear_maps:
+    # the first cell must map to some inside cell of the same generation
+    for target in cells:
+      it, jt, tt = positions[target]
+      if tt != t0:
+        continue
+      di, dj = it - a * i0 - b * j0, jt - c * i0 - d * j0
+      image = {}
+      for cell in cells:
+        i, j, t = positions[cell]
+        ie, je, _ = equivalence.to_equivalent(a * i + b * j + di, c * i + d * j + dj)
+        mapped = index.get((ie, je, t))
+        if mapped is None or mapped not in inside:
+          break
+        image[cell] = mapped
+      else:
+        if (len(set(image.values())) == len(cells) and
+            all(image.get(successors[cell]) == successors[image[cell]] for cell in cells) and
+            all(Counter(image.get(x, x) for x in neighbors(cell).elements()) ==
+                neighbors(image[cell]) for cell in cells)):
+          permutation = tuple(image[cell] if cell in image else cell for cell in range(len(grid)))
+          if permutation not in seen:
+            seen.add(permutation)
+            permutations.append(permutation)
+  permutations.sort(key=lambda p: p != tuple(range(len(grid))))
+  return permutations
+
+def grid_symmetries(grid, rotations=False):
+  '''Returns maps of cell names to cell names for the symmetries of a grid: translations (such as
+     those of a Toroidal grid), and also rotations and reflections if requested (valid for
+     isotropic rules). The identity comes first.'''
+  linear_maps = ROTATIONS + REFLECTIONS if rotations else ROTATIONS[:1]
+  names = grid.names()
+  return [{names[cell]: names[mapped] for cell, mapped in enumerate(permutation) if cell != mapped}
+          for permutation in grid_permutations(grid, linear_maps)]
+
+def map_name(name, symmetry):
+  '''Maps a variable name by a symmetry, including helper variables (stator$c_0_0_0) and tag bits
+     (c_0_0_0#1). Other variables are unchanged.'''
+  head, separator, cell = name.rpartition('$')
+  cell, hash_separator, bit = cell.partition('#')
+  mapped = symmetry.get(cell)
+  if mapped is None:
+    return name
+  return head + separator + mapped + hash_separator + bit
+
+def map_literal(literal, symmetry):
+  return Literal(map_name(literal.name, symmetry), literal.value, literal.tag)
+
+def orbit(values, symmetries):
+  '''Returns the distinct images of a set of (name, value) pairs under each symmetry.'''
+  return set(frozenset((map_name(name, symmetry), value) for name, value in values)
+             for symmetry in symmetries)
+
+def canonical_form(values, symmetries):
+  '''Returns a canonical (least sorted) representative of the orbit of (name, value) pairs.'''
+  return min(tuple(sorted(image)) for image in orbit(values, symmetries))
+
+def compose(first, second):
+  '''Returns the permutation applying first and then second.'''
+  return tuple(second[x] for x in first)
+
+def generators(permutations):
+  '''Returns a subset of (non-identity) permutations that generates the same group.'''
+  identity = tuple(range(len(permutations[0])))
+  chosen = []
+  generated = set([identity])
+  for permutation in permutations:
+    if permutation not in generated:
+      chosen.append(permutation)
+      # close the group under the chosen generators
+      frontier = list(generated)
+      while frontier:
+        element = frontier.pop()
+        for generator in chosen:
+          product = compose(element, generator)
+          if product not in generated:
+            generated.add(product)
+            frontier.append(product)
+  return chosen
+
+def lex_leader(literals, images, max_length=None):
+  '''Makes clauses requiring literals to be lexicographically no greater (false before true) than
+     their images under a permutation, using a chain of temporary variables where p(i) means
+     the first i are equal. Only the first max_length moved literals are used if given.'''
+  clauses = []
+  previous = None
+  moved = [(x, y) for x, y in zip(literals, images) if x != y]
+  if max_length is not None:
+    moved = moved[:max_length]
+  for k, (x, y) in enumerate(moved):
+    guard = [] if previous is None else [~previous]
+    clauses.append(tuple(guard + [~x, y]))
+    if k == len(moved) - 1:
+      break
+    equal = nextvar()
+    clauses.append(tuple(guard + [~x, equal]))
+    clauses.append(tuple(guard + [y, equal]))
+    previous = equal
+  return clauses
+
+def lex_leader_clauses(grid, strength='full', rotations=False, generation=0, max_length=None):
+  '''Makes lex-leader clauses on a generation for the symmetries of a grid, using every symmetry
+     ('full'), a generating set ('generators') or its first k generators.'''
+  linear_maps = ROTATIONS + REFLECTIONS if rotations else ROTATIONS[:1]
+  permutations = grid_permutations(grid, linear_maps)[1:]
+  if strength != 'full' and permutations:
+    permutations = generators(permutations)
+    if strength != 'generators':
+      permutations = permutations[:strength]
+  names = grid.names()
+  cells = grid.layer(generation)
+  literals = [Literal(names[cell]) for cell in cells]
+  clauses = ['Lex-leader symmetry breaking for %d symmetries' % len(permutations)]
+  for permutation in permutations:
+    images = [Literal(names[permutation[cell]]) for cell in cells]
+    clauses.extend(lex_leader(literals, images, max_length))
+  return clauses
@@ -0,0 +1,301 @@
+from collections import defaultdict
+from .cnf import CNF
+
+# largest number of binary implication roots probed for failed literals
+MAX_PROBES = 20000
+
+# largest number of occurrences of either sign for a variable to be eliminated
+MAX_OCCURRENCES = 16
+
+# largest resolvent kept when eliminating a variable
+MAX_RESOLVENT_SIZE = 24
+
+class Preprocessor(object):
+  '''Simplifies the integer clauses of a CNF, keeping a reconstruction stack of each step.'''
+  def __init__(self, cnf, frozen=()):
+    self.symbols = cnf.symbols
+    self.frozen = set()
+    for name in frozen:
+      ix = name if isinstance(name, int) else self.symbols.find(name)
+      if ix is not None:
+        self.frozen.add(abs(ix))
+    self.clauses = []
+    self.index = {}
+    self.occurs = defaultdict(set)
+    self.value = {}
+    self.pending = []
+    self.stack = []
+    self.unsat = False
+    self.units = self.failed = self.equivalent = self.eliminated = 0
+    for clause in cnf:
+      self.add_clause(clause)
+
+  def is_true(self, lit):
+    value = self.value.get(abs(lit))
+    return value is not None and value == (lit > 0)
+
+  def add_clause(self, clause):
+    '''Adds a clause without false literals unless it is satisfied, always true or present.'''
+    lits = set()
+    for lit in clause:
+      value = self.value.get(abs(lit))
+      if value is None:
+        lits.add(lit)
+      elif value == (lit > 0):
+        return
+    if any(-lit in lits for lit in lits):
+      return
+    clause = tuple(sorted(lits, key=abs))
+    if not clause:
+      self.unsat = True
+    elif len(clause) == 1:
+      self.pending.append(clause[0])
+    elif clause not in self.index:
+      k = self.index[clause] = len(self.clauses)
+      self.clauses.append(clause)
+      for lit in clause:
+        self.occurs[lit].add(k)
+
+  def remove_clause(self, k):
+    clause = self.clauses[k]
+    self.clauses[k] = None
+    del self.index[clause]
+    for lit in clause:
+      self.occurs[lit].discard(k)
+    return clause
+
+  def propagate(self):
+    '''Assigns queued units, returning False on a conflict.'''
+    while self.pending and not self.unsat:
+      lit = self.pending.pop()
+      value = self.value.get(abs(lit))
+      if value is not None:
+        if value != (lit > 0):
+          self.unsat = True
+        continue
+      self.value[abs(lit)] = lit > 0
+      self.stack.append(('u', lit))
+      self.units += 1
+      for k in list(self.occurs[lit]):
+        self.remove_clause(k)
+      for k in list(self.occurs[-lit]):
+        self.add_clause(self.remove_clause(k))
+    return not self.unsat
+
+  def implied(self, lit):
+    '''Returns the set of literals that unit propagation of lit implies, or None on a conflict.'''
+    assigned = set([lit])
+    queue = [lit]
+    while queue:
+      for k in self.occurs[-queue.pop()]:
+        unknown = None
+        for x in self.clauses[k]:
+          if x in assigned or self.is_true(x):
+            break
+          if -x not in assigned:
+            if unknown is not None:
+              break
+            unknown = x
+        else:
+          if unknown is None:
+            return None
+          assigned.add(unknown)
+          queue.append(unknown)
+    return assigned
+
+  def probe(self):
+    '''Assigns the negation of each failed literal among the roots of binary clauses.'''
+    roots = set()
+    for clause in self.clauses:
+      if clause is not None and len(clause) == 2:
+        roots.update(-lit for lit in clause)
+    for lit in sorted(roots, key=abs)[:MAX_PROBES]:
+      if abs(lit) in self.value:
+        continue
+      if self.implied(lit) is None:
+        self.failed += 1
+        self.pending.append(-lit)
+        if not self.propagate():
+          return
+
+  def equivalences(self):
+    '''Maps variables equivalent in the binary implication graph to a representative literal.'''
+    edges = defaultdict(list)
+    for clause in self.clauses:
+      if clause is not None and len(clause) == 2:
+        a, b = clause
+        edges[-a].append(b)
+        edges[-b].append(a)
+    # iterative Tarjan's algorithm
+    index, low, on_stack = {}, {}, set()
+    stack, components = [], []
+    for root in sorted(edges, key=abs):
+      if root in index:
+        continue
+      work = [(root, 0)]
+      while work:
+        node, i = work.pop()
+        if i == 0:
+          index[node] = low[node] = len(index)
+          stack.append(node)
+          on_stack.add(node)
+        targets = edges.get(node, ())
+        while i < len(targets) and targets[i] in index:
+          if targets[i] in on_stack:
+            low[node] = min(low[node], index[targets[i]])
+          i += 1
+        if i < len(targets):
+          work.append((node, i + 1))
+          work.append((targets[i], 0))
+          continue
+        if low[node] == index[node]:
+          component = []
+          while True:
+            lit = stack.pop()
+            on_stack.discard(lit)
+            component.append(lit)
+            if lit == node:
+              break
+          components.append(component)
+        if work:
+          parent = work[-1][0]
+          low[parent] = min(low[parent], low[node])
+    substitutes = {}
+    for component in components:
+      if len(component) < 2:
+        continue
+      if any(-lit in component for lit in component):
+        self.unsat = True
+        return {}
+      rep = min(component, key=lambda lit: (abs(lit) not in self.frozen, abs(lit)))
+      for lit in component:
+        if lit != rep and abs(lit) not in self.frozen and abs(lit) not in substitutes:
+          substitutes[abs(lit)] = rep if lit > 0 else -rep
+    return substitutes
+
+  def substitute(self):
+    '''Replaces equivalent literals by their representatives.'''
+    substitutes = self.equivalences()
+    for var, rep in sorted(substitutes.items()):
+      self.stack.append(('e', var, rep))
+      self.equivalent += 1
+      for lit in (var, -var):
+        for k in list(self.occurs[lit]):
+          clause = self.remove_clause(k)
+          self.add_clause([(rep if x > 0 else -rep) if abs(x) == var else x for x in clause])
+    # units found while substituting may be on substituted variables
+    self.pending = [(lit // abs(lit)) * substitutes.get(abs(lit), abs(lit)) for lit in self.pending]
+    self.propagate()
+
+  def eliminate(self):
+    '''Eliminates variables by resolution where the resolvents do not add clauses.'''
+    variables = set(abs(lit) for lit, ks in self.occurs.items() if ks)
+    candidates = sorted(variables.difference(self.frozen),
+                        key=lambda var: (len(self.occurs[var]) * len(self.occurs[-var]), var))
+    for var in candidates:
+      if self.unsat:
+        return
+      positive, negative = list(self.occurs[var]), list(self.occurs[-var])
+      if not positive and not negative:
+        continue
+      if var in self.value or len(positive) > MAX_OCCURRENCES or len(negative) > MAX_OCCURRENCES:
+        continue
+      resolvents = self.resolvents(var, positive, negative)
+      if resolvents is None or len(resolvents) > len(positive) + len(negative):
+        continue
+      for lit, ks in ((var, positive), (-var, negative)):
+        for k in ks:
+          clause = self.remove_clause(k)
+          self.stack.append(('x', (lit,) + tuple(x for x in clause if x != lit)))
+      self.eliminated += 1
+      for resolvent in resolvents:
+        self.add_clause(resolvent)
+      self.propagate()
+
+  def resolvents(self, var, positive, negative):
+    '''Returns the resolvents on var that are not always true, or None if any is too long.'''
+    resolvents = []
+    for p in positive:
+      for n in negative:
+        resolvent = set(self.clauses[p]).union(self.clauses[n])
+        resolvent.discard(var)
+        resolvent.discard(-var)
+        if any(-lit in resolvent for lit in resolvent):
+          continue
+        if len(resolvent) > MAX_RESOLVENT_SIZE:
+          return None
+        resolvents.append(resolvent)
+    return resolvents
+
+  def run(self, probe=True, substitute=True, eliminate=True):
+    '''Applies each enabled technique after propagating units. Returns self.'''
+    self.propagate()
+    if probe and not self.unsat:
+      self.probe()
+    if substitute and not self.unsat:
+      self.substitute()
+    if eliminate and not self.unsat:
+      self.eliminate()
+    return self
+
+  def to_cnf(self, reductions=None, before=None):
+    '''Returns a CNF of the remaining clauses, adding the reductions from before if given.'''
+    res = CNF(self.symbols)
+    res.add_comment(str(self))
+    if self.unsat:
+      res.add_clause(())
+    else:
+      for var in sorted(self.frozen.intersection(self.value)):
+        res.add_clause((var if self.value[var] else -var,))
+      for clause in self.clauses:
+        if clause is not None:
+          res.add_clause(clause)
+    if reductions is not None and before is not None:
+      reductions.add(before, res)
+    return res
+
+  def __str__(self):
+    return ('Preprocessed: %d units, %d failed literals, %d equivalent variables, '
+            '%d eliminated variables%s.' % (self.units, self.failed, self.equivalent,
+                                            self.eliminated, ', unsatisfiable' if self.unsat else ''))
+
+def preprocess(cnf, frozen=(), reductions=None):
+  '''Preprocesses a CNF, returning the simplified CNF and its reconstruction stack.'''
+  preprocessor = Preprocessor(cnf, frozen).run()
+  return preprocessor.to_cnf(reductions, cnf), preprocessor.stack
+
+def write_reconstruction(stack, out):
+  '''Writes a reconstruction stack, one step per line.'''
+  for step in stack:
+    if step[0] == 'x':
+      out.write('x %s\n' % ' '.join(map(str, step[1])))
+    else:
+      out.write('%s\n' % ' '.join(map(str, step)))
+
+def read_reconstruction(inp):
+  '''Reads a reconstruction stack written by write_reconstruction.'''
+  stack = []
+  for line in inp:
+    toks = line.split()
+    if not toks:
+      continue
+    lits = tuple(int(x) for x in toks[1:])
+    stack.append(('x', lits) if toks[0] == 'x' else (toks[0],) + lits)
+  return stack
+
+def reconstruct(stack, values):
+  '''Extends signed integer values solving preprocessed clauses to the original clauses.'''
+  values = list(values)
+  if not stack or not values:
+    return values
+  assignment = {abs(lit): lit > 0 for lit in values}
+  def is_true(lit):
+    return assignment.get(abs(lit), False) == (lit > 0)
+  for step in reversed(stack):
+    if step[0] == 'u':
+      assignment[abs(step[1])] = step[1] > 0
+    elif step[0] == 'e':
+      assignment[step[1]] = is_true(step[2])
+    elif not any(is_true(lit) for lit in step[1][1:]):
+      assignment[abs(step[1][0])] = step[1][0] > 0
+  return [var if value else -var for var, value in sorted(assignment.items())]
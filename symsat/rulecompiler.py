@@ -0,0 +1,160 @@
+import hashlib
+import os
+from .clausebuilder import Literal
+from .rulesymmetry import rule_template
+from .symbolic_util import CACHE_DIR, is_comment, read_template, write_template
+
+# template symbols of a Moore neighborhood rule, giving bit k of a truth table row to symbol k.
+MOORE_TEMPLATE_SYMBOLS = ['O', 'N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW', 'G']
+
+# largest number of symbols for a truth table (2**16 rows)
+MAX_SYMBOLS = 16
+
+# compiled rules by symbols and truth table
+COMPILED = {}
+
+def totalistic_table(birth, survival, symbols=MOORE_TEMPLATE_SYMBOLS):
+  '''Makes the truth table (an integer with bit m set if row m is allowed) of a totalistic rule,
+     where the first symbol is the cell, the last its next generation and the rest neighbors.'''
+  n = len(symbols)
+  table = 0
+  for row in range(1 << n):
+    alive = row & 1
+    count = bin(row & ((1 << (n - 1)) - 2)).count('1')
+    if bool(row >> (n - 1)) == (count in (survival if alive else birth)):
+      table |= 1 << row
+  return table
+
+def template_symbols(clauses):
+  '''Returns the symbols of template clauses, with Moore symbols first in the usual order.'''
+  names = set(literal.name for clause in clauses if not is_comment(clause) for literal in clause)
+  return ([symbol for symbol in MOORE_TEMPLATE_SYMBOLS if symbol in names] +
+          sorted(names.difference(MOORE_TEMPLATE_SYMBOLS)))
+
+def truth_table(clauses, symbols):
+  '''Makes the truth table of template clauses over symbols: bit m is set if the assignment
+     giving symbol k the value of bit k of m satisfies every clause.'''
+  if len(symbols) > MAX_SYMBOLS:
+    raise ValueError('Too many symbols (%d) for a truth table.' % len(symbols))
+  bit = {symbol: 1 << k for k, symbol in enumerate(symbols)}
+  rows = 1 << len(symbols)
+  table = (1 << rows) - 1
+  for clause in clauses:
+    if is_comment(clause):
+      continue
+    care = falsified = 0
+    for literal in clause:
+      if not literal.is_bool() or literal.name not in bit:
+        raise ValueError('Cannot make a truth table with literal %s.' % literal)
+      care |= bit[literal.name]
+      if not literal.value:
+        falsified |= bit[literal.name]
+    for row in range(rows):
+      if row & care == falsified:
+        table &= ~(1 << row)
+  return table
+
+def prime_implicates(table, n):
+  '''Finds the prime implicates of a truth table by Quine-McCluskey merging of its false rows,
+     as cubes (values, care) where care has a bit for each symbol that is fixed.'''
+  full = (1 << n) - 1
+  cubes = set((row, full) for row in range(1 << n) if not (table >> row) & 1)
+  primes = []
+  while cubes:
+    merged = set()
+    used = set()
+    for values, care in cubes:
+      for k in range(n):
+        flip = 1 << k
+        if care & flip and (values & flip) == 0 and (values | flip, care) in cubes:
+          merged.add((values, care & ~flip))
+          used.add((values, care))
+          used.add((values | flip, care))
+    primes.extend(sorted(cubes.difference(used)))
+    cubes = merged
+  return primes
+
+def cube_rows(cube, n):
+  '''Returns the rows covered by a cube.'''
+  values, care = cube
+  free = [1 << k for k in range(n) if not care & (1 << k)]
+  rows = []
+  for choice in range(1 << len(free)):
+    row = values
+    for j, flip in enumerate(free):
+      if (choice >> j) & 1:
+        row |= flip
+    rows.append(row)
+  return rows
+
+def minimize_table(table, n):
+  '''Chooses prime implicates covering the false rows of a truth table: essential ones first,
+     then greedily the one covering the most uncovered rows (ties to fewer literals), finally
+     dropping any that the others cover. Returns cubes as (values, care).'''
+  primes = prime_implicates(table, n)
+  covers = [set(cube_rows(cube, n)) for cube in primes]
+  by_row = {}
+  for k, rows in enumerate(covers):
+    for row in rows:
+      by_row.setdefault(row, []).append(k)
+  chosen = sorted(set(ks[0] for ks in by_row.values() if len(ks) == 1))
+  uncovered = set(by_row)
+  for k in chosen:
+    uncovered.difference_update(covers[k])
+  while uncovered:
+    k = max(range(len(primes)),
+            key=lambda k: (len(covers[k] & uncovered), -bin(primes[k][1]).count('1'), -k))
+    chosen.append(k)
+    uncovered.difference_update(covers[k])
+  for k in reversed(list(chosen)):
+    others = set()
+    for j in chosen:
+      if j != k:
+        others.update(covers[j])
+    if covers[k] <= others:
+      chosen.remove(k)
+  return [primes[k] for k in sorted(chosen)]
+
+def cube_clause(cube, symbols):
+  '''Converts a cube of false rows to the clause excluding it.'''
+  values, care = cube
+  return tuple(Literal(symbol, not (values >> k) & 1)
+               for k, symbol in enumerate(symbols) if (care >> k) & 1)
+
+def cache_path(symbols, table):
+  key = hashlib.sha1(('%s:%x' % (' '.join(symbols), table)).encode()).hexdigest()
+  return os.path.join(CACHE_DIR, 'rule-%s.sym' % key)
+
+def compile_table(table, symbols, consequent='G', cache=True):
+  '''Compiles a truth table over symbols to a minimized list of template clauses, which are kept
+     for the process and (if cache) on disk in CACHE_DIR.'''
+  key = (tuple(symbols), table)
+  clauses = COMPILED.get(key)
+  if clauses is not None:
+    return list(clauses)
+  path = cache_path(symbols, table)
+  if cache and os.path.exists(path):
+    clauses = read_template(path)
+  else:
+    clauses = [cube_clause(cube, symbols) for cube in minimize_table(table, len(symbols))]
+    if cache:
+      try:
+        write_template(clauses, path, consequent)
+      except OSError:
+        pass
+  COMPILED[key] = clauses
+  return list(clauses)
+
+def compile_rule(rule, symbols=None, consequent='G', cache=True):
+  '''Compiles a rule, either a rulestring (see rulesymmetry.parse_rulestring) or template clauses,
+     to a minimal or near-minimal list of template clauses allowing the same assignments, for use
+     in place of hand-written (and symmetry-expanded) templates with inflate_grid_template.'''
+  if isinstance(rule, str):
+    comment = 'Compiled rule %s' % rule
+    rule = rule_template(rule, cache)
+  else:
+    comment = None
+  symbols = symbols or template_symbols(rule)
+  table = truth_table(rule, symbols)
+  return [comment or 'Compiled template over %s' % ' '.join(symbols)] + compile_table(
+      table, symbols, consequent, cache)
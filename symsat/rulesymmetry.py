@@ -1,5 +1,8 @@
+import hashlib
+import os
+import re
 from .clausebuilder import Literal, to_pairs, from_pairs
-from .symbolic_util import is_comment, parse_line
+from .symbolic_util import CACHE_DIR, is_comment, parse_line, read_template, write_template
 
 def to_mapping(cycles):
   '''Convert a list of cycles into a permutation mapping.'''
@@ -10,31 +13,66 @@ def to_mapping(cycles):
       permutation[str(cycle[i])] = str(cycle[(i + 1) % n])
   return permutation
 
-class Labeling(object):
-  def __init__(self, pairs):
-    self.pairs = tuple(pairs)
-    self.canonical = tuple(sorted(pairs))
+# largest group whose elements are listed and applied directly rather than by an orbit search
+MAX_GROUP_ELEMENTS = 1024
 
-  def __hash__(self):
-    return hash(self.canonical)
+class SymmetryGroup(object):
+  '''Group of permutations of symbols generated by a basis of permutations (as dictionaries).
+     Elements are listed if there are at most MAX_GROUP_ELEMENTS; larger groups (such as the
+     40320 of TOTALISTIC) find orbits by breadth-first search with the generators instead.'''
+  def __init__(self, basis):
+    self.generators = [{v: k for k, v in permutation.items()} for permutation in basis]
+    self.symbols = sorted(set(symbol for permutation in basis for symbol in permutation))
+    self.elements = self.enumerate(MAX_GROUP_ELEMENTS)
 
-  def __eq__(self, other):
-    return self.canonical == other.canonical
+  def enumerate(self, limit):
+    '''Returns the elements as dictionaries (identity first) or None if there are more than limit.'''
+    identity = tuple(self.symbols)
+    seen = set([identity])
+    elements = [identity]
+    for element in elements:
+      for generator in self.generators:
+        product = tuple(generator.get(x, x) for x in element)
+        if product not in seen:
+          if len(elements) == limit:
+            return None
+          seen.add(product)
+          elements.append(product)
+    return [dict(zip(self.symbols, element)) for element in elements]
+
+  def orbit(self, labeling):
+    '''Returns the distinct images of a labeling (tuple of symbol, value pairs), sorted, each
+       with its pairs in the order of the labeling.'''
+    images = {tuple(sorted(labeling)): tuple(labeling)}
+    if self.elements is not None:
+      for element in self.elements:
+        image = tuple((element.get(symbol, symbol), value) for symbol, value in labeling)
+        images.setdefault(tuple(sorted(image)), image)
+    else:
+      queue = [tuple(labeling)]
+      for current in queue:
+        for generator in self.generators:
+          image = tuple((generator.get(symbol, symbol), value) for symbol, value in current)
+          key = tuple(sorted(image))
+          if key not in images:
+            images[key] = image
+            queue.append(image)
+    return sorted(images.values())
+
+# symmetry groups by basis
+GROUPS = {}
+
+def symmetry_group(basis):
+  '''Returns the group generated by a basis, made once per basis.'''
+  key = tuple(tuple(sorted(permutation.items())) for permutation in basis)
+  group = GROUPS.get(key)
+  if group is None:
+    group = GROUPS[key] = SymmetryGroup(basis)
+  return group
 
 def find_closure(basis, labeling):
   '''Find the closure of a basis of basis applied to a labeling.'''
-  all_labelings = set([Labeling(labeling)])
-  si_PERMe_was = 0
-  inverses = [{v: k for k, v in permutation.items()} for permutation in basis]
-  while si_PERMe_was < len(all_labelings):
-    si_PERMe_was = len(all_labelings)
-    for labeling in list(all_labelings):
-      for mapping in inverses:
-        new_labeling = []
-        for from_symbol, to_symbol in labeling.pairs:
-          new_labeling.append((mapping.get(from_symbol, from_symbol), to_symbol))
-        all_labelings.add(Labeling(new_labeling))
-  return sorted([labeling.pairs for labeling in all_labelings])
+  return symmetry_group(basis).orbit(labeling)
 
 # center cell original value and after rule generation
 O = Literal('O')
@@ -72,14 +110,143 @@ def all_symmetries(symmetry, literals):
 
 def expand_symmetry(symmetry, literal_tuples):
   '''Expands a list of literal tuples by given symmetry.'''
-  expanded = []
+  return list(iter_expand_symmetry(symmetry, literal_tuples))
+
+def iter_expand_symmetry(symmetry, literal_tuples):
+  '''Generates the expansion of literal tuples by given symmetry.'''
   for clause in literal_tuples:
     if is_comment(clause):
-      expanded.append(clause)
+      yield clause
     else:
-      expanded.extend(all_symmetries(symmetry, clause))
-  return expanded
+      for permuted in all_symmetries(symmetry, clause):
+        yield permuted
 
 def to_conjunction(literals):
   '''Wraps each literal in a list in a singleton tuple to make it a conjunction of literal_tuples.'''
   return [(x,) for x in literals]
+
+# Neighbors of Moore and hexagonal rules, in the order used for representatives of counts.
+MOORE_NEIGHBORS = [N, NE, E, SE, S, SW, W, NW]
+HEX_NEIGHBORS = [NW, N, E, SE, S, W]
+
+# Hensel notation for isotropic rules: bit values of the neighbors in a 3x3 block read by rows
+# (16 is the center), and the configuration with each count and letter.
+HENSEL_BITS = {'NW': 1, 'N': 2, 'NE': 4, 'W': 8, 'E': 32, 'SW': 64, 'S': 128, 'SE': 256}
+HENSEL_LETTERS = {
+  0: {'': 0},
+  1: dict(zip('ce', (1, 2))),
+  2: dict(zip('ceaikn', (5, 10, 3, 40, 33, 68))),
+  3: dict(zip('ceaiknjqry', (69, 42, 11, 7, 98, 13, 14, 70, 41, 97))),
+  4: dict(zip('ceaiknjqrytwz', (325, 170, 15, 45, 99, 71, 106, 102, 43, 101, 105, 78, 108))),
+}
+# counts above 4 are the complements of those below, with the same letters
+for count in range(5, 9):
+  HENSEL_LETTERS[count] = {letter: 495 - bits for letter, bits in HENSEL_LETTERS[8 - count].items()}
+
+# Symmetry bases by name, for the kinds of rulestring
+RULE_BASES = {'TOTALISTIC': TOTALISTIC, 'TOTALISTIC_HEX': TOTALISTIC_HEX,
+              'ROTATED_FLIPPED': ROTATED_FLIPPED}
+
+RULESTRING_RE = re.compile(r'^[Bb]([0-8a-z-]*)/?[Ss]([0-8a-z-]*)([Hh]?)$')
+HENSEL_RE = re.compile(r'([0-8])(-?)([a-z]*)')
+
+# rule templates by canonical rulestring and basis
+RULE_TEMPLATES = {}
+
+class Rule(object):
+  '''A parsed B/S rulestring: the symmetry basis (by name), neighbors, and the birth and survival
+     conditions, each a set of counts or (for Hensel notation) of (count, letter) pairs.'''
+  def __init__(self, basis, neighbors, birth, survival):
+    self.basis = basis
+    self.neighbors = neighbors
+    self.birth = birth
+    self.survival = survival
+
+  def conditions(self):
+    '''Returns every condition (count or (count, letter)) that the rule can distinguish.'''
+    if self.basis == 'ROTATED_FLIPPED':
+      return [(count, letter) for count in range(9) for letter in sorted(HENSEL_LETTERS[count])]
+    return list(range(len(self.neighbors) + 1))
+
+  def representative(self, condition):
+    '''Returns the neighbors that are on in one configuration meeting a condition.'''
+    if self.basis == 'ROTATED_FLIPPED':
+      count, letter = condition
+      bits = HENSEL_LETTERS[count][letter]
+      return set(x for x in self.neighbors if bits & HENSEL_BITS[x.name])
+    return set(self.neighbors[:condition])
+
+  def __str__(self):
+    def part(conditions):
+      if self.basis != 'ROTATED_FLIPPED':
+        return ''.join(map(str, sorted(conditions)))
+      res = ''
+      for count in range(9):
+        letters = sorted(letter for c, letter in conditions if c == count)
+        if letters:
+          res += str(count) + ('' if len(letters) == len(HENSEL_LETTERS[count]) else ''.join(letters))
+      return res
+    return 'B%s/S%s%s' % (part(self.birth), part(self.survival),
+                          'H' if self.basis == 'TOTALISTIC_HEX' else '')
+
+def parse_hensel(text):
+  '''Parses the conditions of one half of an isotropic rulestring, e.g. 2-a3 or 2ae3.'''
+  conditions = set()
+  for count, negate, letters in HENSEL_RE.findall(text):
+    count = int(count)
+    known = HENSEL_LETTERS[count]
+    if any(letter not in known for letter in letters):
+      raise ValueError('Unknown letters %s for %d neighbors.' % (letters, count))
+    chosen = set(known) if not letters or negate else set()
+    chosen = chosen.difference(letters) if negate else chosen.union(letters)
+    conditions.update((count, letter) for letter in chosen)
+  return conditions
+
+def parse_rulestring(rulestring):
+  '''Parses a B/S rulestring: outer totalistic Moore (B3/S23), hexagonal (B2/S34H), or isotropic
+     in Hensel notation (B2-a/S12). Returns a Rule.'''
+  m = RULESTRING_RE.match(rulestring.strip().replace(' ', ''))
+  if not m:
+    raise ValueError('Cannot parse %s as a B/S rulestring.' % rulestring)
+  birth, survival, hexagonal = m.groups()
+  if hexagonal:
+    if not re.match('^[0-6]*$', birth + survival):
+      raise ValueError('Hexagonal rulestring %s has more than 6 neighbors.' % rulestring)
+    return Rule('TOTALISTIC_HEX', HEX_NEIGHBORS, set(map(int, birth)), set(map(int, survival)))
+  if re.match('^[0-8]*$', birth + survival):
+    return Rule('TOTALISTIC', MOORE_NEIGHBORS, set(map(int, birth)), set(map(int, survival)))
+  if not HENSEL_RE.sub('', birth) == HENSEL_RE.sub('', survival) == '':
+    raise ValueError('Cannot parse %s as a B/S rulestring.' % rulestring)
+  return Rule('ROTATED_FLIPPED', MOORE_NEIGHBORS, parse_hensel(birth), parse_hensel(survival))
+
+def rule_template(rulestring, cache=True):
+  '''Makes template clauses for a rulestring (see parse_rulestring), cached for the process and
+     (if cache) on disk.'''
+  rule = parse_rulestring(rulestring)
+  key = str(rule)
+  clauses = RULE_TEMPLATES.get((key, rule.basis))
+  if clauses is not None:
+    return list(clauses)
+  path = os.path.join(CACHE_DIR, 'template-%s.sym' % hashlib.sha1(
+      ('%s:%s' % (key, rule.basis)).encode()).hexdigest())
+  if cache and os.path.exists(path):
+    clauses = read_template(path)
+  else:
+    templates = []
+    for condition in rule.conditions():
+      alive = rule.representative(condition)
+      neighbors = [~x if x in alive else x for x in rule.neighbors]
+      born, survives = condition in rule.birth, condition in rule.survival
+      if born == survives:
+        templates.append(tuple([G if born else ~G] + neighbors))
+      else:
+        templates.append(tuple([G if born else ~G, O] + neighbors))
+        templates.append(tuple([G if survives else ~G, ~O] + neighbors))
+    clauses = ['Rule %s' % key] + expand_symmetry(RULE_BASES[rule.basis], templates)
+    if cache:
+      try:
+        write_template(clauses, path, G.name)
+      except OSError:
+        pass
+  RULE_TEMPLATES[(key, rule.basis)] = clauses
+  return list(clauses)
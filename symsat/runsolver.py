@@ -7,14 +7,15 @@ def solve_and_print(input_file, echo=False, showall=False, seed=None):
   input_root = os.path.splitext(input_file)[0]
   dimacs_file = input_root + '.dim'
   solution_file = input_root + '.out'
+  variable_file = dimacs_file + '.var'
 
   # read clause from input
   with open(input_file) as inp:
     clauses = [parse_line(line) for line in inp]
 
   # write dimacs file for solver
-  with open(dimacs_file, 'w') as out:
-    output_dimacs(clauses, out)
+  with open(dimacs_file, 'w') as out, open(variable_file, 'w') as variable_map:
+    output_dimacs(clauses, out, variable_map, comment_variables=False)
 
   # solve and print results
   results = solve(dimacs_file, solution_file, seed, echo)
@@ -1,5 +1,25 @@
+import itertools
 import os
-from .dimacs_sat import load_results
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from .clausebuilder import Totalizer
+from .cnf import CNF
+from .dimacs_sat import (append_dimacs, decode_values, load_values, output_dimacs,
+                         read_variable_map, read_variable_names)
+from .gridsymmetry import orbit
+from .tags import is_auxiliary
+
+try:
+  import resource
+except ImportError:
+  resource = None
 
 # Dictionary of solvers by name to command (usually same as name) and whether --seed option works.
 SOLVERS = {
@@ -8,33 +28,478 @@ SOLVERS = {
   'lingeling': ('lingeling', True)
 }
 
+# Python program setting a memory limit (bytes) and then running a command, so the limit is set in
+# the child without running Python code between fork and exec (unsafe in a threaded process).
+LIMIT_MEMORY = ('import os, resource, sys; limit = int(sys.argv[1]); '
+                'resource.setrlimit(resource.RLIMIT_AS, (limit, limit)); '
+                'os.execvp(sys.argv[2], sys.argv[2:])')
+
+# Exit codes used by SAT competition solvers.
+EXIT_SAT = 10
+EXIT_UNSAT = 20
+
+# Status of a solver run.
+SAT = 'SAT'
+UNSAT = 'UNSAT'
+UNKNOWN = 'UNKNOWN'
+TIMEOUT = 'TIMEOUT'
+CANCELLED = 'CANCELLED'
+
 def set_solver(solver):
   global COMMAND
   global SUPPORTS_SEED
 
   COMMAND, SUPPORTS_SEED = SOLVERS[solver]
 
-def run_solver(input_file, solution_file, seed=None, echo=False):
-  '''Run the solver (assumed to be lingeling and echo and write solution file).'''
-  with open(solution_file, 'w') as solution:
-    args = '--seed=%s ' % seed if seed is not None and SUPPORTS_SEED else ''
-    cmd = COMMAND + ' ' + args + input_file
-    if echo:
-      print('Running %s' % cmd)
-      print('Writing output to %s' % solution_file)
-    solver = os.popen(cmd)
-    while True:
-      line = solver.readline()
-      if not line:
+def solver_args(input_file, seed=None, solver=None):
+  '''Returns the argument list to run a solver (by name, or the one set by set_solver) on a file,
+     or on standard input if input_file is None.'''
+  command, supports_seed = SOLVERS[solver] if solver is not None else (COMMAND, SUPPORTS_SEED)
+  args = [command]
+  if seed is not None and supports_seed:
+    args.append('--seed=%s' % seed)
+  if input_file is not None:
+    args.append(input_file)
+  return args
+
+class SolverResult(object):
+  '''Outcome of a solver run: status, exit code, values from v lines, and elapsed seconds.'''
+  def __init__(self, status, returncode, values, seconds):
+    self.status = status
+    self.returncode = returncode
+    self.values = values
+    self.seconds = seconds
+    self.configuration = None
+
+  def write(self, out):
+    '''Write the result in solver output format.'''
+    out.write('s %s\n' % {SAT: 'SATISFIABLE', UNSAT: 'UNSATISFIABLE'}.get(self.status, 'UNKNOWN'))
+    if self.status == SAT:
+      out.write('v %s 0\n' % ' '.join(map(str, self.values)))
+
+  def is_definitive(self):
+    return self.status in (SAT, UNSAT)
+
+  def __repr__(self):
+    return 'SolverResult(%s, %s, %d values, %.2fs)' % (
+        self.status, self.returncode, len(self.values), self.seconds)
+
+class SolverRun(object):
+  '''Runs a solver as a child process with an optional timeout (seconds) and memory limit (bytes).'''
+  def __init__(self, args, timeout=None, memory_limit=None, solution_file=None, echo=False,
+               feed=None):
+    self.args = args
+    self.timeout = timeout
+    self.memory_limit = memory_limit
+    self.solution_file = solution_file
+    self.echo = echo
+    self.feed = feed
+    self.process = None
+    self.stopped = None
+    self.lock = threading.Lock()
+
+  def start(self):
+    if self.echo:
+      print('Running %s' % ' '.join(self.args))
+    args = self.args
+    if self.memory_limit is not None:
+      if resource is None:
+        raise ValueError('Memory limits are not supported on this platform.')
+      args = [sys.executable, '-c', LIMIT_MEMORY, str(self.memory_limit)] + list(args)
+    self.started = time.time()
+    # run in its own process group (where supported) so wrapper scripts are killed with the solver
+    self.process = subprocess.Popen(args, stdout=subprocess.PIPE, universal_newlines=True,
+                                    stdin=subprocess.PIPE if self.feed else None,
+                                    start_new_session=hasattr(os, 'killpg'))
+    if self.feed:
+      writer = threading.Thread(target=self.write_input)
+      writer.daemon = True
+      writer.start()
+    return self
+
+  def write_input(self):
+    '''Writes the instance to the solver's standard input, stopping if the solver exits.'''
+    try:
+      self.feed(self.process.stdin)
+      self.process.stdin.close()
+    except (BrokenPipeError, OSError, ValueError):
+      pass
+
+  def stop(self, status=CANCELLED):
+    '''Kill the solver if it is still running, recording why.'''
+    with self.lock:
+      if self.process is not None and self.process.poll() is None and self.stopped is None:
+        self.stopped = status
+        try:
+          if hasattr(os, 'killpg'):
+            os.killpg(self.process.pid, signal.SIGKILL)
+          else:
+            self.process.kill()
+        except OSError:
+          pass
+
+  def cancel(self):
+    self.stop(CANCELLED)
+
+  def wait(self):
+    '''Read output until the solver exits and return a SolverResult.'''
+    if self.process is None:
+      self.start()
+    timer = None
+    if self.timeout is not None:
+      timer = threading.Timer(self.timeout, self.stop, (TIMEOUT,))
+      timer.daemon = True
+      timer.start()
+    solution = open(self.solution_file, 'w') if self.solution_file else None
+    if self.echo and solution:
+      print('Writing output to %s' % self.solution_file)
+    values = []
+    answer = None
+    try:
+      for line in self.process.stdout:
+        if self.echo:
+          print(line.strip())
+        if solution:
+          solution.write(line)
+        toks = line.split()
+        if not toks:
+          continue
+        if toks[0] == 'v':
+          values.extend(ix for ix in map(int, toks[1:]) if ix != 0)
+        elif toks[0] == 's':
+          answer = toks[1]
+      returncode = self.process.wait()
+    finally:
+      if timer is not None:
+        timer.cancel()
+      if solution:
+        solution.close()
+      self.process.stdout.close()
+
+    if self.stopped is not None:
+      status = self.stopped
+    elif returncode == EXIT_SAT or answer == 'SATISFIABLE':
+      status = SAT
+    elif returncode == EXIT_UNSAT or answer == 'UNSATISFIABLE':
+      status = UNSAT
+    else:
+      status = UNKNOWN
+    return SolverResult(status, returncode, values, time.time() - self.started)
+
+def run_solver(input_file, solution_file=None, seed=None, echo=False, timeout=None,
+               memory_limit=None, solver=None):
+  '''Run the solver (lingeling unless set otherwise), optionally echo and write solution file.'''
+  return SolverRun(solver_args(input_file, seed, solver), timeout, memory_limit,
+                   solution_file, echo).wait()
+
+# Count of portfolio wins by (solver, seed) configuration.
+PORTFOLIO_WINS = Counter()
+
+def portfolio(solvers=None, seeds=(None,)):
+  '''Returns (solver, seed) configurations for solvers (all by default) and seeds, using only the
+     first seed for solvers that do not support seeds.'''
+  configurations = []
+  for solver in sorted(SOLVERS) if solvers is None else solvers:
+    for seed in seeds if SOLVERS[solver][1] else seeds[:1]:
+      configurations.append((solver, seed))
+  return configurations
+
+def run_portfolio(input_file, configurations=None, timeout=None, memory_limit=None,
+                  echo=False, log_file=None):
+  '''Run (solver, seed) configurations concurrently on the same file and return the first
+     definitive result, killing the rest.'''
+  if configurations is None:
+    configurations = portfolio()
+  runs = [SolverRun(solver_args(input_file, seed, solver), timeout, memory_limit)
+          for solver, seed in configurations]
+  finished = threading.Condition()
+  results = []
+  errors = []
+
+  def wait(run, configuration):
+    result = None
+    try:
+      result = run.wait()
+      result.configuration = configuration
+    except Exception as error:
+      errors.append((configuration, error))
+    finally:
+      with finished:
+        results.append(result)
+        finished.notify()
+
+  threads = []
+  try:
+    for run, configuration in zip(runs, configurations):
+      run.start()
+      thread = threading.Thread(target=wait, args=(run, configuration))
+      thread.daemon = True
+      thread.start()
+      threads.append(thread)
+    with finished:
+      while len(results) < len(runs) and not any(r and r.is_definitive() for r in results):
+        finished.wait()
+  finally:
+    for run in runs:
+      run.cancel()
+    for thread in threads:
+      thread.join()
+
+  definitive = [r for r in results if r and r.is_definitive()]
+  finished_results = [r for r in results if r]
+  if errors and (echo or not finished_results):
+    for configuration, error in errors:
+      print('Portfolio run %s %s failed: %s' % (configuration[0], configuration[1], error))
+  if not finished_results:
+    raise errors[0][1]
+  result = definitive[0] if definitive else finished_results[-1]
+  if result.is_definitive():
+    PORTFOLIO_WINS[result.configuration] += 1
+  if echo:
+    print('Portfolio result %s from %s %s' % (result.status, result.configuration[0],
+                                              result.configuration[1]))
+  if log_file is not None:
+    with open(log_file, 'a') as log:
+      log.write('%s\t%s\t%s\t%s\t%.3f\n' % (input_file, result.configuration[0],
+                                              result.configuration[1], result.status,
+                                              result.seconds))
+  return result
+
+def solve(input_file, solution_file=None, seed=None, echo=False, timeout=None, memory_limit=None,
+          configurations=None):
+  '''Run the solver (or a portfolio of (solver, seed) configurations) and load results
+     (empty unless satisfiable).'''
+  if configurations is None:
+    result = run_solver(input_file, solution_file, seed, echo, timeout, memory_limit)
+  else:
+    result = run_portfolio(input_file, configurations, timeout, memory_limit, echo)
+    if solution_file:
+      with open(solution_file, 'w') as solution:
+        result.write(solution)
+  with open(input_file) as input:
+    return load_values(input, result.values)
+
+def make_cubes(split_variables):
+  '''Returns every assignment of signs to the split variable numbers as tuples of literals.'''
+  return [tuple(ix if sign else -ix for ix, sign in zip(split_variables, signs))
+          for signs in itertools.product((False, True), repeat=len(split_variables))]
+
+def stream_cube(input_file, cube, out):
+  '''Write a dimacs file to out, adding the literals of a cube as unit clauses and updating the
+     header.'''
+  with open(input_file) as inp:
+    header = inp.readline().split()
+    header[-1] = str(int(header[-1]) + len(cube))
+    out.write(' '.join(header) + '\n')
+    shutil.copyfileobj(inp, out)
+  out.write('c cube:\n')
+  for lit in cube:
+    out.write('%d 0\n' % lit)
+
+def write_cube_file(input_file, cube, cube_file):
+  '''Copy a dimacs file, adding the literals of a cube as unit clauses and updating the header.'''
+  with open(cube_file, 'w') as out:
+    stream_cube(input_file, cube, out)
+
+def cube_and_conquer(input_file, split_names, solver=None, seed=None, workers=None, timeout=None,
+                     memory_limit=None, progress=None, echo=False):
+  '''Split on the named variables and solve the cubes in parallel, returning the first satisfiable
+     result (with its cube), UNSAT if every cube is unsatisfiable, or else UNKNOWN.'''
+  with open(input_file) as input:
+    names = read_variable_names(input)
+  numbers = {name: ix for ix, name in (enumerate(names) if isinstance(names, list) else names.items())}
+  cubes = make_cubes([numbers[name] for name in split_names])
+  if progress is None and echo:
+    def progress(index, cube, result):
+      print('Cube %d/%d %s: %s' % (index + 1, len(cubes), ' '.join(map(str, cube)), result))
+
+  runs = [None] * len(cubes)
+  lock = threading.Lock()
+  state = {'done': False}
+
+  def conquer(index):
+    cube = cubes[index]
+    if state['done']:
+      return None
+    def feed(out):
+      stream_cube(input_file, cube, out)
+    with lock:
+      if state['done']:
+        return None
+      runs[index] = SolverRun(solver_args(None, seed, solver), timeout, memory_limit,
+                              feed=feed).start()
+    result = runs[index].wait()
+    result.configuration = (solver or COMMAND, seed)
+    result.cube = cube
+    if progress is not None:
+      progress(index, cube, result)
+    if result.status == SAT:
+      with lock:
+        state['done'] = True
+        for run in runs:
+          if run is not None:
+            run.cancel()
+    return result
+
+  try:
+    with ThreadPoolExecutor(workers or os.cpu_count()) as pool:
+      results = [r for r in pool.map(conquer, range(len(cubes))) if r is not None]
+  finally:
+    state['done'] = True
+    for run in runs:
+      if run is not None:
+        run.cancel()
+
+  satisfied = [r for r in results if r.status == SAT]
+  if satisfied:
+    return satisfied[0]
+  status = UNSAT if len(results) == len(cubes) and all(r.status == UNSAT for r in results) else UNKNOWN
+  result = SolverResult(status, None, [], sum(r.seconds for r in results))
+  result.cube = None
+  return result
+
+def solve_cubes(input_file, split_names, solution_file=None, seed=None, echo=False, workers=None,
+                timeout=None, memory_limit=None):
+  '''Run cube_and_conquer and load results (empty unless satisfiable).'''
+  result = cube_and_conquer(input_file, split_names, None, seed, workers, timeout, memory_limit,
+                            echo=echo)
+  if solution_file:
+    with open(solution_file, 'w') as solution:
+      result.write(solution)
+  with open(input_file) as input:
+    return load_values(input, result.values)
+
+def enumerate_solutions(clauses, limit=None, project_on=None, dimacs_file=None, solver=None,
+                        seed=None, timeout=None, memory_limit=None, echo=False, symmetries=None):
+  '''Generates results (as from solve) for up to limit solutions of clauses (symbolic or CNF),
+     distinct on the variables in project_on (by default all but temporary {x...} variables).'''
+  workdir = None
+  if dimacs_file is None:
+    workdir = tempfile.mkdtemp(prefix='enumerate')
+    dimacs_file = os.path.join(workdir, 'solutions.dim')
+  variable_file = dimacs_file + '.var'
+  try:
+    with open(dimacs_file, 'w') as out, open(variable_file, 'w') as variable_map:
+      output_dimacs(clauses, out, variable_map, comment_variables=False)
+    with open(variable_file) as variable_map:
+      names = read_variable_map(variable_map)
+
+    if project_on is None:
+      projected = lambda name: not name.startswith('{')
+    elif callable(project_on):
+      projected = project_on
+    else:
+      projected = set(project_on).__contains__
+    projection = set(ix for ix in range(1, len(names))
+                     if projected(names[ix].split('#')[0]) and not is_auxiliary(names[ix]))
+    numbers = {names[ix]: ix for ix in projection}
+    canonical_forms = set()
+
+    count = 0
+    while limit is None or count < limit:
+      result = run_solver(dimacs_file, None, seed, echo, timeout, memory_limit, solver)
+      if result.status != SAT:
+        if result.status != UNSAT and echo:
+          print('Enumeration stopped after %d solutions: %s' % (count, result.status))
+        break
+      blocking = [-ix for ix in result.values if abs(ix) in projection]
+      if symmetries is None:
+        count += 1
+        yield decode_values(names, result.values)
+        blocked = [blocking]
+      else:
+        values = [(names[abs(ix)], ix < 0) for ix in blocking]
+        images = orbit(values, symmetries)
+        # block every image that is also over projected variables
+        blocked = [sorted(-numbers[name] if value else numbers[name] for name, value in image)
+                   for image in images if all(name in numbers for name, _ in image)]
+        canonical = min(tuple(sorted(image)) for image in images)
+        if canonical not in canonical_forms:
+          canonical_forms.add(canonical)
+          count += 1
+          yield decode_values(names, result.values)
+      if not blocking or not blocked:
+        break
+      append_dimacs(dimacs_file, blocked, 'excluded solution %d:' % count)
+  finally:
+    if workdir is not None:
+      shutil.rmtree(workdir, ignore_errors=True)
+
+def optimize_count(clauses, variables, minimize=True, search='linear', low=None, high=None,
+                   dimacs_file=None, solver=None, seed=None, timeout=None, memory_limit=None,
+                   echo=False):
+  '''Finds a solution of clauses with the fewest (or most) of the variables (Literals) true,
+     returning (count, results, optimal), with None for count and results if there is none.'''
+  if search not in ('linear', 'binary'):
+    raise ValueError('Unknown search %s.' % search)
+  total = len(variables)
+  if not minimize:
+    # the most true variables are the fewest false ones
+    variables = [~x for x in variables]
+    low, high = (None if high is None else total - high), (None if low is None else total - low)
+  lower = 0 if low is None else max(low, 0)
+  upper = total if high is None else min(high, total)
+  totalizer = Totalizer(variables)
+  if isinstance(clauses, CNF):
+    clauses = clauses.symbolic()
+  clauses = list(clauses)
+  clauses.append('Totalizer on %d variables for optimization' % total)
+  clauses.extend(totalizer.iter_clauses())
+  clauses.extend(totalizer.bound_clauses(lower, upper))
+
+  workdir = None
+  if dimacs_file is None:
+    workdir = tempfile.mkdtemp(prefix='optimize')
+    dimacs_file = os.path.join(workdir, 'optimize.dim')
+  variable_file = dimacs_file + '.var'
+  trial_file = dimacs_file + '.trial'
+  best = results = None
+  try:
+    with open(dimacs_file, 'w') as out, open(variable_file, 'w') as variable_map:
+      output_dimacs(clauses, out, variable_map, comment_variables=False)
+    with open(variable_file) as variable_map:
+      names = read_variable_map(variable_map)
+    numbers = {name: ix for ix, name in enumerate(names)}
+
+    def number(literal):
+      ix = numbers[literal.name]
+      return ix if literal.value else -ix
+
+    while lower <= upper:
+      cube = []
+      if search == 'binary' and best is not None:
+        middle = (lower + upper) // 2
+        cube = [number(totalizer.at_most(middle))]
+        write_cube_file(dimacs_file, cube, trial_file)
+      result = run_solver(trial_file if cube else dimacs_file, None, seed, echo, timeout,
+                          memory_limit, solver)
+      if result.status == SAT:
+        results = decode_values(names, result.values)
+        values = dict(results)
+        best = sum(1 for x in variables if values[x.name] == x.value)
+        if echo:
+          print('Found count %d' % (best if minimize else total - best))
+        upper = best - 1
+        if lower <= upper:
+          append_dimacs(dimacs_file, [(number(totalizer.at_most(upper)),)],
+                        'count at most %d:' % upper)
+      elif result.status == UNSAT and cube:
+        lower = middle + 1
+        append_dimacs(dimacs_file, [(number(totalizer.at_least(lower)),)],
+                      'count at least %d:' % lower)
+      elif result.status == UNSAT:
+        upper = lower - 1
+      else:
+        if echo:
+          print('Optimization stopped: %s' % result.status)
         break
-      if echo:
-        print(line.strip())
-      solution.write(line)
-
-def solve(input_file, solution_file, seed=None, echo=False):
-  '''Run the solver and load results.'''
-  run_solver(input_file, solution_file, seed, echo)
-  with open(input_file) as input, open(solution_file) as solution:
-    return load_results(input, solution)
+  finally:
+    if workdir is not None:
+      shutil.rmtree(workdir, ignore_errors=True)
+    elif os.path.exists(trial_file):
+      os.remove(trial_file)
+  if best is not None and not minimize:
+    best = total - best
+  return best, results, lower > upper
 
 set_solver('lingeling')
@@ -0,0 +1,65 @@
+from collections import Counter
+from itertools import chain
+
+def signature(clause):
+  '''Bitmask with one of 64 bits set for each literal, so a subset's signature is a subset too.'''
+  sig = 0
+  for literal in clause:
+    sig |= 1 << (hash(literal) & 63)
+  return sig
+
+class SubsumptionIndex(object):
+  '''Index of clauses (collections of hashable literals, symbolic or integer) for finding a clause
+     that is a subset of (subsumes) another. Each clause is listed under one of its literals, the
+     least frequent if occurrence counts are given, and signatures skip most non-subsets.'''
+  def __init__(self, occurrences=None):
+    self.occurrences = occurrences
+    self.watches = {}
+    self.clauses = []
+
+  def add(self, clause):
+    '''Adds a clause, returning its index.'''
+    clauseset = frozenset(clause)
+    if not clauseset:
+      watch = None
+    elif self.occurrences is None:
+      watch = next(iter(clauseset))
+    else:
+      watch = min(clauseset, key=self.occurrences.__getitem__)
+    self.watches.setdefault(watch, []).append(len(self.clauses))
+    self.clauses.append((clauseset, signature(clauseset)))
+    return len(self.clauses) - 1
+
+  def find_subset(self, clause, strict=True):
+    '''Returns the index of a clause whose literals are a subset of the literals of clause (a
+       smaller one if strict), or None if there is none.'''
+    clauseset = frozenset(clause)
+    sig = signature(clauseset)
+    for watch in chain([None], clauseset):
+      for k in self.watches.get(watch, ()):
+        other, other_sig = self.clauses[k]
+        if (other_sig & ~sig == 0 and (len(other) < len(clauseset) or not strict) and
+            other <= clauseset):
+          return k
+    return None
+
+def remove_subsumed(clauses, strict=True):
+  '''Returns the clauses (in order) that no smaller clause subsumes. Unless strict, a clause that
+     repeats an earlier one (as a set of literals) is also removed.'''
+  clauses = list(clauses)
+  occurrences = Counter(chain.from_iterable(set(clause) for clause in clauses))
+  index = SubsumptionIndex(occurrences)
+  for clause in clauses:
+    index.add(clause)
+  kept = []
+  seen = set()
+  for clause in clauses:
+    if index.find_subset(clause) is not None:
+      continue
+    if not strict:
+      clauseset = frozenset(clause)
+      if clauseset in seen:
+        continue
+      seen.add(clauseset)
+    kept.append(clause)
+  return kept
@@ -1,8 +1,15 @@
+import os
 import re
 from .clausebuilder import Literal, ZERO
 
+# name of the ZERO constant, which is always false
+ZERO_NAME = ZERO.name
+
 IMPLIED_BY = '<-'
 
+# directory of compiled rule templates, which can be set with the SYMSAT_CACHE environment variable.
+CACHE_DIR = os.environ.get('SYMSAT_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'symsat'))
+
 def parse_tokens(line):
   '''Parse a line of text with symbols.'''
   line = line.strip()
@@ -36,6 +43,22 @@ def clause_to_string(clause, consequent):
      clause = head + [IMPLIED_BY] + [~x for x in clause if x.name != consequent]
   return ' '.join(map(str, clause))
 
+def write_template(clauses, path, consequent=None):
+  '''Writes template clauses (with # comments) to a file that read_template can parse, replacing
+     it in one step so concurrent readers never see a partial file.'''
+  directory = os.path.dirname(path)
+  if directory:
+    os.makedirs(directory, exist_ok=True)
+  with open(path + '.%d.tmp' % os.getpid(), 'w') as out:
+    for clause in clauses:
+      out.write('# %s\n' % clause if is_comment(clause) else clause_to_string(clause, consequent) + '\n')
+  os.replace(path + '.%d.tmp' % os.getpid(), path)
+
+def read_template(path):
+  '''Reads template clauses written by write_template.'''
+  with open(path) as inp:
+    return [parse_line(line) for line in inp if line.strip()]
+
 def find_variables(symbolic_clauses):
   '''Finds variables in symbolic clauses.'''
   variables = set()
@@ -45,37 +68,137 @@ def find_variables(symbolic_clauses):
         variables.add(literal.name)
   return variables
 
+def same_tag(orientation, tag):
+  '''The default adjust_tag, leaving tags unchanged.'''
+  return tag
+
 def inflate_template(template_constraints, substitution_maps, consequent=None,
-                     adjust_tag=lambda orientation, tag: tag):
-  '''Inflates each template clause using substitutions.'''
+                     adjust_tag=same_tag, cnf=None, reductions=None):
+  '''Inflates each template clause using substitutions.
+     If a CNF is given, integer clauses are appended to it and it is returned.'''
+  if cnf is not None:
+    return inflate_template_cnf(template_constraints, substitution_maps, cnf, consequent, adjust_tag,
+                                reductions)
+  return list(iter_inflate_template(template_constraints, substitution_maps, consequent, adjust_tag,
+                                    reductions))
+
+def substitute_parts(parts, substitution, adjust_tag):
+  '''Substitutes template parts (name, value, tag, adjusted tags by orientation), returning the
+     (name, value, tag) of each literal other than ZERO and whether a ~ZERO literal makes the
+     clause true. ZERO literals (always false) are left out.'''
+  literals = []
+  satisfied = False
+  for name, value, tag, adjusted in parts:
+    info = substitution.get(name)
+    if info:
+      name = info[0]
+      if adjust_tag is not same_tag:
+        try:
+          tag = adjusted[info[1]]
+        except KeyError:
+          tag = adjusted[info[1]] = adjust_tag(info[1], tag)
+    if name == ZERO_NAME and tag is None:
+      satisfied = satisfied or not value
+    else:
+      literals.append((name, value, tag))
+  return literals, satisfied
+
+def count_reductions(reductions, dropped, removed, dropped_variables, kept):
+  '''Adds the clauses and literals left out for ZERO, and the variables (name, tag) of dropped
+     clauses that are not kept, to reductions if given.'''
+  if reductions is not None:
+    reductions.clauses += dropped
+    reductions.literals += removed
+    reductions.variables += sum(1 for key in dropped_variables if not kept(key))
+
+def iter_inflate_template(template_constraints, substitution_maps, consequent=None,
+                          adjust_tag=same_tag, reductions=None):
+  '''Generates the inflation of each template clause using substitutions, in the same order as
+     inflate_template. Substitution maps are iterated once per template clause. Clauses true
+     because of ZERO are dropped and ZERO literals removed, counting them in reductions if given.'''
   # create symbolic clauses for mapped variables using template
-  clauses = []
   has_zero = False
+  dropped = removed = 0
+  dropped_variables = set()
+  # variables of kept clauses are only collected when reporting reductions
+  kept = None if reductions is None else set()
   substituted = set.union(*[set(submap.keys())
                           for submap in substitution_maps if not is_comment(submap)])
   for constraint in template_constraints:
     if is_comment(constraint) or not substituted.intersection([lit.name for lit in constraint]):
-      clauses.append(constraint)
+      if kept is not None and not is_comment(constraint):
+        kept.update((lit.name, lit.tag) for lit in constraint)
+      yield constraint
     else:
-      clauses.append('Template: ' + clause_to_string(constraint, consequent))
+      yield 'Template: ' + clause_to_string(constraint, consequent)
+      parts = [(literal.name, literal.value, literal.tag, {}) for literal in constraint]
       # apply the constraint to each grid cell
       for substitution in substitution_maps:
         if is_comment(substitution):
-          clauses.append(substitution)
+          yield substitution
+          continue
+        literals, satisfied = substitute_parts(parts, substitution, adjust_tag)
+        if satisfied:
+          has_zero = True
+          dropped += 1
+          removed += len(parts)
+          dropped_variables.update((name, tag) for name, value, tag in literals)
+          continue
+        if kept is not None:
+          kept.update((name, tag) for name, value, tag in literals)
+        if len(literals) == len(parts):
+          yield [Literal(name, value, tag) for name, value, tag in literals]
         else:
-          clause = []
-          for literal in constraint:
-            info = substitution.get(literal.name)
-            if info:
-              literal = Literal(info[0], literal.value, adjust_tag(info[1], literal.tag))
-            clause.append(literal)
-            if literal.name == ZERO.name:
-              has_zero = True
-          if not (ZERO in clause and ~ZERO in clause):
-            clauses.append(clause)
+          has_zero = True
+          removed += len(parts) - len(literals)
+          yield [Literal(name, value, tag) for name, value, tag in literals] or [ZERO]
+  if has_zero:
+    yield [~ZERO]
+  count_reductions(reductions, dropped, removed, dropped_variables,
+                   lambda key: key in kept)
+
+def inflate_template_cnf(template_constraints, substitution_maps, cnf, consequent=None,
+                         adjust_tag=same_tag, reductions=None):
+  '''Inflates each template clause using substitutions directly into integer clauses of a CNF,
+     leaving out ZERO as iter_inflate_template does.'''
+  variable = cnf.symbols.variable
+  has_zero = False
+  dropped = removed = 0
+  dropped_variables = set()
+  substituted = set.union(*[set(submap.keys())
+                          for submap in substitution_maps if not is_comment(submap)])
+  for constraint in template_constraints:
+    if is_comment(constraint) or not substituted.intersection([lit.name for lit in constraint]):
+      cnf.add(constraint)
+    else:
+      cnf.add_comment('Template: ' + clause_to_string(constraint, consequent))
+      parts = [(literal.name, literal.value, literal.tag, {}) for literal in constraint]
+      # apply the constraint to each grid cell
+      for substitution in substitution_maps:
+        if is_comment(substitution):
+          cnf.add_comment(substitution)
+          continue
+        literals, satisfied = substitute_parts(parts, substitution, adjust_tag)
+        if satisfied:
+          has_zero = True
+          dropped += 1
+          removed += len(parts)
+          dropped_variables.update((name, tag) for name, value, tag in literals)
+          continue
+        if len(literals) < len(parts):
+          has_zero = True
+          removed += len(parts) - len(literals)
+        clause = []
+        for name, value, tag in literals:
+          ix = variable(name, tag)
+          clause.append(ix if value else -ix)
+        cnf.add_clause(clause or [variable(ZERO_NAME)])
   if has_zero:
-    clauses.append([~ZERO])
-  return clauses
+    cnf.add_clause([-variable(ZERO_NAME)])
+  used = set(abs(x) for x in cnf.literals) if reductions is not None and dropped_variables else ()
+  count_reductions(reductions, dropped, removed, dropped_variables,
+                   lambda key: cnf.symbols.find(*key) in used)
+  return cnf
 
 def to_substitution_tuples(substitution_maps, key_order=[]):
   '''Makes a list of string tuples from a set of substitution maps.'''
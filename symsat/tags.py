@@ -1,9 +1,41 @@
 from collections import defaultdict
 from functools import reduce
+from itertools import permutations
 
 from .clausebuilder import Literal, collect_literals, expand_disjunction
+from .cnf import CNF, int_disjunction
 
-def match_integers_all(literals, max_tags):
+# Encodings of tagged variables: binary bits a#0, a#1, ... (log), one variable a#e<v> for each
+# value (onehot), or a variable a#g<v> for each value v >= 1 meaning a >= v (order).
+TAG_ENCODINGS = ('log', 'onehot', 'order')
+
+# largest domain (number of values) that 'auto' encodes as onehot rather than log
+MAX_ONEHOT_VALUES = 16
+
+# at-most-one encodings for onehot tags, pairwise (the default) up to this many values
+MAX_PAIRWISE_VALUES = 5
+
+# encodings of a table of allowed tag tuples for make_matching_clauses
+TABLE_ENCODINGS = ('trie', 'support', 'product')
+
+# largest number of names for which a trie encoding tries every order of names
+MAX_TRIE_ORDER_NAMES = 5
+
+# tables compiled by make_matching_clauses, by encoding, prefix, names, max tags and rows
+TABLES = {}
+
+def tag_encoding(name, maxv, encodings=None):
+  '''Returns the encoding of a tagged variable with values 0..maxv given the encodings: None
+     (log), one of TAG_ENCODINGS or 'auto' (by domain size) for every variable, or a dictionary
+     of these by variable name (log for names not in it).'''
+  encoding = encodings.get(name, 'log') if isinstance(encodings, dict) else encodings or 'log'
+  if encoding == 'auto':
+    encoding = 'onehot' if maxv < MAX_ONEHOT_VALUES else 'log'
+  if encoding not in TAG_ENCODINGS:
+    raise ValueError('Unknown tag encoding %s.' % encoding)
+  return encoding
+
+def match_integers_all(literals, max_tags, encodings=None):
   '''Make a conjunction asserting equality and inequality between bit vectors and integers.'''
   conjunction = []
   for literal in literals:
@@ -12,25 +44,40 @@ def match_integers_all(literals, max_tags):
     else:
       maxv = max_tags[literal.name]
       assert literal.tag <= maxv
-      bitmatchers = bit_literals(literal, maxv)
-      if literal.value:
-        conjunction.extend((x,) for x in bitmatchers)
-      else:
-        conjunction.append(tuple(bitmatchers))
+      conjunction.extend(match_tag(literal, maxv, tag_encoding(literal.name, maxv, encodings)))
   return conjunction
 
+def match_tag(literal, maxv, encoding='log'):
+  '''Make a conjunction of clauses asserting a tag literal in an encoding.'''
+  if encoding == 'onehot':
+    return [(Literal(bit_variable(literal.name, 'e%d' % literal.tag), literal.value),)]
+  if encoding == 'order':
+    # a == v is a >= v and not a >= v + 1, leaving out a >= 0 (true) and a >= maxv + 1 (false)
+    matchers = []
+    if literal.tag > 0:
+      matchers.append(Literal(bit_variable(literal.name, 'g%d' % literal.tag)))
+    if literal.tag < maxv:
+      matchers.append(Literal(bit_variable(literal.name, 'g%d' % (literal.tag + 1)), False))
+    if literal.value:
+      return [(x,) for x in matchers]
+    return [tuple(~x for x in matchers)]
+  bitmatchers = bit_literals(literal, maxv)
+  if literal.value:
+    return [(x,) for x in bitmatchers]
+  return [tuple(bitmatchers)]
+
 def bit_variable(name, bit):
-  '''Create a variable name for a bit in a numeric variable.'''
-  return "%s#%d" % (name, bit)
+  '''Create a variable name for a bit (or other encoding variable) in a numeric variable.'''
+  return "%s#%s" % (name, bit)
 
 def bit_literals(literal, maxv):
   '''Make literals representing the bits of a single integer match.'''
   return [Literal(bit_variable(literal.name, i), not (literal.tag >> i & 1 == 1) ^ literal.value)
           for i in range(maxv.bit_length())]
 
-def match_integers_any(literals, max_tags):
+def match_integers_any(literals, max_tags, encodings=None):
   '''Make clauses for a disjunction asserting at least one integer equality or inequality holds.'''
-  disjunction = [match_integers_all([literal], max_tags) for literal in literals]
+  disjunction = [match_integers_all([literal], max_tags, encodings) for literal in literals]
   return sorted(reduce(expand_disjunction, disjunction))
 
 def find_max(value_lists):
@@ -53,24 +100,95 @@ def constant_max(tag):
   '''Return a dictionary with a constant max tag value.'''
   return defaultdict(lambda: tag)
 
-def make_matching_clauses(literal_tuples):
-  '''Makes a set of tag clauses that matches one of the given tuples of literals.'''
+def table_rows(literal_tuples):
+  '''Validates tuples of positive tag literals over the same names and returns the sorted names,
+     the max tag of each and the sorted allowed rows of tags (in name order).'''
   maxtags = find_max(literal_tuples)
   names = sorted(maxtags.keys())
-  # validate that they all use the same literals
+  rows = set()
   for matcher in literal_tuples:
     if sorted([x.name for x in matcher]) != names:
       raise Exception('%s does not match names: %s' % (matcher, names))
-    if any(x.is_bool() for x in matcher):
+    if any(x.is_bool() or not x.value for x in matcher):
       raise Exception('%s is not a tag tuple.' % (matcher,))
-  # collect inverse clause for each matcher
-  inverse_clauses = set()
-  for matcher in literal_tuples:
-    inverse_clauses.add(tuple(sorted(~x for x in matcher)))
+    tags = {x.name: x.tag for x in matcher}
+    rows.add(tuple(tags[name] for name in names))
+  return names, maxtags, sorted(rows)
+
+def trie_clauses(names, maxtags, rows):
+  '''Makes a clause negating each prefix of an allowed row with a next value that no row continues
+     it with, excluding every disallowed tuple where it leaves the trie of allowed rows.'''
+  clauses = []
+  def walk(prefix, suffixes):
+    depth = len(prefix)
+    if depth == len(names):
+      return
+    children = defaultdict(list)
+    for suffix in suffixes:
+      children[suffix[0]].append(suffix[1:])
+    negated = [Literal(names[i], False, tag) for i, tag in enumerate(prefix)]
+    for tag in range(maxtags[names[depth]] + 1):
+      if tag in children:
+        walk(prefix + (tag,), children[tag])
+      else:
+        clauses.append(tuple(sorted(negated + [Literal(names[depth], False, tag)])))
+  walk((), rows)
+  return clauses
+
+def best_trie_clauses(names, maxtags, rows):
+  '''Makes trie clauses with the names in the order giving the fewest clauses (trying every order
+     for up to MAX_TRIE_ORDER_NAMES names).'''
+  orders = ([list(order) for order in permutations(range(len(names)))]
+            if len(names) <= MAX_TRIE_ORDER_NAMES else [list(range(len(names)))])
+  best = None
+  for order in orders:
+    clauses = trie_clauses([names[i] for i in order], maxtags,
+                           sorted(tuple(row[i] for i in order) for row in rows))
+    if best is None or len(clauses) < len(best):
+      best = clauses
+  return best
+
+def support_clauses(names, maxtags, rows, prefix='table'):
+  '''Support encoding of allowed rows, with a helper variable prefix<k>$ selecting row k (give each
+     symmetric copy of the clauses its own prefix).'''
+  helpers = [Literal('%s%d$' % (prefix, k)) for k in range(len(rows))]
+  clauses = [tuple(helpers)]
+  supports = defaultdict(list)
+  for helper, row in zip(helpers, rows):
+    for name, tag in zip(names, row):
+      clauses.append((~helper, Literal(name, True, tag)))
+      supports[(name, tag)].append(helper)
+  for name in names:
+    for tag in range(maxtags[name] + 1):
+      clauses.append((Literal(name, False, tag),) + tuple(supports[(name, tag)]))
+  return clauses
 
-  # return cartesian product of inverse clauses minus those for matching tags
+def product_clauses(names, maxtags, rows):
+  '''Excludes disallowed tuples one clause each, by taking the cartesian product of all tags and
+     removing the allowed rows (so its size is the product of domain sizes).'''
+  inverse_clauses = set(tuple(sorted(Literal(name, False, tag) for name, tag in zip(names, row)))
+                        for row in rows)
   disjunction = [[(Literal(name, False, i),) for i in range(maxtags[name] + 1)] for name in names]
-  return sorted(reduce(expand_disjunction, disjunction).difference(inverse_clauses))
+  return sorted(set(reduce(expand_disjunction, disjunction)).difference(inverse_clauses))
+
+def make_matching_clauses(literal_tuples, encoding='trie', prefix='table'):
+  '''Makes tag clauses matching one of the given tuples of literals, encoded as 'trie' (the
+     default), 'support' or 'product', cached for each table.'''
+  if encoding not in TABLE_ENCODINGS:
+    raise ValueError('Unknown table encoding %s.' % encoding)
+  names, maxtags, rows = table_rows(literal_tuples)
+  key = (encoding, prefix if encoding == 'support' else None, tuple(names),
+         tuple(maxtags[name] for name in names), tuple(rows))
+  clauses = TABLES.get(key)
+  if clauses is None:
+    if encoding == 'trie':
+      clauses = sorted(best_trie_clauses(names, maxtags, rows))
+    elif encoding == 'support':
+      clauses = support_clauses(names, maxtags, rows, prefix)
+    else:
+      clauses = product_clauses(names, maxtags, rows)
+    TABLES[key] = clauses
+  return list(clauses)
 
 def tag_tuple(literals, tags):
   '''Apply tuple of tags to a tuple of literals.'''
@@ -98,37 +216,209 @@ def less_than(literal, limit):
         break
   return clauses
 
-def inverse_adjust(adjust_tag):
-  '''Uses a linear search to find the inverse of an adjust_tag function.
-     In practice, there should only be a few tags to check.'''
+def at_most_one(literals, name, encoding=None):
+  '''Generate clauses allowing at most one of the literals, pairwise, with a ladder of auxiliary
+     variables name#l<i> (where l<i> means one of the first i + 1 is true), or with commander
+     variables name#c<i> for groups of three. By default, pairwise for small lists, else ladder.'''
+  if encoding is None:
+    encoding = 'pairwise' if len(literals) <= MAX_PAIRWISE_VALUES else 'ladder'
+  if encoding == 'pairwise' or len(literals) <= 2:
+    return [(~x, ~y) for i, x in enumerate(literals) for y in literals[i + 1:]]
+  if encoding == 'ladder':
+    ladder = [Literal(bit_variable(name, 'l%d' % i)) for i in range(len(literals) - 1)]
+    clauses = []
+    for i, x in enumerate(literals):
+      if i < len(ladder):
+        clauses.append((~x, ladder[i]))
+      if i > 0:
+        clauses.append((~x, ~ladder[i - 1]))
+        if i < len(ladder):
+          clauses.append((~ladder[i - 1], ladder[i]))
+    return clauses
+  if encoding != 'commander':
+    raise ValueError('Unknown at-most-one encoding %s.' % encoding)
+  clauses = []
+  commanders = []
+  level = 0
+  while len(literals) > MAX_PAIRWISE_VALUES:
+    commanders = []
+    for i in range(0, len(literals), 3):
+      group = literals[i:i + 3]
+      commander = Literal(bit_variable(name, 'c%d_%d' % (level, i // 3)))
+      clauses.extend((~x, ~y) for j, x in enumerate(group) for y in group[j + 1:])
+      clauses.extend((~x, commander) for x in group)
+      clauses.append(tuple([~commander] + group))
+      commanders.append(commander)
+    literals = commanders
+    level += 1
+  return clauses + at_most_one(literals, name, 'pairwise')
+
+def tag_bound_clauses(name, maxv, encoding='log', amo=None):
+  '''Generate clauses limiting a tagged variable to values 0..maxv in an encoding.'''
+  if encoding == 'onehot':
+    values = [Literal(bit_variable(name, 'e%d' % v)) for v in range(maxv + 1)]
+    return [tuple(values)] + at_most_one(values, name, amo)
+  if encoding == 'order':
+    return [(Literal(bit_variable(name, 'g%d' % (v + 1)), False), Literal(bit_variable(name, 'g%d' % v)))
+            for v in range(1, maxv)]
+  return less_than(Literal(name), maxv + 1)
+
+def tag_value(values, name, part, truth):
+  '''Combines the value of an encoding variable name#part into a dictionary of tag values.'''
+  value = values.get(name, 0)
+  if part.isdigit():
+    value |= (1 << int(part)) if truth else 0
+  elif truth and part[0] == 'e':
+    value = int(part[1:])
+  elif truth and part[0] == 'g':
+    value = max(value, int(part[1:]))
+  values[name] = value
+
+def is_auxiliary(name):
+  '''Check if a variable name is an auxiliary at-most-one variable of a onehot tag.'''
+  part = name.partition('#')[2]
+  return part[:1] in ('l', 'c')
+
+class AdjustTable(object):
+  '''Dense table of an adjust_tag function (orientation, tag) -> adjusted tag for tags 0..max_tag,
+     and its inverse, with a row computed once for each orientation seen. Calling it looks up
+     the table, falling back to adjust_tag for tags outside it (e.g. None for boolean literals).'''
+  def __init__(self, adjust_tag, max_tag):
+    self.adjust_tag = adjust_tag
+    self.max_tag = max_tag
+    self.rows = {}
+    self.inverse_rows = {}
+
+  def row(self, orientation):
+    '''Returns the list of adjusted tags for an orientation.'''
+    row = self.rows.get(orientation)
+    if row is None:
+      row = self.rows[orientation] = [self.adjust_tag(orientation, tag)
+                                      for tag in range(self.max_tag + 1)]
+      # the least tag wins, as with a linear search
+      self.inverse_rows[orientation] = {adjusted: tag
+                                        for tag, adjusted in reversed(list(enumerate(row)))}
+    return row
+
+  def __call__(self, orientation, tag):
+    if tag is None or not 0 <= tag <= self.max_tag:
+      return self.adjust_tag(orientation, tag)
+    return self.row(orientation)[tag]
+
+  def adjust_many(self, orientations, tag):
+    '''Returns the adjusted tag for each of a sequence of orientations.'''
+    if tag is None or not 0 <= tag <= self.max_tag:
+      return [self.adjust_tag(orientation, tag) for orientation in orientations]
+    adjusted = {orientation: self.row(orientation)[tag] for orientation in set(orientations)}
+    return [adjusted[orientation] for orientation in orientations]
+
+  def inverse(self, orientation, adjusted):
+    '''Returns the least tag that adjusts to the given one for an orientation.'''
+    self.row(orientation)
+    tag = self.inverse_rows[orientation].get(adjusted)
+    if tag is None:
+      tag = search_inverse(self.adjust_tag, orientation, adjusted, self.max_tag + 1)
+    return tag
+
+def adjust_table(adjust_tag, max_tag):
+  '''Returns an AdjustTable for an adjust_tag function (or the table itself if already one).'''
+  if isinstance(adjust_tag, AdjustTable):
+    return adjust_tag
+  return AdjustTable(adjust_tag, max_tag)
+
+def search_inverse(adjust_tag, orientation, adjusted, tag=0):
+  '''Uses a linear search from tag to find the inverse of an adjust_tag function.'''
+  while True:
+    if adjust_tag(orientation, tag) == adjusted:
+      return tag
+    tag += 1
+
+def inverse_adjust(adjust_tag, max_tag=None):
+  '''Finds the inverse of an adjust_tag function, by lookup in an AdjustTable if one is given or
+     can be made for tags up to max_tag, otherwise by linear search. In practice, there should
+     only be a few tags to check.'''
+  if max_tag is not None or isinstance(adjust_tag, AdjustTable):
+    return adjust_table(adjust_tag, max_tag).inverse
 
   def inverse(orientation, adjusted):
-    tag = 0
-    while True:
-      if adjust_tag(orientation, tag) == adjusted:
-        return tag
-      tag += 1
+    return search_inverse(adjust_tag, orientation, adjusted)
 
   return inverse
 
-def expand_tag_clauses(clauses):
-  '''Expand any clauses with tags into bit clauses using maximum values found.'''
+def find_cnf_max(cnf):
+  '''Find the maximum tag of each numeric variable in the symbol table of a CNF.'''
+  max_tags = {}
+  for name, tag in cnf.symbols.keys():
+    if tag is not None:
+      max_tags[name] = max(tag, max_tags.get(name, 0))
+  return max_tags
+
+def expand_tag_cnf(cnf, encodings=None):
+  '''Expand integer clauses of a CNF with tagged variables into a new CNF of bit clauses.'''
+  max_tags = find_cnf_max(cnf)
+  if not max_tags:
+    return cnf
+
+  expanded = CNF()
+  to_bits = expanded.symbols.literal
+  # conjunction of bit clauses for each literal, computed once per literal
+  conjunctions = {}
+  def conjunction(lit):
+    res = conjunctions.get(lit)
+    if res is None:
+      res = [tuple(to_bits(x) for x in clause)
+             for clause in match_integers_all([cnf.literal(lit)], max_tags, encodings)]
+      conjunctions[lit] = res
+    return res
+
+  for item in cnf.items():
+    if isinstance(item, str):
+      expanded.add_comment(item)
+    else:
+      for clause in sorted(reduce(int_disjunction, [conjunction(x) for x in item])):
+        expanded.add_clause(clause)
+
+  # set upper bound on bit representations
+  expanded.add_comment('Setting upper bound on tags.')
+  for tag, value in sorted(max_tags.items()):
+    expanded.extend(tag_bound_clauses(tag, value, tag_encoding(tag, value, encodings)))
+
+  return expanded
+
+def expand_tag_clauses(clauses, encodings=None):
+  '''Expand any clauses with tags into bit clauses using maximum values found. Encodings are
+     as for tag_encoding (log by default).'''
+  if isinstance(clauses, CNF):
+    return expand_tag_cnf(clauses, encodings)
+
   max_tags = find_max(clauses)
   # if there are no tags, just return original clauses
   if not max_tags:
     return clauses
 
+  return list(iter_expand_tag_clauses(clauses, max_tags, encodings))
+
+def iter_expand_tag_clauses(clauses, max_tags=None, encodings=None):
+  '''Generates bit clauses for clauses with tags, then upper bounds on the tags that were seen.
+     Without max tags (e.g. from constant_max), the clauses are held to find them.'''
+  if max_tags is None:
+    clauses = list(clauses)
+    max_tags = find_max(clauses)
+
   # expand tag clauses into bit clauses
-  expanded = []
+  seen = set()
   for tag_clause in clauses:
     if isinstance(tag_clause, str):
-      expanded.append(tag_clause)
+      yield tag_clause
     else:
-      expanded.extend(match_integers_any(tag_clause, max_tags))
+      seen.update(literal.name for literal in tag_clause if not literal.is_bool())
+      for clause in match_integers_any(tag_clause, max_tags, encodings):
+        yield clause
 
   # set upper bound on bit representations
-  expanded.append('Setting upper bound on tags.')
-  for tag, value in sorted(max_tags.items()):
-    expanded.extend(less_than(Literal(tag), value + 1))
-
-  return expanded
+  if seen:
+    yield 'Setting upper bound on tags.'
+    for tag in sorted(seen):
+      maxv = max_tags[tag]
+      for clause in tag_bound_clauses(tag, maxv, tag_encoding(tag, maxv, encodings)):
+        yield clause
@@ -1,3 +1,6 @@
+# maximum number of coordinates outside the precomputed window to remember
+MAX_CACHED = 1 << 16
+
 class Tessellation(object):
   '''Base class for tessellation of plane into boxes according to symmetry.'''
   def __init__(self, rowsize, columnsize):
@@ -5,6 +8,8 @@ class Tessellation(object):
     self.columnsize = columnsize
     self.transformations = {0: lambda i, j: (i, j)}
     self.transformations.update(self._transformations())
+    self.window = None
+    self.cache = {}
 
   def is_transformed(self, i, j):
     '''Returns whether box (i, j) is transformed from standard orientation.'''
@@ -18,7 +23,41 @@ class Tessellation(object):
     '''Recenters grid coordinates if necessary (such as for face-centered rotation).'''
     return i, j, label
 
+  def precompute(self, padding=2):
+    '''Precomputes grid coordinates and orientations for the box with padding cells around it.'''
+    imin, jmin = -padding, -padding
+    height, width = self.rowsize + 2 * padding, self.columnsize + 2 * padding
+    mapped = [self.find_grid(i, j) for i in range(imin, imin + height) for j in range(jmin, jmin + width)]
+    self.window = (imin, jmin, height, width,
+                   [x[0] for x in mapped], [x[1] for x in mapped], [x[2] for x in mapped])
+    return self.window
+
   def to_grid(self, i, j):
+    '''Returns grid coordinates and orientation label of a cell from the window or a cache.'''
+    imin, jmin, height, width, ilist, jlist, orientations = self.window or self.precompute()
+    if 0 <= i - imin < height and 0 <= j - jmin < width:
+      k = (i - imin) * width + j - jmin
+      return ilist[k], jlist[k], orientations[k]
+    mapped = self.cache.get((i, j))
+    if mapped is None:
+      if len(self.cache) >= MAX_CACHED:
+        self.cache.clear()
+      mapped = self.cache[(i, j)] = self.find_grid(i, j)
+    return mapped
+
+  def to_grid_many(self, ilist, jlist):
+    '''Maps lists of coordinates to lists of grid coordinates and orientation labels.'''
+    imin, jmin, height, width, itable, jtable, otable = self.window or self.precompute()
+    keys = [(i - imin) * width + j - jmin if 0 <= i - imin < height and 0 <= j - jmin < width else -1
+            for i, j in zip(ilist, jlist)]
+    if -1 not in keys:
+      return [itable[k] for k in keys], [jtable[k] for k in keys], [otable[k] for k in keys]
+    mapped = [(itable[k], jtable[k], otable[k]) if k >= 0 else self.to_grid(i, j)
+              for k, i, j in zip(keys, ilist, jlist)]
+    return [x[0] for x in mapped], [x[1] for x in mapped], [x[2] for x in mapped]
+
+  def find_grid(self, i, j):
+    '''Finds grid coordinates and orientation label of a cell by trying each transformation.'''
     # loop through transformations
     for label, transformation in self.transformations.items():
        # find transformed (i, j)
@@ -0,0 +1,69 @@
+'''Brute-force model enumeration shared by the tests, for small sets of clauses.'''
+import itertools
+
+from symsat.cnf import CNF
+from symsat.symbolic_util import is_comment
+
+def assignments(variables):
+  '''Generates every assignment of the variables as a dictionary.'''
+  variables = sorted(variables)
+  for values in itertools.product((False, True), repeat=len(variables)):
+    yield dict(zip(variables, values))
+
+def satisfies(clauses, assignment):
+  '''Check if an assignment (missing variables are false) satisfies integer clauses.'''
+  return all(any(assignment.get(abs(x), False) == (x > 0) for x in clause)
+             for clause in clauses if not is_comment(clause))
+
+def variables_of(clauses):
+  return set(abs(x) for clause in clauses if not is_comment(clause) for x in clause)
+
+def is_satisfiable(clauses, assignment):
+  '''Check if integer clauses have a model extending a partial assignment (by DPLL).'''
+  assignment = dict(assignment)
+  while True:
+    remaining = []
+    unit = None
+    for clause in clauses:
+      if any(assignment.get(abs(x)) == (x > 0) for x in clause):
+        continue
+      rest = [x for x in clause if abs(x) not in assignment]
+      if not rest:
+        return False
+      if len(rest) == 1:
+        unit = rest[0]
+      remaining.append(rest)
+    if unit is None:
+      break
+    assignment[abs(unit)] = unit > 0
+    clauses = remaining
+  if not remaining:
+    return True
+  var = abs(remaining[0][0])
+  for value in (False, True):
+    assignment[var] = value
+    if is_satisfiable(remaining, assignment):
+      return True
+  return False
+
+def models(clauses, variables=None):
+  '''Returns the assignments of the variables (those of the clauses by default) satisfying them.'''
+  clauses = [clause for clause in clauses if not is_comment(clause)]
+  variables = variables_of(clauses) if variables is None else variables
+  return [a for a in assignments(variables) if satisfies(clauses, a)]
+
+def projected(clauses, variables):
+  '''Returns the set of models of integer clauses projected onto variables (as tuples of values).'''
+  clauses = [clause for clause in clauses if not is_comment(clause)]
+  return set(tuple(a[v] for v in sorted(variables))
+             for a in assignments(variables) if is_satisfiable(clauses, a))
+
+def symbolic_models(symbolic_clauses, names):
+  '''Returns the set of models of symbolic clauses projected onto variable names (or (name, tag)
+     pairs), as tuples of values in the order of names.'''
+  cnf = CNF.from_symbolic(symbolic_clauses)
+  keys = [name if isinstance(name, tuple) else (name, None) for name in names]
+  ixs = [cnf.symbols.variable(*key) for key in keys]
+  clauses = list(cnf)
+  return set(tuple(a[ix] for ix in ixs)
+             for a in assignments(ixs) if is_satisfiable(clauses, a))
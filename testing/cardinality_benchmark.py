@@ -0,0 +1,47 @@
+import sys
+
+from symsat.gridbuilder import *
+from symsat.tessellation import *
+from symsat.clausebuilder import *
+from symsat.rulesymmetry import *
+from symsat.dimacs_sat import *
+from symsat.solver import *
+from symsat.rulecompiler import compile_rule
+
+# Compare cardinality encodings on the example searches, e.g.
+#   python3 -m testing.cardinality_benchmark /tmp/bench 300 kissat
+
+LIFE_CONSTRAINTS = compile_rule('B3/S23')
+
+SEARCHES = [
+  ('stilllife >= 30', MooreGridNode((0, 0, 0), Tesselated(RotatedSquare(10)),
+                                    PeriodicTimeAdjust(1, 0, 0)), GreaterThanOrEqual, 30),
+  ('p3ss >= 29', MooreGridNode((0, 0, 0), Open(8, 19), PeriodicTimeAdjust(3, 1, 0)),
+   GreaterThanOrEqual, 29),
+  ('p3ss <= 25', MooreGridNode((0, 0, 0), Open(8, 19), PeriodicTimeAdjust(3, 1, 0)),
+   LessThanOrEqual, 25),
+]
+
+def run_benchmark(fileroot, timeout=None, solver=None):
+  print('\t'.join(['search', 'encoding', 'variables', 'clauses', 'status', 'seconds']))
+  for title, root, comparator, size in SEARCHES:
+    grid = build_grid(root)
+    clauses = inflate_grid_template(LIFE_CONSTRAINTS, grid, G.name)
+    count = len(grid.layer(0))
+    for encoding in [None] + sorted(ENCODINGS):
+      dimacs_file = fileroot + '.dim'
+      cardinality = bound_population(grid, comparator, size, encoding=encoding)
+      with open(dimacs_file, 'w') as out:
+        cnf = CNF.from_symbolic(clauses + cardinality).minimized()
+        output_dimacs(cnf, out, comment_variables=False)
+      result = run_solver(dimacs_file, timeout=timeout, solver=solver)
+      if encoding is None:
+        limit = count - size if comparator is GreaterThanOrEqual else size
+        encoding = 'auto (%s)' % choose_encoding(count, limit)
+      print('\t'.join(map(str, [title, encoding, cnf.num_variables(), len(cnf), result.status,
+                                '%.2f' % result.seconds])))
+      sys.stdout.flush()
+
+if __name__ == "__main__":
+  run_benchmark(sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2 else None,
+                sys.argv[3] if len(sys.argv) > 3 else None)
@@ -0,0 +1,78 @@
+import stat
+import sys
+
+import pytest
+
+from symsat import solver
+
+# A small DPLL solver standing in for a SAT solver, reading dimacs from a file or standard input.
+FAKE_SOLVER = r'''
+import sys
+sys.setrecursionlimit(100000)
+inp = open(sys.argv[-1]) if len(sys.argv) > 1 and not sys.argv[-1].startswith('-') else sys.stdin
+clauses, nvars = [], 0
+for line in inp:
+  toks = line.split()
+  if not toks or toks[0] == 'c':
+    continue
+  if toks[0] == 'p':
+    nvars = int(toks[2])
+    continue
+  clauses.append([int(x) for x in toks if x != '0'])
+
+def dpll(clauses, assignment):
+  while True:
+    simplified = []
+    unit = None
+    for clause in clauses:
+      if any(assignment.get(abs(x)) == (x > 0) for x in clause):
+        continue
+      rest = [x for x in clause if abs(x) not in assignment]
+      if not rest:
+        return None
+      if len(rest) == 1:
+        unit = rest[0]
+      simplified.append(rest)
+    if unit is None:
+      break
+    assignment[abs(unit)] = unit > 0
+    clauses = simplified
+  if not simplified:
+    return assignment
+  lit = simplified[0][0]
+  for value in (lit > 0, lit < 0):
+    branch = dict(assignment)
+    branch[abs(lit)] = value
+    result = dpll(simplified, branch)
+    if result is not None:
+      return result
+  return None
+
+result = dpll(clauses, {})
+if result is None:
+  print('s UNSATISFIABLE')
+  sys.exit(20)
+print('s SATISFIABLE')
+print('v %s 0' % ' '.join(str(v if result.get(v, False) else -v) for v in range(1, nvars + 1)))
+sys.exit(10)
+'''
+
+@pytest.fixture
+def fake_solver(tmp_path, monkeypatch):
+  '''Registers a DPLL script as the solver 'fake' and returns its name.'''
+  path = tmp_path / 'fakesolver'
+  path.write_text('#!%s\n%s' % (sys.executable, FAKE_SOLVER))
+  path.chmod(path.stat().st_mode | stat.S_IEXEC)
+  monkeypatch.setitem(solver.SOLVERS, 'fake', (str(path), True))
+  return 'fake'
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+  '''Points the rule caches at an empty directory and returns it.'''
+  from symsat import rulecompiler, rulesymmetry
+  path = tmp_path / 'cache'
+  monkeypatch.setattr(rulecompiler, 'CACHE_DIR', str(path))
+  monkeypatch.setattr(rulesymmetry, 'CACHE_DIR', str(path))
+  monkeypatch.setattr(rulecompiler, 'COMPILED', {})
+  monkeypatch.setattr(rulesymmetry, 'RULE_TEMPLATES', {})
+  return path
@@ -0,0 +1,73 @@
+from example.rhombus import RHOMBUS_CONSTRAINTS
+from symsat import gridbuilder
+from symsat.cnf import CNF
+from symsat.gridbuilder import (CompiledTemplate, GridTable, MooreGridNode, PeriodicTimeAdjust,
+                                Tesselated, build_grid, inflate_grid_template)
+from symsat.tags import AdjustTable, adjust_table, inverse_adjust, search_inverse
+from symsat.tessellation import RotatedRhombus
+
+class CountingAdjust(object):
+  '''Rotates the first three tags by orientation, counting calls.'''
+  def __init__(self):
+    self.calls = 0
+
+  def __call__(self, orientation, tag):
+    self.calls += 1
+    if tag is None:
+      return None
+    return (tag - orientation) % 3 if tag < 3 else tag
+
+def clause_set(clauses):
+  return set(frozenset(map(str, clause)) for clause in clauses if not isinstance(clause, str))
+
+def test_table_matches_function():
+  adjust = CountingAdjust()
+  table = AdjustTable(adjust, 4)
+  for orientation in range(3):
+    for tag in [None] + list(range(8)):
+      assert table(orientation, tag) == adjust(orientation, tag)
+  assert table.adjust_many([2, 0, 2, 1], 1) == [adjust(o, 1) for o in (2, 0, 2, 1)]
+  assert table.adjust_many([2, 0], None) == [None, None]
+  assert adjust_table(table, 10) is table
+
+def test_rows_are_computed_once_per_orientation():
+  adjust = CountingAdjust()
+  table = AdjustTable(adjust, 4)
+  for repeat in range(3):
+    for orientation in range(3):
+      for tag in range(5):
+        table(orientation, tag)
+  assert adjust.calls == 3 * 5
+
+def test_inverse_matches_search():
+  adjust = CountingAdjust()
+  for inverse in (inverse_adjust(adjust, 4), inverse_adjust(AdjustTable(adjust, 4)),
+                  inverse_adjust(adjust)):
+    for orientation in range(3):
+      for adjusted in range(7):
+        assert inverse(orientation, adjusted) == search_inverse(adjust, orientation, adjusted)
+        assert adjust(orientation, inverse(orientation, adjusted)) == adjusted
+
+def test_least_inverse_wins():
+  parity = AdjustTable(lambda orientation, tag: tag % 2, 5)
+  assert parity.inverse(0, 1) == 1 and parity.inverse(0, 0) == 0
+
+def test_default_adjust_tag_skips_the_table(monkeypatch):
+  grid = build_grid(MooreGridNode((0, 0, 0), Tesselated(RotatedRhombus(6)), PeriodicTimeAdjust(1)))
+  expected = CompiledTemplate(RHOMBUS_CONSTRAINTS).inflate(GridTable(grid),
+                                                           adjust_tag=lambda o, tag: tag)
+  monkeypatch.setattr(gridbuilder, 'adjust_table', None)
+  default = CompiledTemplate(RHOMBUS_CONSTRAINTS).inflate(GridTable(grid))
+  assert clause_set(default.symbolic()) == clause_set(expected.symbolic())
+  assert clause_set(inflate_grid_template(RHOMBUS_CONSTRAINTS, grid, None, cnf=CNF()).symbolic()) \
+      == clause_set(expected.symbolic())
+
+def test_custom_adjust_tag_is_called_per_row():
+  grid = build_grid(MooreGridNode((0, 0, 0), Tesselated(RotatedRhombus(6)), PeriodicTimeAdjust(1)))
+  adjust = CountingAdjust()
+  compiled = inflate_grid_template(RHOMBUS_CONSTRAINTS, grid, None, adjust, cnf=CNF())
+  calls = adjust.calls
+  adjust.calls = 0
+  symbolic = inflate_grid_template(RHOMBUS_CONSTRAINTS, grid, None, adjust)
+  assert clause_set(compiled.symbolic()) == clause_set(symbolic)
+  assert calls < adjust.calls
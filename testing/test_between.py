@@ -0,0 +1,58 @@
+import itertools
+
+import pytest
+
+from symsat.clausebuilder import AdderNetwork, Between, Equal, Literal
+from symsat.cnf import CNF
+from testing.brute import models, symbolic_models
+
+def counted(n, low, high):
+  '''Returns the assignments of n values with between low and high true.'''
+  return set(v for v in itertools.product((False, True), repeat=n) if low <= sum(v) <= high)
+
+def cells(n):
+  return [Literal('x%d' % i) for i in range(n)]
+
+@pytest.mark.parametrize('n', range(1, 6))
+def test_equal_exact_counts(n):
+  variables = cells(n)
+  names = [x.name for x in variables]
+  for limit in range(n + 1):
+    clauses = list(Equal(variables, limit).iter_clauses())
+    assert symbolic_models(clauses, names) == counted(n, limit, limit)
+
+@pytest.mark.parametrize('n', range(1, 6))
+def test_between_exact_counts(n):
+  variables = cells(n)
+  names = [x.name for x in variables]
+  for low in range(n + 1):
+    for high in range(low, n + 2):
+      clauses = list(Between(variables, (low, high)).iter_clauses())
+      assert symbolic_models(clauses, names) == counted(n, low, high)
+
+def test_adder_network_is_functional():
+  # the outputs are determined by the inputs, so there is one model per assignment
+  variables = cells(5)
+  cnf = CNF.from_symbolic(AdderNetwork(variables).iter_clauses())
+  assert len(models(list(cnf))) == 2 ** 5
+
+def test_shared_network():
+  variables = cells(4)
+  names = [x.name for x in variables]
+  network = AdderNetwork(variables)
+  first = Between(variables, (1, 3), network)
+  second = Equal(variables, 2, network, shared=True)
+  assert second.adder_clauses == []
+  assert len(list(second.iter_clauses())) == len(second.constraint_clauses)
+  clauses = list(first.iter_clauses()) + list(second.iter_clauses())
+  assert symbolic_models(clauses, names) == counted(4, 2, 2)
+  cnf = CNF()
+  first.add_to(cnf)
+  second.add_to(cnf)
+  assert list(cnf.symbolic()) == clauses
+
+def test_impossible_bounds():
+  with pytest.raises(ValueError):
+    Equal(cells(3), 4)
+  with pytest.raises(ValueError):
+    Between(cells(3), (2, 1))
@@ -0,0 +1,94 @@
+import itertools
+
+import pytest
+
+from symsat.clausebuilder import (ENCODINGS, ZERO, Between, Equal, GreaterThanOrEqual,
+                                  LessThanOrEqual, Literal, choose_encoding, remove_constants)
+from symsat.cnf import CNF
+from symsat.gridbuilder import (MooreGridNode, Open, PeriodicTimeAdjust, bound_population,
+                                build_grid, population_literals)
+from testing.brute import symbolic_models
+
+def cells(n):
+  return [Literal('x%d' % i) for i in range(n)]
+
+def counted(n, test):
+  return set(v for v in itertools.product((False, True), repeat=n) if test(sum(v)))
+
+@pytest.mark.parametrize('encoding', sorted(ENCODINGS))
+@pytest.mark.parametrize('n', range(1, 6))
+def test_exact_model_counts(encoding, n):
+  variables = cells(n)
+  names = [x.name for x in variables]
+  for limit in range(n + 2):
+    clauses = list(LessThanOrEqual(variables, limit, encoding).iter_clauses())
+    assert symbolic_models(clauses, names) == counted(n, lambda k: k <= limit)
+  for limit in range(n + 1):
+    clauses = list(GreaterThanOrEqual(variables, limit, encoding).iter_clauses())
+    assert symbolic_models(clauses, names) == counted(n, lambda k: k >= limit)
+
+def test_single_variable_adder():
+  x = cells(1)
+  assert list(LessThanOrEqual(x, 1, 'adder').iter_clauses()) == []
+  assert list(GreaterThanOrEqual(x, 0, 'adder').iter_clauses()) == []
+  assert symbolic_models(list(LessThanOrEqual(x, 0, 'adder').iter_clauses()), ['x0']) == \
+      set([(False,)])
+  assert symbolic_models(list(GreaterThanOrEqual(x, 1, 'adder').iter_clauses()), ['x0']) == \
+      set([(True,)])
+
+@pytest.mark.parametrize('encoding', sorted(ENCODINGS))
+def test_add_to_matches_iter_clauses(encoding):
+  constraint = LessThanOrEqual(cells(6), 2, encoding)
+  cnf = constraint.add_to(CNF())
+  assert set(cnf) == set(CNF.from_symbolic(constraint.iter_clauses(), cnf.symbols))
+
+def test_choose_encoding():
+  assert choose_encoding(100, 1) == 'sequential'
+  assert choose_encoding(100, 50) == 'totalizer'
+  assert choose_encoding(1000, 100) == 'modulo_totalizer'
+  assert choose_encoding(4000, 1000) == 'sorting'
+  assert choose_encoding(10000, 1000) == 'adder'
+  assert LessThanOrEqual(cells(4), 1).encoding == 'sequential'
+
+def test_constants():
+  a, b, c, d = cells(4)
+  assert remove_constants([a, ZERO, b, c, d], 3, [b, ~c]) == ([a, d], 2)
+  clauses = list(LessThanOrEqual([a, ZERO, b, c, d], 2, 'totalizer', constants=[b, ~c])
+                 .iter_clauses())
+  assert symbolic_models(clauses, ['x0', 'x3']) == counted(2, lambda k: k <= 1)
+  with pytest.raises(ValueError):
+    LessThanOrEqual([a, b], 1, constants=[a, b])
+
+def test_errors():
+  with pytest.raises(ValueError):
+    LessThanOrEqual(cells(3), -1)
+  with pytest.raises(ValueError):
+    GreaterThanOrEqual(cells(3), 4)
+  with pytest.raises(ValueError):
+    LessThanOrEqual(cells(3), 1, 'unary')
+
+@pytest.mark.parametrize('comparator, size, test', [
+    (Equal, 2, lambda k: k == 2), (Between, (1, 2), lambda k: 1 <= k <= 2),
+    (LessThanOrEqual, 2, lambda k: k <= 2), (GreaterThanOrEqual, 3, lambda k: k >= 3)])
+@pytest.mark.parametrize('shared', [False, True])
+def test_population_bounds_with_constants(comparator, size, test, shared):
+  grid = build_grid(MooreGridNode((0, 0, 0), Open(2, 3), PeriodicTimeAdjust(1, 0, 0)))
+  names = [x.name for x in population_literals(grid)]
+  fixed = [Literal(names[0]), Literal(names[3], False)]
+  clauses = bound_population(grid, comparator, size, networks={} if shared else None,
+                             constants=fixed)
+  # the fixed cells are left to unit clauses
+  found = symbolic_models(clauses + [(x,) for x in fixed], names)
+  assert found == set(v for v in counted(len(names), test) if v[0] and not v[3])
+
+def test_population_encoding_errors():
+  grid = build_grid(MooreGridNode((0, 0, 0), Open(2, 2), PeriodicTimeAdjust(1, 0, 0)))
+  with pytest.raises(ValueError):
+    bound_population(grid, Equal, 2, encoding='totalizer')
+  with pytest.raises(ValueError):
+    bound_population(grid, LessThanOrEqual, 2, networks={}, encoding='totalizer')
+  with pytest.raises(ValueError):
+    bound_population(grid, LessThanOrEqual, 2, encoding='unary')
+  clauses = bound_population(grid, LessThanOrEqual, 2, encoding='totalizer')
+  names = [x.name for x in population_literals(grid)]
+  assert symbolic_models(clauses, names) == counted(4, lambda k: k <= 2)
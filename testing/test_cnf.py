@@ -0,0 +1,67 @@
+from symsat.clausebuilder import Literal, LessThanOrEqual
+from symsat.cnf import CNF, SymbolTable, int_disjunction
+from symsat.symbolic_util import parse_lines
+from symsat.tags import expand_tag_clauses
+from testing.brute import models, symbolic_models
+
+A, B, C = Literal('a'), Literal('b'), Literal('c')
+
+def test_symbol_table_round_trip():
+  symbols = SymbolTable(['a', 'b'])
+  assert symbols.variable('b') == 2
+  assert symbols.variable('x', 3) == 3
+  assert symbols.find('x') is None
+  assert symbols.key(3) == ('x', 3)
+  assert symbols.literal(~Literal('x', True, 3)) == -3
+  assert symbols.to_literal(-3) == Literal('x', False, 3)
+  assert symbols.has_tags() and len(symbols) == 3
+
+def test_symbolic_round_trip_keeps_comments_in_place():
+  clauses = ['first', (A, ~B), (C,), 'second', 'third', (~A, B, ~C), 'last']
+  cnf = CNF.from_symbolic(clauses)
+  assert list(cnf) == [(1, -2), (3,), (-1, 2, -3)]
+  assert list(cnf.symbolic()) == clauses
+  assert len(cnf) == 3 and cnf.num_variables() == 3
+
+def test_add_columns_matches_rows():
+  cnf, expected = CNF(), CNF()
+  columns = [[1, 2, 3], [-4, -5, -6]]
+  cnf.add_columns(columns)
+  cnf.add_columns([[7, 8]])
+  for row in zip(*columns):
+    expected.add_clause(row)
+  for x in (7, 8):
+    expected.add_clause((x,))
+  assert list(cnf) == list(expected)
+
+def test_minimized():
+  cnf = CNF()
+  for clause in [(1, 2), (2, 1, 1), (1, -1, 3), (3,)]:
+    cnf.add_clause(clause)
+  assert list(cnf.minimized()) == [(1, 2), (3,)]
+
+def test_int_disjunction_by_brute_force():
+  left, right = [(1, 2), (-3,)], [(3, 4), (-1,)]
+  expanded = int_disjunction(left, right)
+  variables = set([1, 2, 3, 4])
+  either = [a for a in models([], variables)
+            if a in models(left, variables) or a in models(right, variables)]
+  assert models(expanded, variables) == either
+
+def test_cardinality_into_cnf_matches_symbolic():
+  variables = [Literal('x%d' % i) for i in range(5)]
+  cardinality = LessThanOrEqual(variables, 2, 'adder')
+  cnf = cardinality.add_to(CNF())
+  names = [x.name for x in variables]
+  assert (symbolic_models(list(cnf.symbolic()), names) ==
+          symbolic_models(list(cardinality.iter_clauses()), names))
+
+def test_tag_expansion_of_cnf_matches_symbolic():
+  clauses = parse_lines('''
+    a(1) b(2)
+    ~a(2) b(0)
+  ''')
+  expanded = expand_tag_clauses(CNF.from_symbolic(clauses))
+  symbolic = expand_tag_clauses(clauses)
+  names = sorted(name for name, tag in expanded.symbols.keys())
+  assert symbolic_models(list(expanded.symbolic()), names) == symbolic_models(symbolic, names)
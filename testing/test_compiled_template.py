@@ -0,0 +1,40 @@
+import pytest
+
+from example.p2patch import LIFE_CONSTRAINTS as P2_CONSTRAINTS
+from example.rhombus import RHOMBUS_CONSTRAINTS
+from example.stilllife import LIFE_CONSTRAINTS
+from symsat.cnf import CNF
+from symsat.gridbuilder import (CompiledTemplate, GridTable, MooreGridNode, Open, PeriodicTimeAdjust,
+                                Tesselated, build_grid, inflate_grid_template)
+from symsat.rulesymmetry import G
+from symsat.tessellation import RotatedRhombus, RotatedSquare
+
+def clause_set(clauses):
+  return set(frozenset(map(str, clause)) for clause in clauses if not isinstance(clause, str))
+
+def rhombus_adjust(orientation, tag):
+  return (tag - orientation) % 3 if tag < 3 else tag
+
+CASES = [
+  (LIFE_CONSTRAINTS, Open(5, 4), PeriodicTimeAdjust(2, 0, 0), None),
+  (LIFE_CONSTRAINTS, Tesselated(RotatedSquare(6)), PeriodicTimeAdjust(1, 0, 0), None),
+  (P2_CONSTRAINTS, Tesselated(RotatedSquare(6)), PeriodicTimeAdjust(2, 0, 0), None),
+  (RHOMBUS_CONSTRAINTS, Tesselated(RotatedRhombus(6)), PeriodicTimeAdjust(1), rhombus_adjust),
+]
+
+@pytest.mark.parametrize('constraints, equivalence, time_adjust, adjust_tag', CASES)
+def test_compiled_matches_symbolic(constraints, equivalence, time_adjust, adjust_tag):
+  grid = build_grid(MooreGridNode((0, 0, 0), equivalence, time_adjust))
+  kwargs = {} if adjust_tag is None else {'adjust_tag': adjust_tag}
+  symbolic = inflate_grid_template(constraints, grid, G.name, **kwargs)
+  compiled = CompiledTemplate(constraints, G.name).inflate(GridTable(grid), **kwargs)
+  assert clause_set(compiled.symbolic()) == clause_set(symbolic)
+  assert ([x for x in compiled.symbolic() if isinstance(x, str)] ==
+          [x for x in symbolic if isinstance(x, str)])
+
+def test_compiled_template_is_reusable():
+  template = CompiledTemplate(LIFE_CONSTRAINTS, G.name)
+  for n in (3, 4):
+    grid = build_grid(MooreGridNode((0, 0, 0), Open(n, n), PeriodicTimeAdjust(1, 0, 0)))
+    via_cnf = inflate_grid_template(LIFE_CONSTRAINTS, grid, G.name, cnf=CNF())
+    assert clause_set(template.inflate(GridTable(grid)).symbolic()) == clause_set(via_cnf.symbolic())
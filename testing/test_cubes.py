@@ -0,0 +1,57 @@
+import io
+
+from symsat import solver
+from symsat.dimacs_sat import output_dimacs
+from symsat.gridbuilder import MooreGridNode, Open, PeriodicTimeAdjust, build_grid, split_cells
+from symsat.solver import (SAT, UNSAT, cube_and_conquer, make_cubes, solve_cubes, stream_cube,
+                           write_cube_file)
+from symsat.symbolic_util import parse_lines
+
+def write_dimacs(path, text):
+  with open(str(path), 'w') as out:
+    output_dimacs(parse_lines(text), out)
+  return str(path)
+
+def test_make_cubes():
+  assert make_cubes([3, 5]) == [(-3, -5), (-3, 5), (3, -5), (3, 5)]
+  assert make_cubes([]) == [()]
+
+def test_stream_cube_adds_units(tmp_path):
+  path = write_dimacs(tmp_path / 'in.dim', 'a b\n~a c')
+  out = io.StringIO()
+  stream_cube(path, (1, -2), out)
+  lines = out.getvalue().splitlines()
+  assert lines[0] == 'p cnf 3 4'
+  assert lines[-2:] == ['1 0', '-2 0']
+  cube_file = str(tmp_path / 'cube.dim')
+  write_cube_file(path, (1, -2), cube_file)
+  with open(cube_file) as inp:
+    assert inp.read() == out.getvalue()
+
+def test_cube_and_conquer_finds_the_satisfiable_cube(tmp_path, fake_solver):
+  path = write_dimacs(tmp_path / 'sat.dim', 'a\n~b\nc d')
+  seen = []
+  result = cube_and_conquer(path, ['a', 'b'], fake_solver, workers=2,
+                            progress=lambda index, cube, result: seen.append(cube))
+  assert result.status == SAT and result.cube == (1, -2)
+  assert 1 in result.values and -2 in result.values
+  assert (1, -2) in seen
+
+def test_cube_and_conquer_unsatisfiable(tmp_path, fake_solver):
+  path = write_dimacs(tmp_path / 'unsat.dim', 'a b\n~a\n~b')
+  result = cube_and_conquer(path, ['a', 'b'], fake_solver)
+  assert result.status == UNSAT and result.cube is None
+
+def test_solve_cubes_decodes(tmp_path, fake_solver, monkeypatch):
+  monkeypatch.setattr(solver, 'COMMAND', solver.SOLVERS[fake_solver][0])
+  path = write_dimacs(tmp_path / 'sat.dim', 'a\n~b\nc d\n~c')
+  solution = str(tmp_path / 'sat.out')
+  assert solve_cubes(path, ['a', 'b'], solution) == [('a', True), ('b', False), ('c', False),
+                                                     ('d', True)]
+  with open(solution) as inp:
+    assert inp.readline().strip() == 's SATISFIABLE'
+
+def test_split_cells_first_row():
+  grid = build_grid(MooreGridNode((0, 0, 0), Open(3, 4), PeriodicTimeAdjust(2, 0, 0)))
+  assert split_cells(grid, 3) == ['c_0_0_0', 'c_0_1_0', 'c_0_2_0']
+  assert split_cells(grid, 2, 1) == ['c_0_0_1', 'c_0_1_1']
@@ -0,0 +1,96 @@
+import io
+
+import pytest
+
+from symsat.clausebuilder import Literal
+from symsat.dimacs_sat import (HEADER_SIZE, DimacsWriter, output_dimacs, read_variable_names,
+                               stream_dimacs)
+from symsat.symbolic_util import parse_lines
+from symsat.tags import expand_tag_clauses, find_max
+from testing.brute import symbolic_models
+
+CLAUSES = parse_lines('''
+  # a comment
+  a ~b
+  b c ~a
+  ~c ~c
+  a ~a d
+  d
+''')
+
+class Unseekable(io.StringIO):
+  def seekable(self):
+    return False
+
+def parse_dimacs(text):
+  '''Returns the header counts, integer clauses and variable names of dimacs text.'''
+  header, clauses = None, []
+  for line in text.splitlines():
+    toks = line.split()
+    if toks and toks[0] == 'p':
+      header = int(toks[2]), int(toks[3])
+    elif toks and toks[0] != 'c':
+      assert toks[-1] == '0'
+      clauses.append(tuple(int(x) for x in toks[:-1]))
+  names = read_variable_names(io.StringIO(text))
+  return header, clauses, names
+
+def to_symbolic(clauses, names):
+  return [tuple(Literal(names[abs(x)], x > 0) for x in clause) for clause in clauses]
+
+@pytest.mark.parametrize('out_class', [io.StringIO, Unseekable])
+def test_round_trip(out_class):
+  out = out_class()
+  writer = stream_dimacs(iter(CLAUSES), out)
+  text = out.getvalue()
+  assert text.index('\n', text.index('p cnf')) < HEADER_SIZE
+  (num_variables, num_clauses), clauses, names = parse_dimacs(text)
+  assert (num_variables, num_clauses) == (4, 4) == (len(writer.symbols), writer.num_clauses)
+  assert [set(clause) for clause in clauses] == [set([1, -2]), set([-1, 2, 3]), set([-3]),
+                                                 set([4])]
+  assert (symbolic_models(to_symbolic(clauses, names), 'abcd') ==
+          symbolic_models(CLAUSES, 'abcd'))
+
+def test_matches_output_dimacs():
+  streamed, written = io.StringIO(), io.StringIO()
+  stream_dimacs(CLAUSES, streamed)
+  output_dimacs(CLAUSES, written)
+  assert parse_dimacs(streamed.getvalue())[:2] == parse_dimacs(written.getvalue())[:2]
+
+def test_header_patched_at_offset(tmp_path):
+  path = tmp_path / 'offset.dim'
+  with open(str(path), 'w') as out:
+    out.write('c written before\n')
+    stream_dimacs(CLAUSES, out)
+    out.write('1 0\n')
+  text = path.read_text()
+  assert text.startswith('c written before\np cnf 4 4\n')
+  assert parse_dimacs(text)[1][-1] == (1,)
+
+def test_tags_need_max_tags():
+  with pytest.raises(ValueError):
+    stream_dimacs(parse_lines('a(2) b'), io.StringIO())
+
+def test_tags_expand_like_expand_tag_clauses():
+  clauses = parse_lines('''
+    a(1) b(2)
+    ~a(2) ~b(0)
+  ''')
+  out = io.StringIO()
+  stream_dimacs(clauses, out, find_max(clauses))
+  _, streamed, names = parse_dimacs(out.getvalue())
+  expanded = expand_tag_clauses(clauses)
+  bits = sorted(set(names.values()))
+  assert symbolic_models(to_symbolic(streamed, names), bits) == symbolic_models(expanded, bits)
+
+def test_temporary_body_closed_on_error():
+  out = Unseekable()
+  with pytest.raises(RuntimeError):
+    with DimacsWriter(out) as writer:
+      writer.write_all(CLAUSES)
+      raise RuntimeError('stop')
+  assert writer.body.closed
+  assert out.getvalue() == ''
+  with DimacsWriter(Unseekable()) as writer:
+    writer.write_all(CLAUSES)
+  assert writer.body.closed
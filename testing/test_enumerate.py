@@ -0,0 +1,64 @@
+import pytest
+
+from symsat.cnf import CNF
+from symsat.dimacs_sat import append_dimacs, dimacs_header, output_dimacs
+from symsat.solver import enumerate_solutions
+from symsat.symbolic_util import parse_lines
+from testing.brute import symbolic_models
+
+ONE_OF_THREE = parse_lines('''
+  a b c
+  ~a ~b
+  ~a ~c
+  ~b ~c
+''')
+
+def solutions(results):
+  return set(tuple(value for _, value in result) for result in results)
+
+def test_enumerates_every_solution(fake_solver):
+  found = list(enumerate_solutions(ONE_OF_THREE, solver=fake_solver))
+  assert len(found) == 3
+  assert solutions(found) == symbolic_models(ONE_OF_THREE, 'abc')
+
+def test_limit(fake_solver):
+  assert len(list(enumerate_solutions(ONE_OF_THREE, limit=2, solver=fake_solver))) == 2
+
+def test_projection(fake_solver):
+  clauses = parse_lines('''
+    a b
+    c d
+  ''')
+  found = list(enumerate_solutions(clauses, project_on=['a', 'b'], solver=fake_solver))
+  assert len(found) == 3
+  assert set((dict(r)['a'], dict(r)['b']) for r in found) == symbolic_models(clauses, 'ab')
+  found = list(enumerate_solutions(clauses, project_on=lambda name: name in 'cd',
+                                   solver=fake_solver))
+  assert len(found) == 3
+
+def test_cnf_input_and_unsatisfiable(fake_solver):
+  assert len(list(enumerate_solutions(CNF.from_symbolic(ONE_OF_THREE), solver=fake_solver))) == 3
+  assert list(enumerate_solutions(parse_lines('a\n~a'), solver=fake_solver)) == []
+
+def test_blocking_clauses_are_appended(tmp_path, fake_solver):
+  dimacs = str(tmp_path / 'one.dim')
+  list(enumerate_solutions(ONE_OF_THREE, dimacs_file=dimacs, solver=fake_solver))
+  with open(dimacs) as inp:
+    text = inp.read()
+  assert text.startswith(dimacs_header(3, 7))
+  assert text.count('c excluded solution') == 3
+
+def test_append_dimacs(tmp_path):
+  path = str(tmp_path / 'append.dim')
+  with open(path, 'w') as out:
+    output_dimacs(ONE_OF_THREE, out)
+  append_dimacs(path, [(1, 2), (-3,)], 'more')
+  with open(path) as inp:
+    lines = inp.read().splitlines()
+  assert lines[0] == 'p cnf 3 6'
+  assert lines[-3:] == ['c more', '1 2 0', '-3 0']
+  unpadded = str(tmp_path / 'unpadded.dim')
+  with open(unpadded, 'w') as out:
+    out.write('p cnf 1 1\n1 0\n')
+  with pytest.raises(ValueError):
+    append_dimacs(unpadded, [(1,)])
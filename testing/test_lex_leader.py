@@ -0,0 +1,65 @@
+import itertools
+
+import pytest
+
+from symsat.clausebuilder import Equal, Literal
+from symsat.gridbuilder import (MooreGridNode, PeriodicTimeAdjust, Toroidal, build_grid,
+                                population_literals)
+from symsat.gridsymmetry import (canonical_form, compose, generators, grid_permutations,
+                                 grid_symmetries, lex_leader, lex_leader_clauses, map_name)
+from testing.brute import symbolic_models
+
+def torus(n):
+  return build_grid(MooreGridNode((0, 0, 0), Toroidal(n, n), PeriodicTimeAdjust(1, 0, 0)))
+
+def test_lex_leader_by_brute_force():
+  xs = [Literal('x%d' % i) for i in range(3)]
+  ys = [Literal('y%d' % i) for i in range(3)]
+  names = [x.name for x in xs + ys]
+  allowed = symbolic_models(lex_leader(xs, ys), names)
+  expected = set(v for v in itertools.product((False, True), repeat=6) if v[:3] <= v[3:])
+  assert allowed == expected
+  # only the first two pairs
+  allowed = symbolic_models(lex_leader(xs, ys, 2), names)
+  assert allowed == set(v for v in itertools.product((False, True), repeat=6)
+                        if (v[0], v[1]) <= (v[3], v[4]))
+
+def test_generators_generate_the_group():
+  permutations = grid_permutations(torus(3))
+  chosen = generators(permutations)
+  assert len(chosen) == 2
+  group = set([permutations[0]])
+  frontier = list(group)
+  while frontier:
+    element = frontier.pop()
+    for generator in chosen:
+      product = compose(element, generator)
+      if product not in group:
+        group.add(product)
+        frontier.append(product)
+  assert group == set(permutations)
+
+@pytest.mark.parametrize('strength, rotations', [('full', False), ('full', True),
+                                                 ('generators', False), (1, True)])
+def test_lex_leader_keeps_orbit_representatives(strength, rotations):
+  grid = torus(3)
+  literals = population_literals(grid)
+  names = [x.name for x in literals]
+  symmetries = grid_symmetries(grid, rotations)
+  clauses = list(Equal(literals, 2).iter_clauses())
+  everything = symbolic_models(clauses, names)
+  kept = symbolic_models(clauses + lex_leader_clauses(grid, strength, rotations), names)
+  def form(values):
+    return canonical_form(list(zip(names, values)), symmetries)
+  orbits = set(form(values) for values in everything)
+  assert kept <= everything
+  assert set(form(values) for values in kept) == orbits
+  if strength == 'full':
+    assert len(kept) == len(orbits)
+    # the representative is the least image, with false before true in cell order
+    for values in kept:
+      images = []
+      for symmetry in symmetries:
+        image = dict((map_name(name, symmetry), value) for name, value in zip(names, values))
+        images.append(tuple(image[name] for name in names))
+      assert values == min(images)
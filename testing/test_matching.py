@@ -0,0 +1,68 @@
+import itertools
+import random
+
+import pytest
+
+from symsat.clausebuilder import Literal
+from symsat.tags import (TABLE_ENCODINGS, bit_variable, iter_expand_tag_clauses,
+                         make_matching_clauses, table_rows, tag_bound_clauses)
+from testing.brute import symbolic_models
+
+NAMES = ['a', 'b', 'c']
+
+def random_rows(rng):
+  domains = [range(3), range(2), range(4)]
+  everything = list(itertools.product(*domains))
+  return rng.sample(everything, rng.randint(1, len(everything)))
+
+def matchers(rows):
+  return [tuple(Literal(name, True, tag) for name, tag in zip(NAMES, row)) for row in rows]
+
+def matched(clauses, rows):
+  '''Returns the tag rows allowed by matching clauses, projected through their bit encoding.'''
+  # the domains come from the table, since the clauses need not mention every tag
+  maxtags = dict((name, max(row[k] for row in rows)) for k, name in enumerate(NAMES))
+  expanded = list(iter_expand_tag_clauses(clauses, maxtags))
+  for name in NAMES:
+    expanded.extend(tag_bound_clauses(name, maxtags[name]))
+  bits = [(name, i) for name in NAMES for i in range(maxtags[name].bit_length())]
+  found = set()
+  for values in symbolic_models(expanded, [bit_variable(*x) for x in bits]):
+    tags = dict.fromkeys(NAMES, 0)
+    for (name, i), value in zip(bits, values):
+      tags[name] |= value << i
+    found.add(tuple(tags[name] for name in NAMES))
+  return found
+
+@pytest.mark.parametrize('encoding', TABLE_ENCODINGS)
+def test_matching_clauses_allow_exactly_the_table(encoding):
+  rng = random.Random(22)
+  for trial in range(12):
+    rows = random_rows(rng)
+    clauses = make_matching_clauses(matchers(rows), encoding)
+    assert matched(clauses, rows) == set(rows)
+
+def test_trie_is_no_larger_than_product():
+  rng = random.Random(7)
+  for trial in range(20):
+    tuples = matchers(random_rows(rng))
+    trie = make_matching_clauses(tuples)
+    assert len(trie) <= len(make_matching_clauses(tuples, 'product'))
+    # the trie needs no helper variables
+    assert set(x.name for clause in trie for x in clause) <= set(NAMES)
+
+def test_table_rows_and_cache():
+  tuples = matchers([(1, 0, 2), (0, 1, 0), (1, 0, 2)])
+  assert table_rows(tuples) == (NAMES, {'a': 1, 'b': 1, 'c': 2}, [(0, 1, 0), (1, 0, 2)])
+  clauses = make_matching_clauses(tuples)
+  assert make_matching_clauses(list(reversed(tuples))) == clauses
+  support = make_matching_clauses(tuples, 'support', 'left')
+  assert Literal('left0$') in support[0]
+  assert make_matching_clauses(tuples, 'support', 'right')[0] == (Literal('right0$'),
+                                                                  Literal('right1$'))
+  with pytest.raises(ValueError):
+    make_matching_clauses(tuples, 'bdd')
+  with pytest.raises(Exception):
+    table_rows([(Literal('a', True, 0),), (Literal('b', True, 0),)])
+  with pytest.raises(Exception):
+    table_rows([(Literal('a', False, 0),)])
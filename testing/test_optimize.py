@@ -0,0 +1,63 @@
+import itertools
+
+import pytest
+
+from symsat.clausebuilder import Literal, Totalizer
+from symsat.cnf import CNF
+from symsat.solver import optimize_count
+from symsat.symbolic_util import parse_lines
+from testing.brute import symbolic_models
+
+# at least one of each pair, but not both x0 and x2: 3 to 5 true
+CLAUSES = parse_lines('''
+  x0 x1
+  x2 x3
+  x4 x5
+  ~x0 ~x2
+''')
+VARIABLES = [Literal('x%d' % i) for i in range(6)]
+
+def count(results):
+  values = dict(results)
+  return sum(1 for x in VARIABLES if values[x.name])
+
+@pytest.mark.parametrize('search', ['linear', 'binary'])
+@pytest.mark.parametrize('minimize, expected', [(True, 3), (False, 5)])
+def test_optimum(fake_solver, search, minimize, expected):
+  best, results, optimal = optimize_count(CLAUSES, VARIABLES, minimize, search, solver=fake_solver)
+  assert (best, optimal) == (expected, True)
+  assert count(results) == expected
+  counts = [sum(v) for v in symbolic_models(CLAUSES, [x.name for x in VARIABLES])]
+  assert best == (min(counts) if minimize else max(counts))
+
+def test_bounds(fake_solver):
+  assert optimize_count(CLAUSES, VARIABLES, low=4, solver=fake_solver)[0] == 4
+  assert optimize_count(CLAUSES, VARIABLES, False, high=4, solver=fake_solver)[0] == 4
+  best, results, optimal = optimize_count(CLAUSES, VARIABLES, high=2, solver=fake_solver)
+  assert (best, results, optimal) == (None, None, True)
+
+def test_cnf_input_and_dimacs_file(tmp_path, fake_solver):
+  dimacs = str(tmp_path / 'opt.dim')
+  best, _, _ = optimize_count(CNF.from_symbolic(CLAUSES), VARIABLES, dimacs_file=dimacs,
+                              solver=fake_solver)
+  assert best == 3
+  with open(dimacs) as inp:
+    assert 'c count at most 2:' in inp.read()
+  with pytest.raises(ValueError):
+    optimize_count(CLAUSES, VARIABLES, search='ternary', solver=fake_solver)
+
+@pytest.mark.parametrize('n', range(1, 6))
+def test_totalizer_bounds(n):
+  variables = [Literal('y%d' % i) for i in range(n)]
+  names = [x.name for x in variables]
+  everything = list(itertools.product((False, True), repeat=n))
+  for low in range(n + 1):
+    for high in range(low, n + 1):
+      totalizer = Totalizer(variables)
+      clauses = list(totalizer.iter_clauses()) + totalizer.bound_clauses(low, high)
+      assert symbolic_models(clauses, names) == set(v for v in everything
+                                                    if low <= sum(v) <= high)
+  totalizer = Totalizer(variables)
+  assert totalizer.at_most(n) is None and totalizer.at_least(0) is None
+  with pytest.raises(ValueError):
+    totalizer.bound_clauses(n + 1, n + 1)
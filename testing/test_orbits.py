@@ -0,0 +1,60 @@
+import itertools
+
+import pytest
+
+from symsat.clausebuilder import Equal
+from symsat.gridbuilder import (MooreGridNode, PeriodicTimeAdjust, Toroidal, build_grid,
+                                population_literals)
+from symsat.gridsymmetry import canonical_form, grid_symmetries, map_name, orbit
+from symsat.solver import enumerate_solutions
+
+def torus(n):
+  return build_grid(MooreGridNode((0, 0, 0), Toroidal(n, n), PeriodicTimeAdjust(1, 0, 0)))
+
+def orbit_count(names, alive, symmetries):
+  '''Counts the orbits of the sets of alive cells directly.'''
+  forms = set()
+  for cells in itertools.combinations(names, alive):
+    values = [(name, name in cells) for name in names]
+    forms.add(canonical_form(values, symmetries))
+  return len(forms)
+
+@pytest.mark.parametrize('rotations, expected', [(False, 9), (True, 72)])
+def test_torus_symmetries_form_a_group(rotations, expected):
+  grid = torus(3)
+  symmetries = grid_symmetries(grid, rotations)
+  assert len(symmetries) == expected
+  assert symmetries[0] == {}
+  names = [x.name for x in population_literals(grid)]
+  # closed under composition
+  keys = set(tuple(map_name(name, s) for name in names) for s in symmetries)
+  for s, t in itertools.product(symmetries[:6], repeat=2):
+    assert tuple(map_name(map_name(name, s), t) for name in names) in keys
+
+@pytest.mark.parametrize('rotations, orbits', [(False, 4), (True, 2)])
+def test_orbit_counts_of_two_cells(rotations, orbits):
+  grid = torus(3)
+  names = [x.name for x in population_literals(grid)]
+  assert orbit_count(names, 2, grid_symmetries(grid, rotations)) == orbits
+
+@pytest.mark.parametrize('rotations', [False, True])
+def test_enumeration_yields_one_solution_per_orbit(fake_solver, rotations):
+  grid = torus(3)
+  literals = population_literals(grid)
+  names = [x.name for x in literals]
+  symmetries = grid_symmetries(grid, rotations)
+  clauses = list(Equal(literals, 2).iter_clauses())
+  found = list(enumerate_solutions(clauses, project_on=names, solver=fake_solver,
+                                   symmetries=symmetries))
+  forms = set(canonical_form([(name, value) for name, value in result if name in names],
+                             symmetries) for result in found)
+  assert len(found) == len(forms) == orbit_count(names, 2, symmetries)
+
+def test_map_name_and_orbit():
+  symmetry = {'c_0_0_0': 'c_0_1_0', 'c_0_1_0': 'c_0_0_0'}
+  assert map_name('stator$c_0_0_0', symmetry) == 'stator$c_0_1_0'
+  assert map_name('c_0_1_0#2', symmetry) == 'c_0_0_0#2'
+  assert map_name('other', symmetry) == 'other'
+  values = [('c_0_0_0', True), ('c_0_1_0', False)]
+  assert orbit(values, [{}, symmetry]) == set([frozenset(values),
+                                                frozenset([('c_0_1_0', True), ('c_0_0_0', False)])])
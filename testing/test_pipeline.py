@@ -0,0 +1,57 @@
+import io
+
+from example.stilllife import LIFE_CONSTRAINTS
+from example.triominoes import ALL_CLAUSES
+from symsat.clausebuilder import GreaterThanOrEqual, LessThanOrEqual, Literal
+from symsat.dimacs_sat import (iter_minimize_clauses, minimize_clauses, output_symbolic,
+                               tee_symbolic)
+from symsat.gridbuilder import (MooreGridNode, Open, PeriodicTimeAdjust, Toroidal, bound_population,
+                                build_grid, inflate_grid_template, iter_bound_cardinality,
+                                iter_inflate_grid_template, population_literals)
+from symsat.rulesymmetry import G, TOTALISTIC, expand_symmetry, iter_expand_symmetry
+from symsat.symbolic_util import parse_lines
+from symsat.tags import expand_tag_clauses, iter_expand_tag_clauses
+from testing.brute import symbolic_models
+
+def test_iter_inflate_grid_template_matches_list():
+  grid = build_grid(MooreGridNode((0, 0, 0), Open(4, 4), PeriodicTimeAdjust(2, 0, 0)))
+  assert (list(iter_inflate_grid_template(LIFE_CONSTRAINTS, grid, G.name)) ==
+          inflate_grid_template(LIFE_CONSTRAINTS, grid, G.name))
+
+def test_iter_expand_symmetry_matches_list():
+  clauses = parse_lines('''
+    # birth
+    G ~O N NE E ~SE ~S ~SW ~W ~NW
+  ''')
+  assert list(iter_expand_symmetry(TOTALISTIC, iter(clauses))) == expand_symmetry(TOTALISTIC, clauses)
+
+def test_iter_expand_tag_clauses_matches_list():
+  grid = build_grid(MooreGridNode((0, 0, 0), Toroidal(3, 4), PeriodicTimeAdjust(1, 0, 0)))
+  tag_clauses = inflate_grid_template(ALL_CLAUSES, grid, G.name)
+  assert list(iter_expand_tag_clauses(iter(tag_clauses))) == expand_tag_clauses(tag_clauses)
+
+def test_iter_bound_cardinality_has_the_same_models():
+  grid = build_grid(MooreGridNode((0, 0, 0), Open(3, 3), PeriodicTimeAdjust(1, 0, 0)))
+  names = [x.name for x in population_literals(grid)]
+  for comparator, size in ((LessThanOrEqual, 3), (GreaterThanOrEqual, 7)):
+    streamed = list(iter_bound_cardinality(grid, comparator, size, 0, '', encoding='adder'))
+    listed = bound_population(grid, comparator, size, encoding='adder')
+    assert isinstance(streamed[0], str)
+    assert symbolic_models(streamed, names) == symbolic_models(listed, names)
+
+def test_iter_minimize_clauses_per_section():
+  a, b = Literal('a'), Literal('b')
+  clauses = ['one', (a, b), (b, a, a), 'two', (a, b), (a, ~a)]
+  assert list(iter_minimize_clauses(clauses)) == minimize_clauses(clauses) == ['one', (a, b), 'two']
+  assert list(iter_minimize_clauses(clauses, per_section=True)) == ['one', (a, b), 'two', (a, b)]
+
+def test_tee_symbolic_writes_what_passes_through():
+  clauses = parse_lines('''
+    # comment
+    a ~b
+    c
+  ''')
+  teed, written = io.StringIO(), io.StringIO()
+  assert list(tee_symbolic(iter(clauses), teed)) == clauses
+  output_symbolic(clauses, written)
+  assert teed.getvalue() == written.getvalue()
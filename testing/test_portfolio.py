@@ -0,0 +1,54 @@
+import stat
+import sys
+import time
+
+import pytest
+
+from symsat import solver
+from symsat.dimacs_sat import output_dimacs
+from symsat.solver import PORTFOLIO_WINS, SAT, UNSAT, portfolio, run_portfolio
+from symsat.symbolic_util import parse_lines
+
+def add_solver(tmp_path, monkeypatch, name, program):
+  '''Registers a Python program as a solver.'''
+  path = tmp_path / name
+  path.write_text('#!%s\n%s\n' % (sys.executable, program))
+  path.chmod(path.stat().st_mode | stat.S_IEXEC)
+  monkeypatch.setitem(solver.SOLVERS, name, (str(path), True))
+  return name
+
+@pytest.fixture
+def instance(tmp_path):
+  path = str(tmp_path / 'sat.dim')
+  with open(path, 'w') as out:
+    output_dimacs(parse_lines('a b\n~a'), out)
+  return path
+
+def test_portfolio_configurations(monkeypatch):
+  monkeypatch.setattr(solver, 'SOLVERS', {'seeded': ('x', True), 'unseeded': ('y', False)})
+  assert portfolio(seeds=(1, 2)) == [('seeded', 1), ('seeded', 2), ('unseeded', 1)]
+
+def test_first_definitive_result_wins(tmp_path, monkeypatch, fake_solver, instance):
+  slow = add_solver(tmp_path, monkeypatch, 'slow', 'import time; time.sleep(30)')
+  log = str(tmp_path / 'log')
+  wins = PORTFOLIO_WINS[(fake_solver, None)]
+  start = time.time()
+  result = run_portfolio(instance, [(slow, None), (fake_solver, None)], log_file=log)
+  assert time.time() - start < 10
+  assert result.status == SAT and result.configuration == (fake_solver, None)
+  assert PORTFOLIO_WINS[(fake_solver, None)] == wins + 1
+  with open(log) as inp:
+    assert inp.read().split('\t')[1:4] == [fake_solver, 'None', SAT]
+
+def test_failing_run_does_not_hang(tmp_path, monkeypatch, fake_solver, instance):
+  broken = add_solver(tmp_path, monkeypatch, 'broken', 'print("s SATISFIABLE"); print("v x 0")')
+  result = run_portfolio(instance, [(broken, None), (fake_solver, None)])
+  assert result.status == SAT
+  with pytest.raises(ValueError):
+    run_portfolio(instance, [(broken, None), (broken, 1)])
+
+def test_no_definitive_result(tmp_path, monkeypatch, instance):
+  unknown = add_solver(tmp_path, monkeypatch, 'unknown', 'raise SystemExit(0)')
+  unsat = add_solver(tmp_path, monkeypatch, 'unsat', 'print("s UNSATISFIABLE")')
+  assert run_portfolio(instance, [(unknown, None)]).status == solver.UNKNOWN
+  assert run_portfolio(instance, [(unknown, None), (unsat, None)]).status == UNSAT
@@ -0,0 +1,102 @@
+import io
+import random
+
+from symsat import solver
+from symsat.cnf import CNF, Reductions
+from symsat.dimacs_sat import output_dimacs
+from symsat.preprocess import (Preprocessor, preprocess, read_reconstruction, reconstruct,
+                               write_reconstruction)
+from symsat.symbolic_util import parse_lines
+from testing.brute import is_satisfiable, models, projected, satisfies
+
+NVARS = 8
+
+def random_cnf(rng):
+  cnf = CNF()
+  for _ in range(rng.randint(4, 20)):
+    names = rng.sample(range(1, NVARS + 1), rng.choice((1, 2, 2, 2, 3, 3)))
+    cnf.add_clause([x if rng.random() < 0.5 else -x for x in names])
+  return cnf
+
+def test_preprocessed_models_reconstruct():
+  rng = random.Random(25)
+  variables = range(1, NVARS + 1)
+  for trial in range(150):
+    cnf = random_cnf(rng)
+    simplified, stack = preprocess(cnf)
+    clauses = list(cnf)
+    assert is_satisfiable(list(simplified), {}) == is_satisfiable(clauses, {})
+    for model in models(list(simplified), variables):
+      values = reconstruct(stack, [v if model[v] else -v for v in variables])
+      assert satisfies(clauses, dict((abs(x), x > 0) for x in values))
+
+def test_frozen_variables_keep_their_models():
+  rng = random.Random(2)
+  for trial in range(100):
+    cnf = random_cnf(rng)
+    frozen = rng.sample(range(1, NVARS + 1), 3)
+    simplified, stack = preprocess(cnf, frozen)
+    assert projected(list(simplified), frozen) == projected(list(cnf), frozen)
+    # frozen variables are neither substituted nor eliminated
+    assert not any(step[1] in frozen for step in stack if step[0] == 'e')
+    assert not any(abs(step[1][0]) in frozen for step in stack if step[0] == 'x')
+
+def test_techniques():
+  # a -> b -> c -> a are equivalent, and ~x fails since x implies both d and ~d
+  cnf = CNF.from_symbolic(parse_lines('''
+    ~a b
+    ~b c
+    ~c a
+    a e f
+    ~x d
+    ~x ~d
+    x g
+  '''))
+  preprocessor = Preprocessor(cnf, ['e', 'f', 'g']).run()
+  assert preprocessor.equivalent == 2
+  assert preprocessor.failed >= 1
+  assert not preprocessor.unsat
+  reductions = Reductions()
+  preprocessor.to_cnf(reductions, cnf)
+  assert reductions.clauses > 0 and reductions.variables > 0
+  unsat = Preprocessor(CNF.from_symbolic(parse_lines('a b\n~a\n~b'))).run()
+  assert unsat.unsat and list(unsat.to_cnf()) == [()]
+
+def test_reconstruction_round_trip():
+  rng = random.Random(9)
+  for trial in range(20):
+    _, stack = preprocess(random_cnf(rng))
+    out = io.StringIO()
+    write_reconstruction(stack, out)
+    assert read_reconstruction(io.StringIO(out.getvalue())) == stack
+
+def test_preprocessed_dimacs_solves_the_original(tmp_path, fake_solver, monkeypatch):
+  monkeypatch.setattr(solver, 'COMMAND', solver.SOLVERS[fake_solver][0])
+  clauses = parse_lines('''
+    ~a b
+    ~b a
+    a c
+    ~c d e
+    ~e f
+    ~f ~d
+    g
+  ''')
+  path = str(tmp_path / 'pre.dim')
+  with open(path, 'w') as out, open(path + '.var', 'w') as variable_map, \
+       open(path + '.rec', 'w') as reconstruction:
+    output_dimacs(clauses, out, variable_map, False, reconstruction=reconstruction, frozen=['c'])
+  with open(path) as inp:
+    text = inp.read()
+  assert 'c reconstruction: pre.dim.rec' in text
+  with open(path + '.rec') as inp:
+    assert read_reconstruction(inp)
+  values = dict(solver.solve(path))
+  assert sorted(values) == list('abcdefg')
+  assert all(any(values[x.name] == x.value for x in clause) for clause in clauses)
+
+def test_eliminated_counts_eliminated_variables():
+  rng = random.Random(4)
+  for trial in range(100):
+    preprocessor = Preprocessor(random_cnf(rng)).run()
+    steps = set(abs(step[1][0]) for step in preprocessor.stack if step[0] == 'x')
+    assert preprocessor.eliminated == len(steps)
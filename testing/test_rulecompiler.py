@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+from symsat import rulecompiler
+from symsat.clausebuilder import Literal
+from symsat.rulecompiler import (MOORE_TEMPLATE_SYMBOLS, compile_rule, compile_table, cube_clause,
+                                 cube_rows, minimize_table, template_symbols, totalistic_table,
+                                 truth_table)
+
+def allowed(clauses, symbols, row):
+  '''Evaluates template clauses on the assignment giving symbol k bit k of row.'''
+  values = dict((symbol, bool((row >> k) & 1)) for k, symbol in enumerate(symbols))
+  return all(any(values[x.name] == x.value for x in clause) for clause in clauses
+             if not isinstance(clause, str))
+
+def table_of(clauses, symbols):
+  return sum(1 << row for row in range(1 << len(symbols)) if allowed(clauses, symbols, row))
+
+def test_truth_table_matches_evaluation():
+  rng = random.Random(18)
+  symbols = ['a', 'b', 'c', 'd']
+  for trial in range(100):
+    clauses = [tuple(Literal(s, rng.random() < 0.5) for s in rng.sample(symbols, rng.randint(1, 4)))
+               for _ in range(rng.randint(0, 5))]
+    assert truth_table(['comment'] + clauses, symbols) == table_of(clauses, symbols)
+  with pytest.raises(ValueError):
+    truth_table([(Literal('z'),)], symbols)
+  with pytest.raises(ValueError):
+    truth_table([], ['s%d' % k for k in range(17)])
+
+@pytest.mark.parametrize('n', [1, 2, 3])
+def test_minimize_every_table(n):
+  symbols = 'abc'[:n]
+  for table in range(1 << (1 << n)):
+    cubes = minimize_table(table, n)
+    clauses = [cube_clause(cube, symbols) for cube in cubes]
+    assert table_of(clauses, symbols) == table
+    false_rows = set(row for row in range(1 << n) if not (table >> row) & 1)
+    for k, cube in enumerate(cubes):
+      rows = set(cube_rows(cube, n))
+      # each cube is prime: it covers only false rows and no literal can be dropped
+      assert rows <= false_rows
+      values, care = cube
+      for bit in range(n):
+        if care & (1 << bit):
+          assert not set(cube_rows((values & ~(1 << bit), care & ~(1 << bit)), n)) <= false_rows
+      # and irredundant
+      others = set()
+      for j, other in enumerate(cubes):
+        if j != k:
+          others.update(cube_rows(other, n))
+      assert not rows <= others
+
+def test_minimize_random_tables():
+  rng = random.Random(4)
+  symbols = 'abcde'
+  for trial in range(50):
+    table = rng.getrandbits(32)
+    clauses = [cube_clause(cube, symbols) for cube in minimize_table(table, 5)]
+    assert truth_table(clauses, symbols) == table
+
+def test_totalistic_table_is_life():
+  table = totalistic_table(set([3]), set([2, 3]))
+  for row in range(1 << 10):
+    alive, count, born = row & 1, bin(row & 0x1fe).count('1'), bool(row >> 9)
+    assert bool((table >> row) & 1) == (born == (count == 3 or (alive and count == 2)))
+
+def test_compile_rule(cache_dir):
+  life = totalistic_table(set([3]), set([2, 3]))
+  compiled = compile_rule('B3/S23')
+  assert compiled[0] == 'Compiled rule B3/S23'
+  assert template_symbols(compiled) == MOORE_TEMPLATE_SYMBOLS
+  assert truth_table(compiled, MOORE_TEMPLATE_SYMBOLS) == life
+  # template clauses compile to the same table
+  clauses = compile_rule(compiled[1:])
+  assert truth_table(clauses, MOORE_TEMPLATE_SYMBOLS) == life
+
+def test_compile_table_cache(cache_dir, monkeypatch):
+  symbols = ['a', 'b', 'c']
+  table = 0b10010110
+  clauses = compile_table(table, symbols)
+  assert truth_table(clauses, symbols) == table
+  assert len(list(cache_dir.iterdir())) == 1
+  assert compile_table(0b1110, ['a', 'b'], cache=False) == [(Literal('a'), Literal('b'))]
+  assert len(list(cache_dir.iterdir())) == 1
+  # read back from disk in a fresh process
+  monkeypatch.setattr(rulecompiler, 'COMPILED', {})
+  monkeypatch.setattr(rulecompiler, 'minimize_table', None)
+  assert compile_table(table, symbols) == clauses
@@ -0,0 +1,91 @@
+import itertools
+
+import pytest
+
+from symsat import rulesymmetry
+from symsat.rulecompiler import MOORE_TEMPLATE_SYMBOLS, totalistic_table, truth_table
+from symsat.rulesymmetry import (HENSEL_BITS, HENSEL_LETTERS, parse_hensel, parse_rulestring,
+                                 rule_template)
+
+HEX_SYMBOLS = ['O', 'NW', 'N', 'E', 'SE', 'S', 'W', 'G']
+
+def d4_images(bits):
+  '''Returns the images of a 3x3 block (bit 3 * row + column) under rotations and reflections.'''
+  cells = [(k // 3, k % 3) for k in range(9) if (bits >> k) & 1]
+  images = set()
+  for transpose, flip_rows, flip_columns in itertools.product((False, True), repeat=3):
+    image = 0
+    for r, c in cells:
+      if transpose:
+        r, c = c, r
+      image |= 1 << (3 * (2 - r if flip_rows else r) + (2 - c if flip_columns else c))
+    images.add(image)
+  return images
+
+def neighbor_bits(row):
+  '''Returns the 3x3 block of the neighbors in a truth table row over MOORE_TEMPLATE_SYMBOLS.'''
+  return sum(HENSEL_BITS[symbol] for k, symbol in enumerate(MOORE_TEMPLATE_SYMBOLS)
+             if symbol in HENSEL_BITS and (row >> k) & 1)
+
+@pytest.mark.parametrize('text, canonical', [('B3/S23', 'B3/S23'), ('b3s23', 'B3/S23'),
+                                             ('B36/S23', 'B36/S23'), ('B2/S34H', 'B2/S34H'),
+                                             ('B2-a/S12', 'B2ceikn/S12'), ('B2ae3/S', 'B2ae3/S'),
+                                             ('B3ceaiknjqry/S2-', 'B3/S2')])
+def test_round_trip(text, canonical):
+  rule = parse_rulestring(text)
+  assert str(rule) == canonical
+  assert str(parse_rulestring(canonical)) == canonical
+
+def test_parse_hensel():
+  assert parse_hensel('2-a') == set((2, x) for x in 'ceikn')
+  assert parse_hensel('1e3') == set([(1, 'e')] + [(3, x) for x in HENSEL_LETTERS[3]])
+  with pytest.raises(ValueError):
+    parse_hensel('1a')
+  for text in ('B9/S', 'B7/S1H', 'B3x/S', 'life'):
+    with pytest.raises(ValueError):
+      parse_rulestring(text)
+
+def test_hensel_letters_partition_each_count():
+  for count in range(9):
+    orbits = [d4_images(bits) for bits in HENSEL_LETTERS[count].values()]
+    configurations = set(sum(1 << k for k in cells)
+                         for cells in itertools.combinations([0, 1, 2, 3, 5, 6, 7, 8], count))
+    assert sum(len(orbit) for orbit in orbits) == len(configurations)
+    assert set().union(*orbits) == configurations
+
+def test_totalistic_templates(cache_dir):
+  life = truth_table(rule_template('B3/S23'), MOORE_TEMPLATE_SYMBOLS)
+  assert life == totalistic_table(set([3]), set([2, 3]))
+  # every letter of a count is the count
+  assert truth_table(rule_template('B3ceaiknjqry/S2-3'), MOORE_TEMPLATE_SYMBOLS) == life
+  hexagonal = truth_table(rule_template('B2/S34H'), HEX_SYMBOLS)
+  assert hexagonal == totalistic_table(set([2]), set([3, 4]), HEX_SYMBOLS)
+
+def test_hensel_template(cache_dir):
+  # alternate letters of each count between birth and survival
+  birth, survival = '', ''
+  for count in range(9):
+    letters = sorted(HENSEL_LETTERS[count])
+    birth += str(count) + ''.join(letters[::2])
+    if letters[1::2]:
+      survival += str(count) + ''.join(letters[1::2])
+  rule = parse_rulestring('B%s/S%s' % (birth, survival))
+  table = truth_table(rule_template(str(rule)), MOORE_TEMPLATE_SYMBOLS)
+  for row in range(1 << 10):
+    bits = neighbor_bits(row)
+    count = bin(bits).count('1')
+    letter = [x for x, y in HENSEL_LETTERS[count].items() if bits in d4_images(y)][0]
+    conditions = rule.survival if row & 1 else rule.birth
+    assert bool((table >> row) & 1) == (bool(row >> 9) == ((count, letter) in conditions))
+
+def test_template_cache(cache_dir, monkeypatch):
+  clauses = rule_template('B3/S23')
+  assert len(list(cache_dir.iterdir())) == 1
+  assert rule_template('b3s23') == clauses
+  monkeypatch.setattr(rulesymmetry, 'RULE_TEMPLATES', {})
+  monkeypatch.setattr(rulesymmetry, 'expand_symmetry', None)
+  assert rule_template('B3/S23') == clauses
+  monkeypatch.setattr(rulesymmetry, 'RULE_TEMPLATES', {})
+  with pytest.raises(TypeError):
+    rule_template('B36/S23', cache=False)
+  assert len(list(cache_dir.iterdir())) == 1
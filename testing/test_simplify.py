@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+from example.stilllife import LIFE_CONSTRAINTS
+from symsat.clausebuilder import GreaterThanOrEqual, Literal
+from symsat.cnf import CNF, Reductions
+from symsat.gridbuilder import (MooreGridNode, Open, PeriodicTimeAdjust, Toroidal, bound_population,
+                                build_grid, inflate_grid_template, iter_inflate_grid_template,
+                                population_literals)
+from symsat.rulesymmetry import G
+from symsat.symbolic_util import parse_lines
+from testing.brute import models, symbolic_models
+
+def random_cnf(rng, nvars=6):
+  cnf = CNF()
+  for name in range(1, nvars + 1):
+    cnf.symbols.variable('v%d' % name)
+  for _ in range(rng.randint(1, 10)):
+    names = rng.sample(range(1, nvars + 1), rng.randint(1, 3))
+    cnf.add_clause([x if rng.random() < 0.5 else -x for x in names])
+  return cnf
+
+def test_simplified_keeps_models():
+  rng = random.Random(24)
+  variables = range(1, 7)
+  for trial in range(200):
+    cnf = random_cnf(rng)
+    # constants only matter for variables the clauses use
+    used = sorted(set(abs(x) for clause in cnf for x in clause))
+    constants = [x if rng.random() < 0.5 else -x
+                 for x in rng.sample(used, min(len(used), rng.randint(0, 2)))]
+    simplified = cnf.simplified(constants)
+    expected = [a for a in models(list(cnf), variables)
+                if all(a[abs(x)] == (x > 0) for x in constants)]
+    assert models(list(simplified), variables) == expected
+    # a fixpoint: no constant is left in a longer clause
+    units = set(clause[0] for clause in simplified if len(clause) == 1)
+    assert not any(abs(x) in set(map(abs, units)) for clause in simplified if len(clause) > 1
+                   for x in clause)
+    assert list(simplified.simplified()) == list(simplified)
+
+def test_units_propagate_to_a_fixpoint():
+  cnf = CNF.from_symbolic(parse_lines('''
+    a
+    ~a b
+    ~b c
+    ~c d e
+    d f g
+  '''))
+  reductions = Reductions()
+  simplified = cnf.simplified(reductions=reductions)
+  assert list(simplified.symbolic()) == parse_lines('a\nb\nc\nd e\nd f g')
+  assert (reductions.clauses, reductions.literals, reductions.variables) == (0, 3, 3)
+  assert str(reductions) == 'Removed 0 clauses, 3 literals and 3 variables.'
+  reductions = Reductions()
+  cnf.simplified([Literal('d')], reductions)
+  assert (reductions.clauses, reductions.literals, reductions.variables) == (1, 7, 7)
+
+def test_symbolic_constants_and_zero():
+  cnf = CNF.from_symbolic(parse_lines('{zero} a b\n~a c\n~b ~c'))
+  simplified = cnf.simplified([Literal('a')])
+  assert symbolic_models(list(simplified.symbolic()), 'abc') == set([(True, False, True)])
+
+def reductions_by_path(grid):
+  results = []
+  for path in ('list', 'iter', 'cnf'):
+    reductions = Reductions()
+    if path == 'list':
+      inflate_grid_template(LIFE_CONSTRAINTS, grid, G.name, reductions=reductions)
+    elif path == 'iter':
+      list(iter_inflate_grid_template(LIFE_CONSTRAINTS, grid, G.name, reductions=reductions))
+    else:
+      inflate_grid_template(LIFE_CONSTRAINTS, grid, G.name, cnf=CNF(), reductions=reductions)
+    results.append((reductions.clauses, reductions.literals, reductions.variables))
+  return results
+
+def test_inflation_reductions_agree():
+  grid = build_grid(MooreGridNode((0, 0, 0), Open(4, 5), PeriodicTimeAdjust(1, 0, 0)))
+  counts = reductions_by_path(grid)
+  assert counts[0] == counts[1] == counts[2]
+  assert counts[0][0] > 0 and counts[0][1] > 0
+  torus = build_grid(MooreGridNode((0, 0, 0), Toroidal(4, 4), PeriodicTimeAdjust(1, 0, 0)))
+  assert reductions_by_path(torus) == [(0, 0, 0)] * 3
+
+@pytest.mark.parametrize('encoding', ['sequential', 'totalizer'])
+def test_population_constants(encoding):
+  grid = build_grid(MooreGridNode((0, 0, 0), Open(2, 2), PeriodicTimeAdjust(1, 0, 0)))
+  names = [x.name for x in population_literals(grid)]
+  fixed = [Literal(names[0]), Literal(names[1], False)]
+  clauses = bound_population(grid, GreaterThanOrEqual, 2, encoding=encoding, constants=fixed)
+  units = [(x,) for x in fixed]
+  expected = symbolic_models(bound_population(grid, GreaterThanOrEqual, 2) + units, names)
+  assert symbolic_models(clauses + units, names) == expected
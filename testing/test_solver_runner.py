@@ -0,0 +1,77 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from symsat import solver
+from symsat.dimacs_sat import output_dimacs
+from symsat.solver import (CANCELLED, SAT, TIMEOUT, UNKNOWN, UNSAT, SolverRun, run_solver, solve,
+                           solver_args)
+from symsat.symbolic_util import parse_lines
+from testing.brute import satisfies
+
+SATISFIABLE = parse_lines('''
+  a b
+  ~a c
+  ~b ~c
+''')
+
+UNSATISFIABLE = parse_lines('''
+  a b
+  ~a
+  ~b
+''')
+
+def write_dimacs(path, clauses):
+  with open(str(path), 'w') as out:
+    output_dimacs(clauses, out)
+  return str(path)
+
+def sleeper(seconds=30):
+  return [sys.executable, '-c', 'import time; time.sleep(%d)' % seconds]
+
+def test_solver_args(fake_solver):
+  command = solver.SOLVERS[fake_solver][0]
+  assert solver_args('in put.dim', 3, fake_solver) == [command, '--seed=3', 'in put.dim']
+  assert solver_args(None, None, fake_solver) == [command]
+
+def test_run_solver(tmp_path, fake_solver):
+  path = write_dimacs(tmp_path / 'with space.dim', SATISFIABLE)
+  solution = str(tmp_path / 'out')
+  result = run_solver(path, solution, solver=fake_solver)
+  assert result.status == SAT and result.returncode == 10
+  assert satisfies([(1, 2), (-1, 3), (-2, -3)], dict((abs(x), x > 0) for x in result.values))
+  with open(solution) as inp:
+    assert inp.readline().strip() == 's SATISFIABLE'
+  path = write_dimacs(tmp_path / 'unsat.dim', UNSATISFIABLE)
+  result = run_solver(path, solver=fake_solver)
+  assert (result.status, result.values) == (UNSAT, [])
+
+def test_solve_decodes_values(tmp_path, fake_solver, monkeypatch):
+  monkeypatch.setattr(solver, 'COMMAND', solver.SOLVERS[fake_solver][0])
+  path = write_dimacs(tmp_path / 'sat.dim', SATISFIABLE)
+  values = dict(solve(path))
+  assert sorted(values) == ['a', 'b', 'c']
+  assert (values['a'] or values['b']) and not (values['b'] and values['c'])
+  assert values['c'] or not values['a']
+
+def test_timeout():
+  start = time.time()
+  result = SolverRun(sleeper(), timeout=0.5).wait()
+  assert result.status == TIMEOUT
+  assert time.time() - start < 10
+
+def test_cancel_from_another_thread():
+  run = SolverRun(sleeper()).start()
+  threading.Timer(0.3, run.cancel).start()
+  assert run.wait().status == CANCELLED
+
+def test_failed_run_is_unknown():
+  assert SolverRun([sys.executable, '-c', 'raise SystemExit(3)']).wait().status == UNKNOWN
+
+@pytest.mark.skipif(solver.resource is None, reason='resource limits are not supported')
+def test_memory_limit():
+  allocate = [sys.executable, '-c', 'x = bytearray(1 << 30); print("s SATISFIABLE")']
+  assert SolverRun(allocate).wait().status == SAT
+  assert SolverRun(allocate, memory_limit=200 << 20).wait().status == UNKNOWN
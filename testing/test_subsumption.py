@@ -0,0 +1,65 @@
+import random
+
+from symsat.clausebuilder import Literal, flatten_disjunction, remove_redundant
+from symsat.cnf import CNF
+from symsat.subsumption import SubsumptionIndex, remove_subsumed, signature
+from testing.brute import models
+
+def random_clauses(rng, count, nvars=6, width=4):
+  clauses = []
+  for _ in range(count):
+    names = rng.sample(range(1, nvars + 1), rng.randint(1, width))
+    clauses.append(tuple(x if rng.random() < 0.5 else -x for x in names))
+  return clauses
+
+def pairwise(clauses, strict=True):
+  '''Subsumption by comparing all pairs of clauses.'''
+  kept = []
+  for k, clause in enumerate(clauses):
+    if any(set(other) < set(clause) for other in clauses):
+      continue
+    if not strict and any(set(other) == set(clause) for other in clauses[:k]):
+      continue
+    kept.append(clause)
+  return kept
+
+def test_remove_subsumed_matches_pairwise():
+  rng = random.Random(17)
+  for trial in range(200):
+    clauses = random_clauses(rng, rng.randint(0, 25))
+    # some repeats, reordered
+    clauses += [tuple(reversed(c)) for c in rng.sample(clauses, len(clauses) // 4)]
+    assert remove_subsumed(clauses) == pairwise(clauses)
+    assert remove_subsumed(clauses, strict=False) == pairwise(clauses, strict=False)
+
+def test_cnf_subsumed_keeps_models():
+  rng = random.Random(5)
+  for trial in range(50):
+    clauses = random_clauses(rng, rng.randint(1, 15))
+    cnf = CNF()
+    cnf.add_comment('start')
+    for clause in clauses:
+      cnf.add_clause(clause)
+    subsumed = cnf.subsumed()
+    assert list(subsumed) == pairwise(clauses, strict=False)
+    assert next(subsumed.items()) == 'start'
+    variables = range(1, 7)
+    assert models(list(subsumed), variables) == models(clauses, variables)
+
+def test_index():
+  index = SubsumptionIndex()
+  assert index.add((1, -2)) == 0
+  index.add((3,))
+  assert index.find_subset((-2, 1, 4)) == 0
+  assert index.find_subset((1, -2)) is None
+  assert index.find_subset((1, -2), strict=False) == 0
+  assert index.find_subset((1, 2)) is None
+  index.add(())
+  assert index.find_subset((2,)) == 2
+  assert signature((1, -2)) & ~signature((1, -2, 4)) == 0
+
+def test_symbolic_remove_redundant():
+  a, b, c = Literal('a'), Literal('b'), Literal('c')
+  assert remove_redundant([(a, b), (a,), (b, ~c), (~c, b, a)]) == [(a,), (b, ~c)]
+  # (a and b) or c
+  assert sorted(flatten_disjunction([[(a,), (b,)], [(c,)]])) == sorted([(a, c), (b, c)])
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from symsat import rulesymmetry
+from symsat.clausebuilder import to_pairs
+from symsat.rulesymmetry import (ROTATED, ROTATED_FLIPPED, ROTATED_FLIPPED_HEX, SEMI_TOTALISTIC,
+                                 TOTALISTIC, TOTALISTIC_HEX, SymmetryGroup, find_closure,
+                                 symmetry_group)
+from symsat.symbolic_util import parse_line
+
+SYMBOLS = 'O N NE E SE S SW W NW G'.split()
+
+def closure(basis, labeling):
+  '''Finds the orbit of a labeling by applying the basis until nothing new appears.'''
+  inverses = [{v: k for k, v in permutation.items()} for permutation in basis]
+  found = set([tuple(sorted(labeling))])
+  size = 0
+  while size < len(found):
+    size = len(found)
+    for pairs in list(found):
+      for mapping in inverses:
+        found.add(tuple(sorted((mapping.get(s, s), v) for s, v in pairs)))
+  return found
+
+def random_labeling(rng):
+  symbols = rng.sample(SYMBOLS, rng.randint(1, len(SYMBOLS)))
+  return to_pairs(parse_line(' '.join(('~' if rng.random() < 0.5 else '') + s for s in symbols)))
+
+@pytest.mark.parametrize('basis, size', [(ROTATED, 4), (ROTATED_FLIPPED, 8),
+                                         (ROTATED_FLIPPED_HEX, 12), (TOTALISTIC_HEX, 720),
+                                         (SEMI_TOTALISTIC, 576), (TOTALISTIC, None)])
+def test_orbit_matches_closure(basis, size):
+  group = symmetry_group(basis)
+  assert group is symmetry_group(list(basis))
+  assert (None if group.elements is None else len(group.elements)) == size
+  rng = random.Random(20)
+  for trial in range(30):
+    labeling = random_labeling(rng)
+    orbit = find_closure(basis, labeling)
+    assert set(tuple(sorted(image)) for image in orbit) == closure(basis, labeling)
+    assert len(orbit) == len(closure(basis, labeling))
+    # pairs stay in the order of the labeling
+    assert all([v for _, v in image] == [v for _, v in labeling] for image in orbit)
+
+def test_orbit_search_matches_listed_elements(monkeypatch):
+  listed = SymmetryGroup(ROTATED_FLIPPED)
+  monkeypatch.setattr(rulesymmetry, 'MAX_GROUP_ELEMENTS', 4)
+  searched = SymmetryGroup(ROTATED_FLIPPED)
+  assert listed.elements is not None and searched.elements is None
+  rng = random.Random(2)
+  for trial in range(30):
+    labeling = random_labeling(rng)
+    assert (set(tuple(sorted(image)) for image in searched.orbit(labeling)) ==
+            set(tuple(sorted(image)) for image in listed.orbit(labeling)))
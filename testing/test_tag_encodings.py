@@ -0,0 +1,92 @@
+import itertools
+import random
+
+import pytest
+
+from symsat.clausebuilder import Literal
+from symsat.cnf import CNF
+from symsat.dimacs_sat import decode_values
+from symsat.tags import at_most_one, expand_tag_clauses, find_max, is_auxiliary, tag_encoding
+from testing.brute import models, symbolic_models
+
+def random_tag_clauses(rng, max_tags):
+  clauses = [(Literal(name, True, tag),) + (Literal(name, True, 0),)
+             for name, tag in max_tags.items()]
+  for _ in range(rng.randint(1, 4)):
+    clause = []
+    for name in rng.sample(sorted(max_tags) + ['x'], 2):
+      tag = None if name == 'x' else rng.randint(0, max_tags[name])
+      clause.append(Literal(name, rng.random() < 0.5, tag))
+    clauses.append(tuple(clause))
+  return clauses
+
+def allowed(clauses, max_tags, names):
+  '''Returns the assignments of values to names (tags or booleans) satisfying tag clauses.'''
+  domains = [range(max_tags[name] + 1) if name in max_tags else (False, True) for name in names]
+  res = set()
+  for values in itertools.product(*domains):
+    value = dict(zip(names, values))
+    if all(any((value[x.name] == x.tag) == x.value if x.tag is not None else value[x.name] == x.value
+               for x in clause) for clause in clauses):
+      res.add(values)
+  return res
+
+def decoded(bit_clauses, names):
+  '''Returns the decoded values of names in every model of expanded clauses, and the count.'''
+  cnf = CNF.from_symbolic(bit_clauses)
+  # a boolean missing from the clauses is free
+  cnf.symbols.variable('x')
+  to_symbol = [None] + [name for name, _ in cnf.symbols.keys()]
+  found = []
+  for model in models(list(cnf), range(1, len(to_symbol))):
+    values = dict(decode_values(to_symbol, [ix if model[ix] else -ix for ix in model]))
+    found.append(tuple(values.get(name, False) for name in names))
+  return set(found), len(found)
+
+@pytest.mark.parametrize('encodings', [None, 'log', 'onehot', 'order', 'auto',
+                                       {'a': 'onehot', 'b': 'order'}])
+def test_encodings_preserve_models(encodings):
+  rng = random.Random(21)
+  names = ['a', 'b', 'x']
+  for trial in range(15):
+    clauses = random_tag_clauses(rng, {'a': 2, 'b': 3})
+    expected = allowed(clauses, find_max(clauses), names)
+    found, count = decoded(expand_tag_clauses(clauses, encodings), names)
+    assert found == expected
+    # no auxiliary variables here, so each value has a single encoding
+    assert count == len(expected)
+
+def test_cnf_expansion_matches_symbolic():
+  rng = random.Random(3)
+  for encodings in ('log', 'onehot', 'order'):
+    clauses = random_tag_clauses(rng, {'a': 4, 'b': 2})
+    cnf = expand_tag_clauses(CNF.from_symbolic(clauses), encodings)
+    assert decoded(cnf.symbolic(), ['a', 'b', 'x']) == \
+        decoded(expand_tag_clauses(clauses, encodings), ['a', 'b', 'x'])
+
+@pytest.mark.parametrize('encoding', ['pairwise', 'ladder', 'commander', None])
+def test_at_most_one(encoding):
+  for n in range(1, 9):
+    literals = [Literal('v%d' % i) for i in range(n)]
+    clauses = at_most_one(literals, 'v', encoding)
+    names = [x.name for x in literals]
+    expected = set(v for v in itertools.product((False, True), repeat=n) if sum(v) <= 1)
+    assert symbolic_models(clauses, names) == expected
+    helpers = set(x.name for clause in clauses for x in clause).difference(names)
+    assert all(is_auxiliary(name) for name in helpers)
+  with pytest.raises(ValueError):
+    at_most_one([Literal('v%d' % i) for i in range(4)], 'v', 'binary')
+
+def test_tag_encoding():
+  assert tag_encoding('a', 3) == 'log'
+  assert tag_encoding('a', 3, 'auto') == 'onehot'
+  assert tag_encoding('a', 16, 'auto') == 'log'
+  assert tag_encoding('a', 3, {'a': 'order'}) == 'order'
+  assert tag_encoding('b', 3, {'a': 'order'}) == 'log'
+  with pytest.raises(ValueError):
+    tag_encoding('a', 3, 'unary')
+
+def test_decode_values():
+  names = [None, 'a#e0', 'a#e1', 'a#l0', 'b#g1', 'b#g2', 'c#0', 'c#1', 'x']
+  assert decode_values(names, [-1, 2, 3, 4, -5, 6, 7, -8]) == \
+      [('a', 1), ('b', 1), ('c', 3), ('x', False)]
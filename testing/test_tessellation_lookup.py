@@ -0,0 +1,42 @@
+import pytest
+
+from symsat import tessellation
+from symsat.tessellation import (CenterFlippedRectangle, CrossSurface, DiagonalFlipped,
+                                 FaceRotatedRhombus, FaceRotatedSquare, FlippedRectangle,
+                                 RotatedRhombus, RotatedSquare)
+
+TESSELLATIONS = [
+  lambda: RotatedRhombus(5),
+  lambda: FaceRotatedRhombus(5),
+  lambda: RotatedSquare(5),
+  lambda: FaceRotatedSquare(4),
+  lambda: FlippedRectangle(4, 6),
+  lambda: CenterFlippedRectangle(4, 6),
+  lambda: DiagonalFlipped(5),
+  lambda: CrossSurface(4, 6),
+]
+
+COORDINATES = [(i, j) for i in range(-12, 13) for j in range(-12, 13)]
+
+@pytest.mark.parametrize('make', TESSELLATIONS)
+def test_to_grid_matches_search(make):
+  tiling = make()
+  for i, j in COORDINATES:
+    assert tiling.to_grid(i, j) == tiling.find_grid(i, j), (i, j)
+
+@pytest.mark.parametrize('make', TESSELLATIONS)
+def test_to_grid_many_matches_to_grid(make):
+  tiling = make()
+  ilist, jlist = [i for i, _ in COORDINATES], [j for _, j in COORDINATES]
+  mapped = list(zip(*tiling.to_grid_many(ilist, jlist)))
+  assert mapped == [make().to_grid(i, j) for i, j in COORDINATES]
+  # inside the window only
+  mapped = list(zip(*tiling.to_grid_many([0, 1, -1], [0, 2, -1])))
+  assert mapped == [tiling.find_grid(i, j) for i, j in [(0, 0), (1, 2), (-1, -1)]]
+
+def test_cache_outside_window_is_bounded(monkeypatch):
+  monkeypatch.setattr(tessellation, 'MAX_CACHED', 10)
+  tiling = RotatedSquare(5)
+  for i, j in COORDINATES:
+    assert tiling.to_grid(i + 100, j) == tiling.find_grid(i + 100, j)
+    assert len(tiling.cache) <= 10
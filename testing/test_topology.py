@@ -0,0 +1,66 @@
+from collections import deque
+
+import pytest
+
+from symsat.gridbuilder import (MOORE_DISPLACEMENTS, GridTopology, MooreGridNode, Open,
+                                PeriodicTimeAdjust, Strip, Tesselated, Toroidal, build_grid,
+                                displacement)
+from symsat.tessellation import CrossSurface, FaceRotatedSquare, RotatedSquare
+
+def reference_grid(root):
+  '''The node-by-node breadth first search that GridTopology replaces.'''
+  frontier = deque([root])
+  grid_nodes = set(frontier)
+  while frontier:
+    node = frontier.popleft()
+    for symbol in node.neighbor_symbols():
+      neighbor = node.neighbor(symbol)
+      if (neighbor not in grid_nodes and neighbor.orientation == 0
+          and (not neighbor.is_outside() or neighbor.is_boundary())):
+        grid_nodes.add(neighbor)
+        frontier.append(neighbor)
+  return sorted(grid_nodes, key=lambda node: node.position)
+
+EQUIVALENCES = [
+  (Open(4, 5), PeriodicTimeAdjust(2, 0, 0)),
+  (Strip(3, 4), PeriodicTimeAdjust(1, 0, 0)),
+  (Toroidal(4, 5, -2), PeriodicTimeAdjust(3, 1, 0)),
+  (Tesselated(RotatedSquare(5)), PeriodicTimeAdjust(2, 0, 0)),
+  (Tesselated(FaceRotatedSquare(4)), PeriodicTimeAdjust(1, 0, 0)),
+  (Tesselated(CrossSurface(4, 4)), PeriodicTimeAdjust(1, 0, 0)),
+]
+
+@pytest.mark.parametrize('equivalence, time_adjust', EQUIVALENCES)
+def test_topology_matches_node_search(equivalence, time_adjust):
+  root = MooreGridNode((0, 0, 0), equivalence, time_adjust)
+  topology = build_grid(root)
+  assert isinstance(topology, GridTopology)
+  reference = reference_grid(root)
+  assert [node.position for node in topology] == [node.position for node in reference]
+  assert [node.is_outside() for node in topology] == [node.is_outside() for node in reference]
+  assert [node.is_boundary() for node in topology] == [node.is_boundary() for node in reference]
+  for symbol in root.neighbor_symbols():
+    got = [(node.neighbor(symbol).name, node.neighbor(symbol).orientation) for node in topology]
+    expected = [(node.neighbor(symbol).name, node.neighbor(symbol).orientation)
+                for node in reference]
+    assert got == expected, symbol
+
+def test_layer_excludes_outside_cells():
+  topology = build_grid(MooreGridNode((0, 0, 0), Open(3, 4), PeriodicTimeAdjust(2, 0, 0)))
+  for t in (0, 1):
+    assert len(topology.layer(t)) == 12
+    assert all(topology.positions[cell][2] == t for cell in topology.layer(t))
+
+def test_column_for_other_symbols():
+  root = MooreGridNode((0, 0, 0), Toroidal(4, 4), PeriodicTimeAdjust(1, 0, 0))
+  topology = build_grid(root)
+  ids, _ = topology.column('O+2-1')
+  for node, cell in zip(topology, ids):
+    i, j, t = node.position
+    assert topology.positions[cell] == ((i + 2) % 4, (j - 1) % 4, t)
+
+def test_delta_displacements_leave_moore_table_alone():
+  before = dict(MOORE_DISPLACEMENTS)
+  assert displacement('O-3+2') == (-3, 2)
+  assert displacement('N') == (-1, 0)
+  assert MOORE_DISPLACEMENTS == before
@@ -0,0 +1,69 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from symsat.dimacs_sat import (HEADER_SIZE, dimacs_header, load_results, output_dimacs,
+                               read_variable_names, stream_dimacs)
+from symsat.symbolic_util import parse_lines
+
+CLAUSES = parse_lines('''
+  c_0_0_0 ~c_0_1_0
+  c_0_1_0 x$c_0_0_0
+  ~x$c_0_0_0
+''')
+
+def write(tmp_path, writer, **kwargs):
+  dimacs, sidecar = tmp_path / 'grid.dim', tmp_path / 'grid.map'
+  with open(str(dimacs), 'w') as out, open(str(sidecar), 'w') as variable_map:
+    writer(CLAUSES, out, variable_map=variable_map, **kwargs)
+  return dimacs, sidecar
+
+@pytest.mark.parametrize('writer', [output_dimacs, stream_dimacs])
+def test_sidecar_names_variables(tmp_path, writer):
+  dimacs, sidecar = write(tmp_path, writer, comment_variables=False)
+  lines = dimacs.read_text().splitlines()
+  assert lines[0].startswith('p cnf 3 3')
+  assert 'c variable map: grid.map' in lines[:3]
+  assert not any(line.startswith('c variable ') and line != 'c variable map: grid.map'
+                 for line in lines)
+  with open(str(dimacs)) as inp:
+    names = read_variable_names(inp)
+  assert names[0] is None
+  assert sorted(names[1:]) == ['c_0_0_0', 'c_0_1_0', 'x$c_0_0_0']
+  assert sidecar.read_text().split() == names[1:]
+
+def test_comments_name_variables_without_sidecar():
+  out = io.StringIO()
+  output_dimacs(CLAUSES, out)
+  names = read_variable_names(io.StringIO(out.getvalue()))
+  assert sorted(names.values()) == ['c_0_0_0', 'c_0_1_0', 'x$c_0_0_0']
+
+def test_load_results_from_sidecar(tmp_path):
+  dimacs, _ = write(tmp_path, output_dimacs, comment_variables=False)
+  with open(str(dimacs)) as inp:
+    names = read_variable_names(inp)
+  solution = ['s SATISFIABLE\n', 'v %s 0\n' % ' '.join(
+      str(ix if names[ix] == 'c_0_0_0' else -ix) for ix in range(1, 4))]
+  with open(str(dimacs)) as inp:
+    results = load_results(inp, solution)
+  assert results == load_results(names, solution)
+  assert dict(results) == {'c_0_0_0': True, 'c_0_1_0': False, 'x$c_0_0_0': False}
+
+def test_padded_header():
+  header = dimacs_header(12, 345)
+  assert len(header) == HEADER_SIZE and header.startswith('p cnf 12 345\nc')
+
+def test_exclude_solution_rewrites_header_in_place(tmp_path):
+  dimacs, _ = write(tmp_path, output_dimacs)
+  solution = tmp_path / 'grid.out'
+  solution.write_text('s SATISFIABLE\nv 1 -2 -3 0\n')
+  before = dimacs.read_text()
+  subprocess.check_call([sys.executable, '-m', 'symsat.exclude_solution', str(dimacs),
+                         str(solution)], cwd=os.path.dirname(os.path.dirname(__file__)))
+  after = dimacs.read_text()
+  assert after[:HEADER_SIZE] == dimacs_header(3, 4)
+  assert after[HEADER_SIZE:].startswith(before[HEADER_SIZE:])
+  assert after.splitlines()[-1].split() == ['-1', '2', '3', '0']